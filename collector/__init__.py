@@ -0,0 +1 @@
+# collector/__init__.py
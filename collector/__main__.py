@@ -0,0 +1,74 @@
+# collector/__main__.py
+"""Run the collector service that writes client sessions and events in bulk.
+
+Run from the project root, with a db_config.json pointing at the database:
+    python -m collector --tcp 0.0.0.0:7070 --unix /run/sleep-tracker/collector.sock
+"""
+import argparse
+import asyncio
+import signal
+
+from collector import protocol
+from collector.server import (DEFAULT_BATCH_SIZE, DEFAULT_CONNECTIONS, DEFAULT_FLUSH_INTERVAL,
+                              DEFAULT_QUEUE_SIZE, DEFAULT_ROLLUP_INTERVAL, DEFAULT_SWEEP_INTERVAL,
+                              CollectorServer)
+from database import db_connection
+
+async def serve(args):
+    server = CollectorServer(connections=args.connections, batch_size=args.batch_size,
+                             flush_interval=args.flush_interval, queue_size=args.queue_size,
+                             session_timeout=args.session_timeout, sweep_interval=args.sweep_interval,
+                             rollup_interval=args.rollup_interval)
+    tcp = protocol.parse_address(args.tcp)[1] if args.tcp else None
+    await server.start(tcp=tcp, unix=args.unix)
+    print(f"collector listening on {', '.join(str(address) for address in server.addresses())}", flush=True)
+
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop.set)
+
+    while not stop.is_set():
+        try:
+            await asyncio.wait_for(stop.wait(), args.stats_interval)
+        except asyncio.TimeoutError:
+            print(f"collector stats: {server.stats()}", flush=True)
+    await server.stop()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--tcp", metavar="HOST:PORT", help="TCP address to listen on")
+    parser.add_argument("--unix", metavar="PATH", help="Unix socket to listen on")
+    parser.add_argument("--config", help="db_config.json to use instead of config/db_config.json")
+    parser.add_argument("--connections", type=int, default=DEFAULT_CONNECTIONS,
+                        help="database connections shared by all clients")
+    parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="most events per transaction")
+    parser.add_argument("--flush-interval", type=float, default=DEFAULT_FLUSH_INTERVAL,
+                        help="seconds a request may wait for its batch to fill")
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE,
+                        help="requests queued before client reads pause")
+    parser.add_argument("--session-timeout", type=float, metavar="MINUTES",
+                        help="clock out sessions open longer than this; set \"server_session_sweeper\" on clients")
+    parser.add_argument("--sweep-interval", type=float, default=DEFAULT_SWEEP_INTERVAL,
+                        help="seconds between stale-session sweeps")
+    parser.add_argument("--rollup-interval", type=float, metavar="SECONDS", nargs="?",
+                        const=DEFAULT_ROLLUP_INTERVAL,
+                        help=f"refresh daily_rollup this often (default {DEFAULT_ROLLUP_INTERVAL:g} "
+                             "when given bare); set \"server_rollup\" on admin clients")
+    parser.add_argument("--stats-interval", type=float, default=60, help="seconds between stats lines")
+    args = parser.parse_args()
+
+    if not args.tcp and not args.unix:
+        parser.error("give --tcp and/or --unix")
+    if args.config:
+        db_connection.CONFIG_PATH = args.config
+        db_connection.reload_db_config()
+    config = db_connection.load_db_config()
+    if config.get("collector"):
+        parser.error("the collector's own config must not set \"collector\"")
+    db_connection.get_backend()  # fail on a bad backend before taking clients
+
+    asyncio.run(serve(args))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,154 @@
+# collector/client.py
+import itertools
+import socket
+import threading
+
+from collector import protocol
+from database.db_connection import load_db_config
+from database.event_writer import (DEFAULT_EVENT_BATCH_SIZE, DEFAULT_EVENT_FLUSH_INTERVAL,
+                                   DEFAULT_EVENT_PUT_TIMEOUT, DEFAULT_EVENT_QUEUE_SIZE, EventWriter)
+
+DEFAULT_CONNECT_TIMEOUT = 5       # seconds to reach the collector
+DEFAULT_REPLY_TIMEOUT = 60        # seconds to wait for a commit acknowledgement
+
+class CollectorUnavailable(Exception):
+    """Raised when the collector, or the database behind it, cannot be reached"""
+
+class CollectorRejected(Exception):
+    """Raised when the database behind the collector refuses a request"""
+
+class CollectorClient:
+    """Blocking request/reply connection to the collector service.
+
+    One socket is kept open and re-established on the next request after a
+    failure. Requests are serialized by a lock, so a client can be shared
+    by threads.
+    """
+
+    def __init__(self, address, connect_timeout=DEFAULT_CONNECT_TIMEOUT, reply_timeout=DEFAULT_REPLY_TIMEOUT):
+        self.family, self.address = protocol.parse_address(address)
+        self.connect_timeout = connect_timeout
+        self.reply_timeout = reply_timeout
+        self._sock = None
+        self._lock = threading.Lock()
+        self._request_ids = itertools.count(1)
+
+    def start_session(self, account_id, clock_in_time, mac_address=None):
+        """Session id of a new session"""
+        return self._request(lambda request_id: protocol.encode_start_session(
+            request_id, account_id, clock_in_time, mac_address))
+
+    def end_session(self, session_id, clock_out_time):
+        """Work minutes of the closed session; CollectorRejected if it does not exist"""
+        return self._request(lambda request_id: protocol.encode_end_session(
+            request_id, session_id, clock_out_time))
+
+    def send_events(self, events):
+        """Write (account_id, session_id, event_type, event_time, source) rows; returns once committed"""
+        return self._request(lambda request_id: protocol.encode_events(request_id, events))
+
+    def ping(self):
+        """True if both the collector and its database are reachable"""
+        try:
+            self._request(protocol.encode_ping)
+            return True
+        except (CollectorUnavailable, CollectorRejected):
+            return False
+
+    def close(self):
+        with self._lock:
+            self._disconnect()
+
+    def _request(self, encode):
+        with self._lock:
+            request_id = next(self._request_ids) & 0xFFFFFFFF
+            try:
+                sock = self._connect()
+                sock.sendall(encode(request_id))
+                reply_id, status, value, error = self._read_reply(sock)
+            except (OSError, protocol.ProtocolError) as e:
+                self._disconnect()
+                raise CollectorUnavailable(f"Collector unreachable: {e}") from e
+            if reply_id != request_id:
+                self._disconnect()
+                raise CollectorUnavailable("Collector reply out of step")
+
+        if status == protocol.STATUS_REJECTED:
+            raise CollectorRejected(error)
+        if status != protocol.STATUS_OK:
+            raise CollectorUnavailable(error or "Database unavailable")
+        return value
+
+    def _connect(self):
+        if self._sock is None:
+            if self.family == "unix":
+                sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            else:
+                sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            sock.settimeout(self.connect_timeout)
+            try:
+                sock.connect(self.address)
+            except OSError:
+                sock.close()
+                raise
+            sock.settimeout(self.reply_timeout)
+            self._sock = sock
+        return self._sock
+
+    def _disconnect(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+            self._sock = None
+
+    def _read_reply(self, sock):
+        length, message_type = protocol.HEADER.unpack(self._read_exactly(sock, protocol.HEADER.size))
+        if message_type != protocol.MSG_REPLY or length > protocol.MAX_PAYLOAD:
+            raise protocol.ProtocolError(f"Unexpected frame type {message_type}")
+        return protocol.decode_reply(self._read_exactly(sock, length))
+
+    def _read_exactly(self, sock, size):
+        data = bytearray()
+        while len(data) < size:
+            chunk = sock.recv(size - len(data))
+            if not chunk:
+                raise ConnectionError("Collector closed the connection")
+            data.extend(chunk)
+        return bytes(data)
+
+class CollectorEventSink(EventWriter):
+    """Event writer that hands its batches to the collector instead of the database.
+
+    Queuing, batching, retry with backoff and the dropping of rejected
+    events all work as in EventWriter; only the write goes over the wire.
+    """
+
+    def __init__(self, address, queue_size=DEFAULT_EVENT_QUEUE_SIZE, batch_size=DEFAULT_EVENT_BATCH_SIZE,
+                 flush_interval=DEFAULT_EVENT_FLUSH_INTERVAL, put_timeout=DEFAULT_EVENT_PUT_TIMEOUT):
+        self.client = CollectorClient(address)
+        super().__init__(queue_size=queue_size, batch_size=min(batch_size, protocol.MAX_EVENTS_PER_FRAME),
+                         flush_interval=flush_interval, put_timeout=put_timeout)
+
+    def _write(self, batch):
+        self.client.send_events(batch)
+
+    def _database_reachable(self):
+        return self.client.ping()
+
+_client = None
+_client_lock = threading.Lock()
+
+def get_collector_client():
+    """The process-wide collector client, or None when no "collector" is configured"""
+    global _client
+    address = load_db_config().get("collector")
+    if not address:
+        return None
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = CollectorClient(address)
+    return _client
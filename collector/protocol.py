@@ -0,0 +1,144 @@
+# collector/protocol.py
+# Wire format between desktop clients and the collector service.
+#
+# Every frame is a 4-byte big-endian payload length and a 1-byte message
+# type, followed by the payload. Requests start with a client-chosen u32
+# request id, which the collector echoes in its REPLY. Times travel as
+# microseconds since 1970-01-01 on the client's naive local clock, so no
+# time zone conversion happens on either side.
+import struct
+from datetime import datetime, timedelta
+
+HEADER = struct.Struct("!IB")              # payload length, message type
+MAX_PAYLOAD = 4 * 1024 * 1024
+
+MSG_EVENTS = 1          # request id, u16 count, then count EVENT records
+MSG_START_SESSION = 2   # request id, START_SESSION, then the MAC address (utf-8)
+MSG_END_SESSION = 3     # request id, END_SESSION
+MSG_PING = 4            # request id; replies OK only if the database is reachable
+MSG_REPLY = 5           # request id, REPLY, then an error message (utf-8)
+
+REQUEST_ID = struct.Struct("!I")
+EVENT = struct.Struct("!iiBqB")            # account_id, session_id, event type, time, source length
+EVENT_COUNT = struct.Struct("!H")
+START_SESSION = struct.Struct("!iq")       # account_id, clock_in
+END_SESSION = struct.Struct("!iq")         # session_id, clock_out
+REPLY = struct.Struct("!Bq")               # status, value (-1 for none)
+
+STATUS_OK = 0
+STATUS_REJECTED = 1       # the database refused the request; resending will not help
+STATUS_UNAVAILABLE = 2    # the database could not be reached; resend later
+
+EVENT_TYPES = ('sleep', 'resume', 'idle_start', 'idle_end')
+_EVENT_CODES = {event_type: code for code, event_type in enumerate(EVENT_TYPES)}
+
+MAX_EVENTS_PER_FRAME = 0xFFFF
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+class ProtocolError(Exception):
+    """Raised for malformed frames"""
+
+def encode_time(value):
+    return (value - _EPOCH) // _MICROSECOND
+
+def decode_time(value):
+    return _EPOCH + timedelta(microseconds=value)
+
+def frame(message_type, payload):
+    return HEADER.pack(len(payload), message_type) + payload
+
+def encode_events(request_id, events):
+    """EVENTS frame for (account_id, session_id, event_type, event_time, source) tuples"""
+    if len(events) > MAX_EVENTS_PER_FRAME:
+        raise ValueError(f"At most {MAX_EVENTS_PER_FRAME} events fit in one frame")
+    parts = [REQUEST_ID.pack(request_id), EVENT_COUNT.pack(len(events))]
+    for account_id, session_id, event_type, event_time, source in events:
+        source = (source or '').encode()
+        parts.append(EVENT.pack(account_id or 0, session_id, _EVENT_CODES.get(event_type, 0xFF),
+                                encode_time(event_time), len(source)))
+        parts.append(source)
+    return frame(MSG_EVENTS, b"".join(parts))
+
+def decode_events(payload):
+    """(request_id, events) from an EVENTS payload"""
+    try:
+        request_id, = REQUEST_ID.unpack_from(payload)
+        count, = EVENT_COUNT.unpack_from(payload, REQUEST_ID.size)
+        offset = REQUEST_ID.size + EVENT_COUNT.size
+        events = []
+        for _ in range(count):
+            account_id, session_id, code, event_time, source_length = EVENT.unpack_from(payload, offset)
+            offset += EVENT.size
+            source = payload[offset:offset + source_length].decode()
+            offset += source_length
+            # Unknown codes pass through as-is so the database rejects them like any bad value
+            event_type = EVENT_TYPES[code] if code < len(EVENT_TYPES) else str(code)
+            events.append((account_id or None, session_id, event_type, decode_time(event_time), source))
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ProtocolError(f"Malformed EVENTS frame: {e}") from e
+    return request_id, events
+
+def encode_start_session(request_id, account_id, clock_in_time, mac_address):
+    return frame(MSG_START_SESSION, REQUEST_ID.pack(request_id)
+                 + START_SESSION.pack(account_id, encode_time(clock_in_time))
+                 + (mac_address or '').encode())
+
+def decode_start_session(payload):
+    """(request_id, account_id, clock_in_time, mac_address) from a START_SESSION payload"""
+    try:
+        request_id, = REQUEST_ID.unpack_from(payload)
+        account_id, clock_in = START_SESSION.unpack_from(payload, REQUEST_ID.size)
+        mac_address = payload[REQUEST_ID.size + START_SESSION.size:].decode() or None
+    except (struct.error, UnicodeDecodeError) as e:
+        raise ProtocolError(f"Malformed START_SESSION frame: {e}") from e
+    return request_id, account_id, decode_time(clock_in), mac_address
+
+def encode_end_session(request_id, session_id, clock_out_time):
+    return frame(MSG_END_SESSION, REQUEST_ID.pack(request_id)
+                 + END_SESSION.pack(session_id, encode_time(clock_out_time)))
+
+def decode_end_session(payload):
+    """(request_id, session_id, clock_out_time) from an END_SESSION payload"""
+    try:
+        request_id, = REQUEST_ID.unpack_from(payload)
+        session_id, clock_out = END_SESSION.unpack_from(payload, REQUEST_ID.size)
+    except struct.error as e:
+        raise ProtocolError(f"Malformed END_SESSION frame: {e}") from e
+    return request_id, session_id, decode_time(clock_out)
+
+def encode_ping(request_id):
+    return frame(MSG_PING, REQUEST_ID.pack(request_id))
+
+def decode_request_id(payload):
+    try:
+        return REQUEST_ID.unpack_from(payload)[0]
+    except struct.error as e:
+        raise ProtocolError(f"Malformed frame: {e}") from e
+
+def encode_reply(request_id, status, value=None, error=''):
+    return frame(MSG_REPLY, REQUEST_ID.pack(request_id)
+                 + REPLY.pack(status, -1 if value is None else value)
+                 + error.encode()[:1024])
+
+def decode_reply(payload):
+    """(request_id, status, value, error) from a REPLY payload"""
+    try:
+        request_id, = REQUEST_ID.unpack_from(payload)
+        status, value = REPLY.unpack_from(payload, REQUEST_ID.size)
+        error = payload[REQUEST_ID.size + REPLY.size:].decode(errors='replace')
+    except struct.error as e:
+        raise ProtocolError(f"Malformed REPLY frame: {e}") from e
+    return request_id, status, None if value == -1 else value, error
+
+def parse_address(address):
+    """('unix', path) or ('tcp', (host, port)) from unix:///path or [tcp://]host:port"""
+    if address.startswith("unix://"):
+        return "unix", address[len("unix://"):]
+    if address.startswith("tcp://"):
+        address = address[len("tcp://"):]
+    host, _, port = address.rpartition(":")
+    if not port.isdigit():
+        raise ValueError(f"Invalid collector address: {address!r}")
+    return "tcp", (host or "127.0.0.1", int(port))
@@ -0,0 +1,310 @@
+# collector/server.py
+import asyncio
+import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from collector import protocol
+from database.db_connection import get_backend, pooled_connection
+from database.event_writer import write_events
+from database.queries import _close_session, _close_sessions, start_session
+from database.rollup import refresh_daily_rollup
+
+# Collector defaults, overridable from the command line
+DEFAULT_CONNECTIONS = 4           # database connections shared by every client
+DEFAULT_BATCH_SIZE = 2000         # events written per transaction at most
+DEFAULT_FLUSH_INTERVAL = 0.05     # seconds a request may wait for its batch to fill
+DEFAULT_QUEUE_SIZE = 200          # requests queued before client reads pause
+DEFAULT_SWEEP_INTERVAL = 60       # seconds between stale-session sweeps
+DEFAULT_ROLLUP_INTERVAL = 300     # seconds between daily_rollup refreshes, when enabled
+
+class _Write:
+    """A queued EVENTS, END_SESSION or stale-session sweep request awaiting its batch"""
+
+    __slots__ = ('kind', 'items', 'future')
+
+    def __init__(self, kind, items, future):
+        self.kind = kind
+        self.items = items
+        self.future = future
+
+class CollectorServer:
+    """Asyncio service that takes client writes and applies them in bulk.
+
+    Clients keep one socket each; their EVENTS and END_SESSION requests go
+    into a single queue, and one batching task drains it into transactions
+    of up to batch_size events, so thousands of clients share a few
+    database connections. Batches run one at a time in queue order, which
+    keeps each client's events ahead of its clock-out. START_SESSION needs
+    the new id straight away and runs on its own, on the same small
+    executor. A client is answered only once its write has committed.
+
+    With session_timeout set, sessions open longer than that many minutes
+    are clocked out every sweep_interval seconds. The sweep is queued like
+    a clock-out, so it lands behind the events already received.
+
+    With rollup_interval set, daily_rollup is brought up to date every
+    rollup_interval seconds on the executor, so the admin dashboards only
+    read it.
+    """
+
+    def __init__(self, connections=DEFAULT_CONNECTIONS, batch_size=DEFAULT_BATCH_SIZE,
+                 flush_interval=DEFAULT_FLUSH_INTERVAL, queue_size=DEFAULT_QUEUE_SIZE,
+                 session_timeout=None, sweep_interval=DEFAULT_SWEEP_INTERVAL, rollup_interval=None):
+        if connections < 1 or batch_size < 1 or queue_size < 1:
+            raise ValueError("Invalid collector size: connections, batch_size and queue_size must be positive")
+
+        self.connections = connections
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.queue_size = queue_size
+        self.session_timeout = session_timeout
+        self.sweep_interval = sweep_interval
+        self.rollup_interval = rollup_interval
+
+        self._executor = ThreadPoolExecutor(max_workers=connections, thread_name_prefix="collector-db")
+        self._queue = None
+        self._servers = []
+        self._batcher = None
+        self._sweeper = None
+        self._rollups = None
+        self._clients = {}            # writer -> handler task
+        self._stats = {
+            'clients': 0,
+            'requests': 0,
+            'events': 0,
+            'sessions_started': 0,
+            'sessions_ended': 0,
+            'sessions_swept': 0,
+            'rollup_days': 0,
+            'batches': 0,
+            'rejected': 0,
+            'unavailable': 0,
+        }
+
+    async def start(self, tcp=None, unix=None):
+        """Listen on a (host, port) pair and/or a Unix socket path"""
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._batcher = asyncio.create_task(self._run_batches())
+        if self.session_timeout is not None:
+            self._sweeper = asyncio.create_task(self._run_sweeps())
+        if self.rollup_interval is not None:
+            self._rollups = asyncio.create_task(self._run_rollups())
+        if tcp:
+            self._servers.append(await asyncio.start_server(self._serve_client, *tcp))
+        if unix:
+            if os.path.exists(unix):
+                os.unlink(unix)
+            self._servers.append(await asyncio.start_unix_server(self._serve_client, unix))
+
+    def stats(self):
+        """Counters for diagnostics and load tests"""
+        stats = dict(self._stats)
+        stats['queued'] = self._queue.qsize() if self._queue else 0
+        return stats
+
+    def addresses(self):
+        return [sock.getsockname() for server in self._servers for sock in server.sockets]
+
+    async def serve_forever(self):
+        await asyncio.gather(*(server.serve_forever() for server in self._servers))
+
+    async def stop(self):
+        for server in self._servers:
+            server.close()
+        # Ending the handlers lets requests in flight finish and be answered
+        tasks = list(self._clients.values())
+        for writer in list(self._clients):
+            writer.close()
+        if tasks:
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for server in self._servers:
+            await server.wait_closed()
+        if self._sweeper:
+            self._sweeper.cancel()
+        if self._rollups:
+            self._rollups.cancel()
+        if self._batcher:
+            self._batcher.cancel()
+        self._executor.shutdown(wait=True)
+
+    async def _serve_client(self, reader, writer):
+        self._clients[writer] = asyncio.current_task()
+        self._stats['clients'] += 1
+        replies = set()
+        try:
+            while True:
+                try:
+                    header = await reader.readexactly(protocol.HEADER.size)
+                except asyncio.IncompleteReadError:
+                    return
+                length, message_type = protocol.HEADER.unpack(header)
+                if length > protocol.MAX_PAYLOAD:
+                    return
+                payload = await reader.readexactly(length)
+                self._stats['requests'] += 1
+
+                # Replies are sent as requests complete, so one client can
+                # have several batches in flight
+                reply = asyncio.create_task(self._handle(message_type, payload, writer))
+                replies.add(reply)
+                reply.add_done_callback(replies.discard)
+        except (ConnectionError, asyncio.IncompleteReadError, protocol.ProtocolError):
+            return
+        finally:
+            self._clients.pop(writer, None)
+            self._stats['clients'] -= 1
+            if replies:
+                await asyncio.gather(*replies, return_exceptions=True)
+            writer.close()
+
+    async def _handle(self, message_type, payload, writer):
+        try:
+            request_id, status, value, error = await self._process(message_type, payload)
+            writer.write(protocol.encode_reply(request_id, status, value, error))
+            await writer.drain()
+        except (ConnectionError, protocol.ProtocolError):
+            writer.close()
+
+    async def _process(self, message_type, payload):
+        """Carry out one request; returns (request_id, status, value, error)"""
+        loop = asyncio.get_running_loop()
+        if message_type == protocol.MSG_EVENTS:
+            request_id, events = protocol.decode_events(payload)
+            future = loop.create_future()
+            await self._queue.put(_Write('events', events, future))
+            status, value, error = await future
+        elif message_type == protocol.MSG_END_SESSION:
+            request_id, session_id, clock_out_time = protocol.decode_end_session(payload)
+            future = loop.create_future()
+            await self._queue.put(_Write('end_session', [(session_id, clock_out_time)], future))
+            status, value, error = await future
+        elif message_type == protocol.MSG_START_SESSION:
+            request_id, account_id, clock_in_time, mac_address = protocol.decode_start_session(payload)
+            status, value, error = await self._run(start_session, account_id, clock_in_time, mac_address)
+            if status == protocol.STATUS_OK:
+                self._stats['sessions_started'] += 1
+        elif message_type == protocol.MSG_PING:
+            request_id = protocol.decode_request_id(payload)
+            reachable = await loop.run_in_executor(self._executor, database_reachable)
+            status, value, error = (protocol.STATUS_OK if reachable else protocol.STATUS_UNAVAILABLE), None, ''
+        else:
+            raise protocol.ProtocolError(f"Unknown message type {message_type}")
+        return request_id, status, value, error
+
+    async def _run(self, func, *args):
+        """Run a database call on the executor; returns (status, value, error)"""
+        loop = asyncio.get_running_loop()
+        try:
+            return protocol.STATUS_OK, await loop.run_in_executor(self._executor, func, *args), ''
+        except Exception as e:
+            return await self._failure(e)
+
+    async def _failure(self, error):
+        loop = asyncio.get_running_loop()
+        if await loop.run_in_executor(self._executor, database_reachable):
+            self._stats['rejected'] += 1
+            return protocol.STATUS_REJECTED, None, str(error)
+        self._stats['unavailable'] += 1
+        return protocol.STATUS_UNAVAILABLE, None, str(error)
+
+    async def _run_batches(self):
+        while True:
+            batch = await self._next_batch()
+            status, results, error = await self._run(apply_writes, [(w.kind, w.items) for w in batch])
+            if status == protocol.STATUS_OK:
+                self._finish(batch, results)
+                continue
+
+            if status == protocol.STATUS_UNAVAILABLE or len(batch) == 1:
+                for write in batch:
+                    write.future.set_result((status, None, error))
+                continue
+
+            # The database refused something in the batch: apply the requests
+            # one by one so only the offending ones are rejected
+            for write in batch:
+                status, results, error = await self._run(apply_writes, [(write.kind, write.items)])
+                if status == protocol.STATUS_OK:
+                    self._finish([write], results)
+                else:
+                    write.future.set_result((status, None, error))
+
+    async def _run_sweeps(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            await asyncio.sleep(self.sweep_interval)
+            now = datetime.now()
+            future = loop.create_future()
+            await self._queue.put(_Write('sweep', [(now, now - timedelta(minutes=self.session_timeout))], future))
+            status, _, error = await future
+            if status != protocol.STATUS_OK:
+                print(f"collector sweep failed: {error}", flush=True)
+
+    async def _run_rollups(self):
+        while True:
+            await asyncio.sleep(self.rollup_interval)
+            status, days, error = await self._run(refresh_daily_rollup)
+            if status == protocol.STATUS_OK:
+                self._stats['rollup_days'] += days
+            else:
+                print(f"collector rollup refresh failed: {error}", flush=True)
+
+    async def _next_batch(self):
+        """Requests totalling up to batch_size events, or whatever arrived within flush_interval"""
+        batch = [await self._queue.get()]
+        size = len(batch[0].items)
+        deadline = time.monotonic() + self.flush_interval
+        while size < self.batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                write = self._queue.get_nowait() if remaining <= 0 else \
+                    await asyncio.wait_for(self._queue.get(), remaining)
+            except (asyncio.QueueEmpty, asyncio.TimeoutError):
+                break
+            batch.append(write)
+            size += len(write.items)
+        return batch
+
+    def _finish(self, batch, results):
+        self._stats['batches'] += 1
+        for write, value in zip(batch, results):
+            if write.kind == 'events':
+                self._stats['events'] += len(write.items)
+            elif write.kind == 'sweep':
+                self._stats['sessions_swept'] += value
+            else:
+                self._stats['sessions_ended'] += 1
+            write.future.set_result((protocol.STATUS_OK, value, ''))
+
+def apply_writes(writes):
+    """Apply (kind, items) requests in order in one transaction; returns one value per request"""
+    results = []
+    with pooled_connection() as conn:
+        cursor = get_backend().bulk_cursor(conn)
+        # Consecutive event requests are written as one run
+        for kind, run in groupby(writes, key=lambda write: write[0]):
+            run = list(run)
+            if kind == 'events':
+                write_events(cursor, [event for _, items in run for event in items])
+                results.extend(len(items) for _, items in run)
+            elif kind == 'sweep':
+                for _, [(clock_out_time, clock_in_before)] in run:
+                    results.append(len(_close_sessions(conn.cursor(), clock_out_time,
+                                                       clock_in_before=clock_in_before)))
+            else:
+                for _, [(session_id, clock_out_time)] in run:
+                    results.append(_close_session(conn.cursor(), session_id, clock_out_time))
+    return results
+
+def database_reachable():
+    try:
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+        return True
+    except Exception:
+        return False
@@ -0,0 +1,128 @@
+# database/activity.py
+from datetime import datetime, timedelta
+from itertools import groupby
+
+from database.db_connection import get_backend, pooled_connection
+from utils.activity_bitmap import (PLANE_BYTES, day_states, minute_counts, pack, session_periods, stack,
+                                   states_at, unpack)
+
+# Days a session is drawn on: the one it started on and the next. Anything
+# later is left off, which keeps the sessions behind a day one index lookup
+ACTIVITY_SPAN_DAYS = 2
+
+# Dates rebuilt per statement, as for daily_rollup
+ACTIVITY_BATCH_DAYS = 200
+
+def activity_days(session_date, clock_out, now):
+    """Dates whose activity_bitmap rows a session contributes to"""
+    last = (clock_out or now).date()
+    return [session_date + timedelta(days=offset) for offset in range(ACTIVITY_SPAN_DAYS)
+            if session_date + timedelta(days=offset) <= last]
+
+def _activity_rows(cursor, days, now):
+    """(activity_date, account_id, awake_bits, away_bits) rows for the given dates"""
+    wanted = set(days)
+    session_days = sorted({day - timedelta(days=offset) for day in days for offset in range(ACTIVITY_SPAN_DAYS)})
+    placeholders = ", ".join("?" for _ in session_days)
+    where = f"s.account_id IS NOT NULL AND s.session_date IN ({placeholders})"
+
+    cursor.execute(f"""
+        SELECT s.id, s.account_id, s.session_date, s.clock_in, s.clock_out
+        FROM sessions s
+        WHERE {where}
+    """, session_days)
+    sessions = cursor.fetchall()
+    cursor.execute(f"""
+        SELECT e.session_id, e.event_type, e.event_time
+        FROM sleep_events e
+        JOIN sessions s ON s.id = e.session_id
+        WHERE {where}
+        ORDER BY e.session_id, e.event_time, e.id
+    """, session_days)
+    events = {session_id: [(row[1], row[2]) for row in group]
+              for session_id, group in groupby(cursor.fetchall(), key=lambda row: row[0])}
+
+    states = {}
+    for session_id, account_id, session_date, clock_in, clock_out in sessions:
+        span_end = datetime(session_date.year, session_date.month, session_date.day) \
+            + timedelta(days=ACTIVITY_SPAN_DAYS)
+        periods = session_periods(clock_in, clock_out, events.get(session_id, []), now, until=span_end)
+        for day in activity_days(session_date, clock_out, now):
+            if day in wanted:
+                states[day, account_id] = day_states(day, periods, states.get((day, account_id)))
+
+    return [(day, account_id) + pack(minutes) for (day, account_id), minutes in sorted(states.items())
+            if minutes.any()]
+
+def refresh_activity(conn, days=None, now=None):
+    """Rebuild activity_bitmap for the given dates, or for every date when days is None.
+
+    Runs on the caller's connection, so it is part of the daily_rollup
+    refresh's transaction. Returns the number of rows written.
+    """
+    if now is None:
+        now = datetime.now()
+    cursor = conn.cursor()
+    if days is None:
+        cursor.execute("DELETE FROM activity_bitmap")
+        cursor.execute("SELECT DISTINCT session_date FROM sessions WHERE account_id IS NOT NULL")
+        days = {day + timedelta(days=offset) for (day,) in cursor.fetchall() for offset in range(ACTIVITY_SPAN_DAYS)}
+        delete = False
+    else:
+        delete = True
+
+    days = sorted(days)
+    written = 0
+    insert = get_backend().bulk_cursor(conn)
+    for offset in range(0, len(days), ACTIVITY_BATCH_DAYS):
+        batch = days[offset:offset + ACTIVITY_BATCH_DAYS]
+        if delete:
+            placeholders = ", ".join("?" for _ in batch)
+            cursor.execute(f"DELETE FROM activity_bitmap WHERE activity_date IN ({placeholders})", batch)
+        rows = _activity_rows(cursor, batch, now)
+        if rows:
+            insert.executemany("""
+                INSERT INTO activity_bitmap (activity_date, account_id, awake_bits, away_bits)
+                VALUES (?, ?, ?, ?)
+            """, rows)
+            written += len(rows)
+    return written
+
+def fetch_account_activity(account_id, day):
+    """An account's 1440 minute states for a day (all OFF when it has no row)"""
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT awake_bits, away_bits FROM activity_bitmap
+            WHERE activity_date = ? AND account_id = ?
+        """, (day, account_id))
+        row = cursor.fetchone()
+    if row is None:
+        return unpack(bytes(PLANE_BYTES), bytes(PLANE_BYTES))
+    return unpack(row[0], row[1])
+
+def fetch_day_planes(day):
+    """Every account's bit-planes for a day: (account_ids, awake, away), stacked one row per account"""
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT account_id, awake_bits, away_bits FROM activity_bitmap
+            WHERE activity_date = ?
+            ORDER BY account_id
+        """, (day,))
+        rows = cursor.fetchall()
+    awake, away = stack([(row[1], row[2]) for row in rows])
+    return [row[0] for row in rows], awake, away
+
+def fetch_state_counts(day, minute=None):
+    """Accounts in each state on a day: per minute as a (4, 1440) array, or at one minute as a list of 4.
+
+    Both are indexed by the state constants in utils.activity_bitmap.
+    Only accounts with a row that day are counted, so OFF means clocked
+    out between sessions.
+    """
+    _, awake, away = fetch_day_planes(day)
+    if minute is None:
+        return minute_counts(awake, away)
+    states = states_at(awake, away, minute)
+    return [int((states == state).sum()) for state in range(4)]
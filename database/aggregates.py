@@ -0,0 +1,59 @@
+# database/aggregates.py
+from itertools import groupby
+
+from utils.intervals import clip, intersection, pair_intervals, total_seconds
+
+def _session_aggregates(events, clock_out=None):
+    """The aggregate columns _aggregate_update arrives at, computed from a session's events.
+
+    Returns (sleep_seconds, idle_seconds, sleep_open_since, idle_open_since,
+    overlap_seconds, sleep_overlap_pending, idle_overlap_pending). For a
+    closed session events after the clock-out are ignored, the idle period
+    still open ends at the clock-out and an open sleep period is dropped.
+    """
+    if clock_out is not None:
+        events = [(event_type, event_time) for event_type, event_time in events if event_time <= clock_out]
+    sleep, sleep_open_since = pair_intervals(events, 'sleep', 'resume')
+    idle, idle_open_since = pair_intervals(events, 'idle_start', 'idle_end')
+    sleep_seconds = sum((end - start).total_seconds() for start, end in sleep)
+    idle_seconds = sum((end - start).total_seconds() for start, end in idle)
+
+    if clock_out is not None:
+        if idle_open_since:
+            idle.append((idle_open_since, clock_out))
+            idle_seconds += (clock_out - idle_open_since).total_seconds()
+        overlap_seconds = total_seconds(intersection(sleep, idle))
+        return sleep_seconds, idle_seconds, None, None, overlap_seconds, 0, 0
+
+    # Closed periods overlapping a period that is still open
+    sleep_pending = total_seconds(clip(idle, sleep_open_since)) if sleep_open_since else 0
+    idle_pending = total_seconds(clip(sleep, idle_open_since)) if idle_open_since else 0
+    overlap_seconds = total_seconds(intersection(sleep, idle)) + sleep_pending + idle_pending
+    return (sleep_seconds, idle_seconds, sleep_open_since, idle_open_since,
+            overlap_seconds, sleep_pending, idle_pending)
+
+def _rebuild_aggregates(cursor, session_ids):
+    """Recompute the aggregates of the given sessions from their events"""
+    placeholders = ", ".join("?" for _ in session_ids)
+    cursor.execute(f"""
+        SELECT s.id, s.clock_out, e.event_type, e.event_time
+        FROM sessions s
+        LEFT JOIN sleep_events e ON e.session_id = s.id
+        WHERE s.id IN ({placeholders})
+        ORDER BY s.id, e.event_time, e.id
+    """, list(session_ids))
+    rows = cursor.fetchall()
+
+    updates = []
+    for session_id, group in groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        events = [(row[2], row[3]) for row in group if row[2] is not None]
+        updates.append(_session_aggregates(events, group[0][1]) + (session_id,))
+
+    if updates:
+        cursor.executemany("""
+            UPDATE sessions
+            SET sleep_seconds = ?, idle_seconds = ?, sleep_open_since = ?, idle_open_since = ?,
+                overlap_seconds = ?, sleep_overlap_pending = ?, idle_overlap_pending = ?
+            WHERE id = ?
+        """, updates)
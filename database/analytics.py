@@ -0,0 +1,249 @@
+# database/analytics.py
+from datetime import datetime
+from itertools import chain
+
+import numpy as np
+
+from database.db_connection import get_backend, pooled_connection
+from database.queries import _session_filters
+
+# Event types as integer codes: the high bit is the kind (0 sleep, 1 idle)
+# and the low bit is set on the event ending a period
+_EVENT_CODE_SQL = """CASE e.event_type WHEN 'sleep' THEN 0 WHEN 'resume' THEN 1
+                                       WHEN 'idle_start' THEN 2 WHEN 'idle_end' THEN 3 END"""
+
+_MICROSECONDS_PER_DAY = 86400 * 1000000
+_MICROSECONDS_PER_MINUTE = 60 * 1000000
+
+def _minutes(microseconds):
+    """Whole minutes, truncated like int() in the row-by-row code"""
+    return np.trunc(microseconds / _MICROSECONDS_PER_MINUTE).astype(np.int64)
+
+def _epoch_microseconds(moment):
+    return int((np.datetime64(moment, 'us') - np.datetime64(0, 'us')) // np.timedelta64(1, 'us'))
+
+def fetch_report_rows(from_date=None, to_date=None, account_id=None, username_prefix=None):
+    """Session and event rows for SessionReport, read in two queries.
+
+    Times come back from the database as integer microseconds since
+    1970-01-01, so NumPy can take the rows as they are instead of
+    converting a datetime object per value. Sessions are ordered by id and
+    events by session, time and id, which the session/time index gives
+    for free. Filters work as in queries.fetch_sessions_with_idle.
+    """
+    backend = get_backend()
+    conditions, params = _session_filters(from_date, to_date, account_id, username_prefix)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT s.id, s.account_id, a.username, {backend.epoch_microseconds('s.session_date')},
+                   {backend.epoch_microseconds('s.clock_in')}, {backend.epoch_microseconds('s.clock_out')},
+                   s.total_work_minutes
+            FROM sessions s
+            JOIN accounts a ON s.account_id = a.id
+            {where}
+            ORDER BY s.id
+        """, params)
+        sessions = cursor.fetchall()
+        # Without filters the joins only cost time; events of sessions left
+        # out above are dropped by SessionReport
+        cursor.execute(f"""
+            SELECT e.session_id, {_EVENT_CODE_SQL}, {backend.epoch_microseconds('e.event_time')}
+            FROM sleep_events e
+            {"JOIN sessions s ON e.session_id = s.id JOIN accounts a ON s.account_id = a.id" if where else ""}
+            {where}{" AND " if where else "WHERE "}e.event_type IN ('sleep', 'resume', 'idle_start', 'idle_end')
+            ORDER BY e.session_id, e.event_time, e.id
+        """, params)
+        events = cursor.fetchall()
+    return sessions, events
+
+class SessionReport:
+    """Sessions and their sleep/idle events for a date range, held as NumPy arrays.
+
+    Accounts are numbered 0..n-1 in username order (account_index) and
+    events refer to sessions by position (event_session), so every
+    group-by is a bincount over small integers. Minutes follow the
+    sessions table: closed sessions keep their stored work minutes, open
+    ones count up to now, sleep and idle are paired as
+    utils.intervals.pair_intervals does and away time is their union.
+    Events after a closed session's clock-out are left out.
+    """
+
+    def __init__(self, sessions, events, now=None):
+        """Build from fetch_report_rows() rows (same order, times in microseconds since 1970-01-01)"""
+        self.now = _epoch_microseconds(now or datetime.now())
+
+        count = len(sessions)
+        columns = list(zip(*sessions)) or [()] * 7
+        self.session_id = np.array(columns[0], dtype=np.int64)
+        account_ids = np.array(columns[1], dtype=np.int64)
+        self.session_day = np.array(columns[3], dtype=np.int64) // _MICROSECONDS_PER_DAY
+        self.clock_in = np.array(columns[4], dtype=np.int64)
+        clock_out = np.array(columns[5], dtype=np.float64)
+        self.is_open = np.isnan(clock_out)
+        self.clock_out = np.where(self.is_open, 0, clock_out).astype(np.int64)
+        stored_work = np.array(columns[6], dtype=np.float64)
+        self.stored_work = np.where(np.isnan(stored_work), -1, stored_work).astype(np.int64)
+
+        # Account positions in username order
+        self.account_id, first, self.account_index = np.unique(account_ids, return_index=True,
+                                                               return_inverse=True)
+        self.account_index = self.account_index.reshape(count)
+        self.username = np.array(columns[2], dtype=object)[first]
+        by_name = np.argsort(self.username.astype(str), kind='stable')
+        rank = np.empty_like(by_name)
+        rank[by_name] = np.arange(len(by_name))
+        self.account_id, self.username = self.account_id[by_name], self.username[by_name]
+        self.account_index = rank[self.account_index]
+
+        events = np.fromiter(chain.from_iterable(events), np.int64, 3 * len(events)).reshape(-1, 3)
+        event_sessions, codes, times = events.T
+        self.event_session = np.searchsorted(self.session_id, event_sessions).clip(0, max(0, count - 1))
+        loaded = self.session_id[self.event_session] == event_sessions if count else np.zeros(len(codes), bool)
+        self.event_session, self.event_code, self.event_time = \
+            self.event_session[loaded], codes[loaded], times[loaded]
+        # Like the stored aggregates, a closed session ignores events after its clock-out
+        in_session = self.is_open[self.event_session] | (self.event_time <= self.clock_out[self.event_session])
+        self.event_session, self.event_code, self.event_time = \
+            self.event_session[in_session], self.event_code[in_session], self.event_time[in_session]
+
+        self.work_minutes, self.sleep_minutes, self.idle_minutes, self.away_minutes = self._session_minutes()
+
+    @classmethod
+    def load(cls, from_date=None, to_date=None, account_id=None, username_prefix=None, now=None):
+        """Report over the sessions matching the filters (see fetch_report_rows)"""
+        return cls(*fetch_report_rows(from_date, to_date, account_id, username_prefix), now)
+
+    def _session_minutes(self):
+        """(work, sleep, idle, away) minutes per session"""
+        count = len(self.session_id)
+        end_of_session = np.where(self.is_open, self.now, self.clock_out)
+
+        starts, ends, owners = [], [], []
+        for kind in (0, 1):
+            # Each kind's events in session and time order
+            index = np.flatnonzero(self.event_code >> 1 == kind)
+            session, code, time = self.event_session[index], self.event_code[index], self.event_time[index]
+            same_session = session[1:] == session[:-1]
+            is_start = (code & 1) == 0
+            # An end pairs with the event just before it when that is a start:
+            # a later start replaces an earlier one and stray ends are skipped
+            closes = np.flatnonzero(same_session & ~is_start[1:] & is_start[:-1]) + 1
+            starts.append(time[closes - 1])
+            ends.append(time[closes])
+            owners.append(session[closes])
+
+        # Left over from the idle pass: an idle period still open runs to the
+        # clock-out, or to now; an open sleep period is not counted. One
+        # started after that end (a clock running ahead) counts as nothing
+        open_idle = np.flatnonzero(is_start & np.append(~same_session, True))
+        starts.append(time[open_idle])
+        ends.append(np.maximum(end_of_session[session[open_idle]], time[open_idle]))
+        owners.append(session[open_idle])
+
+        lengths = [end - start for start, end in zip(starts, ends)]
+        sleep = np.bincount(owners[0], lengths[0], minlength=count)
+        idle = np.bincount(np.concatenate(owners[1:]), np.concatenate(lengths[1:]), minlength=count)
+        away = _minutes(self._union_length(np.concatenate(owners), np.concatenate(starts),
+                                           np.concatenate(ends), count))
+
+        live_work = np.maximum(0, _minutes(end_of_session - self.clock_in) - away)
+        work = np.where(self.stored_work >= 0, self.stored_work, live_work)
+        return work, _minutes(sleep), _minutes(idle), away
+
+    @staticmethod
+    def _union_length(owners, starts, ends, count):
+        """Time per session covered by any of the intervals.
+
+        Each session's times are shifted to start at zero and offset by
+        session * span, so one integer sort puts every interval in session
+        and start order, and a running maximum of the ends tells how much
+        of each interval is not covered by an earlier one.
+        """
+        keep = ends > starts
+        owners, starts, ends = owners[keep], starts[keep], ends[keep]
+        first = np.full(count, np.iinfo(np.int64).max)
+        np.minimum.at(first, owners, starts)
+        starts, ends = starts - first[owners], ends - first[owners]
+        span = int(ends.max(initial=0)) + 1
+        covered = np.zeros(count)
+        # Sessions per pass, so session * span stays inside int64
+        block = max(1, (1 << 62) // span)
+        for low in range(0, count, block):
+            part = np.flatnonzero((owners >= low) & (owners < low + block)) if count > block else slice(None)
+            offset = (owners[part] - low) * span
+            order = np.argsort(offset + starts[part])
+            start, end = (offset + starts[part])[order], (offset + ends[part])[order]
+            reach = np.maximum.accumulate(end)
+            new = end - np.maximum(start, np.concatenate(([0], reach[:-1])))
+            covered += np.bincount(owners[part][order], np.maximum(new, 0), minlength=count)
+        return covered
+
+    def _column(self, column):
+        return {'work': self.work_minutes, 'sleep': self.sleep_minutes,
+                'idle': self.idle_minutes, 'away': self.away_minutes}[column]
+
+    def _totals(self, groups, group_count):
+        """(work, sleep, idle, sessions) summed per group"""
+        return tuple(np.bincount(groups, values, minlength=group_count).astype(np.int64)
+                     for values in (self.work_minutes, self.sleep_minutes, self.idle_minutes,
+                                    np.ones(len(groups))))
+
+    def by_account(self):
+        """Rows of (account_id, username, work, sleep, idle, session_count, days_worked), by username"""
+        count = len(self.account_id)
+        work, sleep, idle, sessions = self._totals(self.account_index, count)
+        account_days = np.unique(self.account_index * (1 << 32) + self.session_day)
+        days_worked = np.bincount(account_days >> 32, minlength=count)
+        return list(zip(self.account_id.tolist(), self.username.tolist(), work.tolist(), sleep.tolist(),
+                        idle.tolist(), sessions.tolist(), days_worked.tolist()))
+
+    def by_day(self):
+        """Rows of (date, work, sleep, idle, session_count, employees), by date"""
+        days, day_index = np.unique(self.session_day, return_inverse=True)
+        count = len(days)
+        work, sleep, idle, sessions = self._totals(day_index, count)
+        day_accounts = np.unique(day_index * (1 << 32) + self.account_index)
+        employees = np.bincount(day_accounts >> 32, minlength=count)
+        return list(zip(days.astype('datetime64[D]').tolist(), work.tolist(), sleep.tolist(), idle.tolist(),
+                        sessions.tolist(), employees.tolist()))
+
+    def distribution(self, column='work', bin_minutes=30):
+        """Session counts per bin of the column's minutes: (bin edges, counts)"""
+        values = self._column(column)
+        edges = np.arange(0, int(values.max(initial=0)) // bin_minutes * bin_minutes + 2 * bin_minutes,
+                          bin_minutes)
+        counts, edges = np.histogram(values, bins=edges)
+        return edges.tolist(), counts.tolist()
+
+    def percentiles_by_account(self, column='work', percentiles=(50, 90)):
+        """Rows of (account_id, username, value at each percentile) over each account's sessions.
+
+        Values are taken at the lower nearest rank without interpolation,
+        so each is the minutes of a session the account actually had.
+        """
+        values = self._column(column)
+        ordered = values[np.lexsort((values, self.account_index))]
+        counts = np.bincount(self.account_index, minlength=len(self.account_id))
+        offsets = np.cumsum(counts) - counts
+        present = counts > 0
+        columns = [ordered[offsets[present] + (counts[present] - 1) * percentile // 100].tolist()
+                   for percentile in percentiles]
+        return list(zip(self.account_id[present].tolist(), self.username[present].tolist(), *columns))
+
+    def top_accounts(self, column='work', n=10, ascending=False):
+        """The n accounts with the most (or least) total minutes: rows of (account_id, username, minutes)"""
+        totals = np.bincount(self.account_index, self._column(column),
+                             minlength=len(self.account_id)).astype(np.int64)
+        # Ties go to the lower account id; argpartition finds the n in linear
+        # time and only those n are sorted
+        key = (totals if ascending else -totals) * (1 << 32) + self.account_id
+        n = min(n, len(totals))
+        if n <= 0:
+            return []
+        chosen = np.argpartition(key, n - 1)[:n]
+        chosen = chosen[np.argsort(key[chosen])]
+        return list(zip(self.account_id[chosen].tolist(), self.username[chosen].tolist(),
+                        totals[chosen].tolist()))
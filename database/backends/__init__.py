@@ -0,0 +1,23 @@
+# database/backends/__init__.py
+from database.backends.base import Backend
+from database.backends.sqlite import SqliteBackend
+from database.backends.sqlserver import SqlServerBackend
+
+BACKENDS = {
+    SqlServerBackend.name: SqlServerBackend,
+    SqliteBackend.name: SqliteBackend,
+}
+
+DEFAULT_BACKEND = SqlServerBackend.name
+
+def backend_class(config):
+    """Return the backend class named by the config (SQL Server by default)"""
+    name = config.get("backend", DEFAULT_BACKEND)
+    try:
+        return BACKENDS[name]
+    except KeyError:
+        raise ValueError(f"Unknown database backend '{name}'. Expected one of: {', '.join(BACKENDS)}")
+
+def create_backend(config, config_dir=None):
+    """Build the storage backend described by a db_config.json dictionary"""
+    return backend_class(config)(config, config_dir)
@@ -0,0 +1,54 @@
+# database/backends/base.py
+
+class Backend:
+    """Connection factory plus the few SQL dialect differences queries.py relies on"""
+
+    name = None
+    required_config_keys = set()
+
+    def __init__(self, config, config_dir=None):
+        self.config = config
+        self.config_dir = config_dir
+
+    def connect(self):
+        """Open a new DB-API connection"""
+        raise NotImplementedError
+
+    def top(self, n):
+        """Row limit placed right after SELECT"""
+        return ""
+
+    def limit(self, n):
+        """Row limit placed at the end of the statement"""
+        return ""
+
+    def output(self, *columns):
+        """Clause placed before VALUES/WHERE that returns written columns"""
+        return ""
+
+    def returning(self, *columns):
+        """Clause placed at the end of the statement that returns written columns"""
+        return ""
+
+    def seconds_between(self, start, end):
+        """SQL expression for the fractional seconds from start to end"""
+        raise NotImplementedError
+
+    def epoch_microseconds(self, value):
+        """SQL expression for the whole microseconds from 1970-01-01 to value"""
+        raise NotImplementedError
+
+    def row_version_watermark(self):
+        """SELECT returning the lowest sessions.row_version that may not be committed yet"""
+        raise NotImplementedError
+
+    def bulk_cursor(self, conn):
+        """Cursor tuned for executemany over many rows"""
+        return conn.cursor()
+
+    def limit_statements(self, conn, token):
+        """Stop statements on conn once the CancelToken is cancelled or times out; None lifts the limit"""
+
+    def login_procedure(self):
+        """Call of a stored procedure doing login_session in one round trip, or None"""
+        return None
@@ -0,0 +1,311 @@
+# database/backends/sqlite.py
+import os
+import sqlite3
+import threading
+from datetime import date, datetime
+
+from database.aggregates import _rebuild_aggregates
+from database.backends.base import Backend
+
+# Mirrors the tables, constraints, indexes and default users in SQL.txt
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS accounts (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    username NVARCHAR(50) NOT NULL UNIQUE,
+    password NVARCHAR(255) NOT NULL,
+    role NVARCHAR(20) NOT NULL CHECK (role IN ('admin', 'employee')),
+    is_active INTEGER NOT NULL DEFAULT 1,
+    registered_mac_address NVARCHAR(17)
+);
+
+CREATE TABLE IF NOT EXISTS sessions (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER REFERENCES accounts(id),
+    clock_in DATETIME NOT NULL,
+    clock_out DATETIME,
+    total_work_minutes INTEGER,
+    session_date DATE NOT NULL DEFAULT (date('now', 'localtime')),
+    sleep_minutes INTEGER DEFAULT 0,
+    notes NVARCHAR(255),
+    device_mac_address NVARCHAR(17),
+    sleep_seconds FLOAT NOT NULL DEFAULT 0,
+    idle_seconds FLOAT NOT NULL DEFAULT 0,
+    sleep_open_since DATETIME,
+    idle_open_since DATETIME,
+    row_version INTEGER NOT NULL DEFAULT 0,
+    overlap_seconds FLOAT NOT NULL DEFAULT 0,
+    sleep_overlap_pending FLOAT NOT NULL DEFAULT 0,
+    idle_overlap_pending FLOAT NOT NULL DEFAULT 0
+);
+
+CREATE TABLE IF NOT EXISTS sleep_events (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER REFERENCES accounts(id),
+    session_id INTEGER REFERENCES sessions(id),
+    event_type NVARCHAR(10) CHECK (event_type IN ('sleep', 'resume', 'idle_start', 'idle_end')),
+    event_time DATETIME NOT NULL,
+    source NVARCHAR(10) DEFAULT 'system',
+    event_uid NVARCHAR(32)
+);
+
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    account_id INTEGER REFERENCES accounts(id),
+    mood NVARCHAR(20) NOT NULL CHECK (mood IN ('Terrible', 'Poor', 'Good', 'Great', 'Excellent')),
+    comment TEXT,
+    reasons NVARCHAR(500),
+    is_anonymous INTEGER NOT NULL DEFAULT 0,
+    submitted_at DATETIME NOT NULL DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now', 'localtime'))
+);
+
+CREATE TABLE IF NOT EXISTS daily_rollup (
+    account_id INTEGER NOT NULL REFERENCES accounts(id),
+    rollup_date DATE NOT NULL,
+    work_minutes INTEGER NOT NULL DEFAULT 0,
+    sleep_minutes INTEGER NOT NULL DEFAULT 0,
+    idle_minutes INTEGER NOT NULL DEFAULT 0,
+    session_count INTEGER NOT NULL DEFAULT 0,
+    first_clock_in DATETIME,
+    last_clock_out DATETIME,
+    device_count INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (account_id, rollup_date)
+) WITHOUT ROWID;
+
+CREATE TABLE IF NOT EXISTS rollup_watermark (
+    name NVARCHAR(50) PRIMARY KEY,
+    watermark INTEGER
+);
+
+CREATE TABLE IF NOT EXISTS activity_bitmap (
+    activity_date DATE NOT NULL,
+    account_id INTEGER NOT NULL REFERENCES accounts(id),
+    awake_bits BLOB NOT NULL,
+    away_bits BLOB NOT NULL,
+    PRIMARY KEY (activity_date, account_id)
+) WITHOUT ROWID;
+
+-- Counter behind sessions.row_version, standing in for SQL Server's ROWVERSION
+CREATE TABLE IF NOT EXISTS row_versions (
+    table_name NVARCHAR(50) PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+INSERT OR IGNORE INTO row_versions (table_name, version) VALUES ('sessions', 0);
+
+CREATE INDEX IF NOT EXISTS IX_sessions_mac_address ON sessions(device_mac_address);
+CREATE INDEX IF NOT EXISTS IX_accounts_mac_address ON accounts(registered_mac_address);
+CREATE INDEX IF NOT EXISTS IX_sleep_events_idle ON sleep_events(session_id, event_type, event_time)
+    WHERE event_type IN ('idle_start', 'idle_end');
+CREATE INDEX IF NOT EXISTS IX_sleep_events_session_time ON sleep_events(session_id, event_time);
+CREATE INDEX IF NOT EXISTS IX_sessions_date_clock_in ON sessions(session_date DESC, clock_in DESC, id DESC);
+CREATE INDEX IF NOT EXISTS IX_sessions_account_date ON sessions(account_id, session_date);
+CREATE INDEX IF NOT EXISTS IX_sessions_account_open ON sessions(account_id, clock_in) WHERE clock_out IS NULL;
+-- LIKE is case-insensitive in SQLite, so prefix searches need NOCASE indexes
+CREATE INDEX IF NOT EXISTS IX_accounts_username_nocase ON accounts(username COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS IX_sessions_mac_address_nocase ON sessions(device_mac_address COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS IX_sessions_open ON sessions(clock_in) WHERE clock_out IS NULL;
+
+INSERT OR IGNORE INTO accounts (username, password, role)
+VALUES ('admin1', 'admin123', 'admin'), ('emp1', 'emp123', 'employee');
+"""
+
+def _backfill_overlap(conn):
+    """Rebuild the aggregates of sessions with events, which sets their sleep/idle overlap"""
+    session_ids = [row[0] for row in conn.execute(
+        "SELECT DISTINCT session_id FROM sleep_events WHERE session_id IS NOT NULL")]
+    cursor = conn.cursor()
+    for offset in range(0, len(session_ids), 500):
+        _rebuild_aggregates(cursor, session_ids[offset:offset + 500])
+
+# Columns added after the first release: (table, column, definition) groups,
+# each with the statement (or function of the connection) that backfills
+# them on an existing database
+MIGRATIONS = [
+    (
+        [
+            ("sessions", "sleep_seconds", "FLOAT NOT NULL DEFAULT 0"),
+            ("sessions", "idle_seconds", "FLOAT NOT NULL DEFAULT 0"),
+            ("sessions", "sleep_open_since", "DATETIME"),
+            ("sessions", "idle_open_since", "DATETIME"),
+        ],
+        """
+        WITH ordered AS (
+            SELECT session_id, event_type, event_time,
+                   LAG(event_type) OVER w AS prev_type,
+                   LAG(event_time) OVER w AS prev_time,
+                   LEAD(event_type) OVER w AS next_type
+            FROM sleep_events
+            WINDOW w AS (
+                PARTITION BY session_id, event_type IN ('sleep', 'resume')
+                ORDER BY event_time, id
+            )
+        ),
+        totals AS (
+            SELECT session_id,
+                   SUM(CASE WHEN event_type = 'resume' AND prev_type = 'sleep'
+                            THEN (julianday(event_time) - julianday(prev_time)) * 86400.0 ELSE 0 END) AS sleep_seconds,
+                   SUM(CASE WHEN event_type = 'idle_end' AND prev_type = 'idle_start'
+                            THEN (julianday(event_time) - julianday(prev_time)) * 86400.0 ELSE 0 END) AS idle_seconds,
+                   MAX(CASE WHEN event_type = 'sleep' AND next_type IS NULL THEN event_time END) AS sleep_open_since,
+                   MAX(CASE WHEN event_type = 'idle_start' AND next_type IS NULL THEN event_time END) AS idle_open_since
+            FROM ordered
+            GROUP BY session_id
+        )
+        UPDATE sessions
+        SET sleep_seconds = totals.sleep_seconds,
+            idle_seconds = totals.idle_seconds
+                + CASE WHEN sessions.clock_out IS NOT NULL AND totals.idle_open_since IS NOT NULL
+                       THEN (julianday(sessions.clock_out) - julianday(totals.idle_open_since)) * 86400.0
+                       ELSE 0 END,
+            sleep_open_since = CASE WHEN sessions.clock_out IS NULL THEN totals.sleep_open_since END,
+            idle_open_since = CASE WHEN sessions.clock_out IS NULL THEN totals.idle_open_since END
+        FROM totals
+        WHERE totals.session_id = sessions.id;
+        """,
+    ),
+    # Existing rows stay at 0; the first rollup refresh has no watermark and rebuilds everything
+    ([("sessions", "row_version", "INTEGER NOT NULL DEFAULT 0")], None),
+    # Only events replayed from an offline journal carry a uid
+    ([("sleep_events", "event_uid", "NVARCHAR(32)")], None),
+    (
+        [
+            ("sessions", "overlap_seconds", "FLOAT NOT NULL DEFAULT 0"),
+            ("sessions", "sleep_overlap_pending", "FLOAT NOT NULL DEFAULT 0"),
+            ("sessions", "idle_overlap_pending", "FLOAT NOT NULL DEFAULT 0"),
+        ],
+        _backfill_overlap,
+    ),
+]
+
+# Objects that depend on migrated columns, created once MIGRATIONS have run
+SCHEMA_AFTER_MIGRATIONS = """
+CREATE INDEX IF NOT EXISTS IX_sessions_row_version ON sessions(row_version);
+
+CREATE UNIQUE INDEX IF NOT EXISTS UX_sleep_events_uid ON sleep_events(event_uid) WHERE event_uid IS NOT NULL;
+
+-- Give every written session the next row version (recursive_triggers is
+-- off, so the stamping UPDATE does not fire the update trigger again)
+CREATE TRIGGER IF NOT EXISTS TR_sessions_insert_row_version AFTER INSERT ON sessions
+BEGIN
+    UPDATE row_versions SET version = version + 1 WHERE table_name = 'sessions';
+    UPDATE sessions SET row_version = (SELECT version FROM row_versions WHERE table_name = 'sessions')
+    WHERE id = NEW.id;
+END;
+
+CREATE TRIGGER IF NOT EXISTS TR_sessions_update_row_version AFTER UPDATE ON sessions
+BEGIN
+    UPDATE row_versions SET version = version + 1 WHERE table_name = 'sessions';
+    UPDATE sessions SET row_version = (SELECT version FROM row_versions WHERE table_name = 'sessions')
+    WHERE id = NEW.id;
+END;
+"""
+
+def _adapt_datetime(value):
+    return value.isoformat(" ")
+
+def _adapt_date(value):
+    return value.isoformat()
+
+def _convert_datetime(value):
+    text = value.decode()
+    if "." in text:
+        # Pad or trim fractional seconds so every Python version parses them
+        head, fraction = text.split(".", 1)
+        text = f"{head}.{fraction[:6].ljust(6, '0')}"
+    return datetime.fromisoformat(text)
+
+def _convert_date(value):
+    return date.fromisoformat(value.decode()[:10])
+
+sqlite3.register_adapter(datetime, _adapt_datetime)
+sqlite3.register_adapter(date, _adapt_date)
+sqlite3.register_converter("DATETIME", _convert_datetime)
+sqlite3.register_converter("DATE", _convert_date)
+
+# Virtual machine instructions between checks of a CancelToken
+PROGRESS_STEPS = 10000
+
+class SqliteBackend(Backend):
+    """Single-file SQLite database with the same schema as SQL.txt"""
+
+    name = "sqlite"
+    required_config_keys = set()
+
+    _initialized = set()
+    _init_lock = threading.Lock()
+
+    def __init__(self, config, config_dir=None):
+        super().__init__(config, config_dir)
+        path = config.get("path", "sleep_tracker.db")
+        if path != ":memory:" and not os.path.isabs(path) and config_dir:
+            path = os.path.join(config_dir, path)
+        self.path = path
+
+    def connect(self):
+        conn = sqlite3.connect(
+            self.path,
+            timeout=self.config.get("busy_timeout", 30),
+            detect_types=sqlite3.PARSE_DECLTYPES,
+            check_same_thread=False,
+        )
+        conn.execute("PRAGMA foreign_keys = ON")
+        if self.path != ":memory:":
+            conn.execute("PRAGMA journal_mode = WAL")
+            conn.execute("PRAGMA synchronous = NORMAL")
+        self._ensure_schema(conn)
+        return conn
+
+    def _ensure_schema(self, conn):
+        if self.path != ":memory:" and self.path in self._initialized:
+            return
+        with self._init_lock:
+            if self.path in self._initialized:
+                return
+            conn.executescript(SCHEMA)
+            self._migrate(conn)
+            conn.executescript(SCHEMA_AFTER_MIGRATIONS)
+            conn.commit()
+            if self.path != ":memory:":
+                self._initialized.add(self.path)
+
+    def _migrate(self, conn):
+        """Add columns missing from databases created by an older schema"""
+        for columns, backfill in MIGRATIONS:
+            added = False
+            for table, column, definition in columns:
+                existing = {row[1] for row in conn.execute(f"PRAGMA table_info({table})")}
+                if column not in existing:
+                    conn.execute(f"ALTER TABLE {table} ADD COLUMN {column} {definition}")
+                    added = True
+            if added and callable(backfill):
+                backfill(conn)
+            elif added and backfill:
+                conn.executescript(backfill)
+
+    def limit(self, n):
+        return f" LIMIT {int(n)}"
+
+    def returning(self, *columns):
+        return " RETURNING " + ", ".join(columns)
+
+    def seconds_between(self, start, end):
+        return f"((julianday({end}) - julianday({start})) * 86400.0)"
+
+    def epoch_microseconds(self, value):
+        # Values are stored as 'YYYY-MM-DD HH:MM:SS[.ffffff]'. SQLite's date
+        # functions round to milliseconds, so they only see the whole seconds
+        # and the fraction is read from the text, padded to six digits since
+        # some columns hold fewer (feedback.submitted_at has milliseconds)
+        return f"(CAST(strftime('%s', substr({value}, 1, 19)) AS INTEGER) * 1000000 " \
+               f"+ CAST(substr(substr({value}, 21) || '000000', 1, 6) AS INTEGER))"
+
+    def limit_statements(self, conn, token):
+        # SQLite calls the handler every PROGRESS_STEPS virtual machine
+        # instructions and aborts the statement once it returns true
+        if token is None:
+            conn.set_progress_handler(None, 0)
+        else:
+            conn.set_progress_handler(token.cancelled, PROGRESS_STEPS)
+
+    def row_version_watermark(self):
+        # Writers are serialized, so every version up to the counter is committed
+        return "SELECT version + 1 FROM row_versions WHERE table_name = 'sessions'"
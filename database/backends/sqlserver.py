@@ -0,0 +1,54 @@
+# database/backends/sqlserver.py
+import math
+
+from database.backends.base import Backend
+
+class SqlServerBackend(Backend):
+    """Microsoft SQL Server through the ODBC Driver 17"""
+
+    name = "sqlserver"
+    required_config_keys = {"server", "database", "username", "password"}
+
+    def connect(self):
+        import pyodbc
+
+        config = self.config
+        return pyodbc.connect(
+            f"DRIVER={{{config.get('driver', 'ODBC Driver 17 for SQL Server')}}};"
+            f"SERVER={config['server']};"
+            f"DATABASE={config['database']};"
+            f"UID={config['username']};"
+            f"PWD={config['password']};"
+        )
+
+    def top(self, n):
+        return f"TOP {int(n)} "
+
+    def output(self, *columns):
+        return "OUTPUT " + ", ".join(f"INSERTED.{column}" for column in columns)
+
+    def seconds_between(self, start, end):
+        return f"(DATEDIFF_BIG(MILLISECOND, {start}, {end}) / 1000.0)"
+
+    def epoch_microseconds(self, value):
+        return f"DATEDIFF_BIG(MICROSECOND, '19700101', {value})"
+
+    def row_version_watermark(self):
+        return "SELECT MIN_ACTIVE_ROWVERSION()"
+
+    def bulk_cursor(self, conn):
+        cursor = conn.cursor()
+        # Send executemany parameters as one array instead of a round trip per row
+        cursor.fast_executemany = True
+        return cursor
+
+    def limit_statements(self, conn, token):
+        # pyodbc can only cancel through the cursor running a statement,
+        # which the pool never sees, so a token's deadline becomes the
+        # connection's query timeout and cancel() takes effect when the
+        # call next borrows a connection
+        remaining = None if token is None else token.remaining()
+        conn.timeout = 0 if remaining is None else max(1, math.ceil(remaining))
+
+    def login_procedure(self):
+        return "EXEC LoginSession ?, ?, ?, ?"
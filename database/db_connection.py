@@ -1,19 +1,317 @@
-import pyodbc
 import json
 import os
+import threading
+import time
+from contextlib import contextmanager
+
+from database.backends import create_backend
+
+CONFIG_PATH = os.path.join(os.path.dirname(__file__), "../config/db_config.json")
+
+# Pool defaults, overridable from db_config.json
+DEFAULT_POOL_MIN_SIZE = 1
+DEFAULT_POOL_MAX_SIZE = 10
+DEFAULT_POOL_IDLE_TIMEOUT = 300       # seconds an idle connection is kept
+DEFAULT_POOL_CHECKOUT_TIMEOUT = 30    # seconds to wait for a free connection
+DEFAULT_POOL_PING_AFTER = 10          # ping connections idle longer than this
+
+_config = None
+_backend = None
+_config_lock = threading.Lock()
+
+_pool = None
+_pool_lock = threading.Lock()
+
+_local = threading.local()   # cancel_token: the CancelToken of the work on this thread
 
 def load_db_config():
-    config_path = os.path.join(os.path.dirname(__file__), "../config/db_config.json")
-    with open(config_path, "r") as file:
-        return json.load(file)
+    """Load the database configuration once and cache it"""
+    global _config
+    if _config is None:
+        with _config_lock:
+            if _config is None:
+                with open(CONFIG_PATH, "r") as file:
+                    _config = json.load(file)
+    return _config
+
+def reload_db_config():
+    """Drop the cached configuration and the pool built from it"""
+    global _config, _backend
+    with _config_lock:
+        _config = None
+        _backend = None
+    close_pool()
+
+def get_backend():
+    """Return the storage backend selected by the config's "backend" key"""
+    global _backend
+    if _backend is None:
+        config = load_db_config()
+        with _config_lock:
+            if _backend is None:
+                _backend = create_backend(config, os.path.dirname(os.path.abspath(CONFIG_PATH)))
+    return _backend
+
+def _connect():
+    return get_backend().connect()
+
+class PoolTimeout(Exception):
+    """Raised when no connection becomes available in time"""
+
+class ConnectionPool:
+    """Thread-safe pool of reusable database connections"""
+
+    def __init__(self, connect, min_size=DEFAULT_POOL_MIN_SIZE, max_size=DEFAULT_POOL_MAX_SIZE,
+                 idle_timeout=DEFAULT_POOL_IDLE_TIMEOUT, checkout_timeout=DEFAULT_POOL_CHECKOUT_TIMEOUT,
+                 ping_after=DEFAULT_POOL_PING_AFTER):
+        if max_size < 1 or min_size < 0 or min_size > max_size:
+            raise ValueError("Invalid pool size: min_size must be between 0 and max_size")
+
+        self._connect = connect
+        self.min_size = min_size
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.checkout_timeout = checkout_timeout
+        self.ping_after = ping_after
+
+        self._idle = []          # (connection, last_used) pairs, most recent last
+        self._size = 0           # connections currently open, idle or checked out
+        self._closed = False
+        self._cond = threading.Condition()
+
+    def acquire(self):
+        """Check out a healthy connection, opening one if the pool has room"""
+        deadline = time.monotonic() + self.checkout_timeout
+
+        while True:
+            with self._cond:
+                if self._closed:
+                    raise RuntimeError("Connection pool is closed")
+
+                self._evict_idle_locked()
+
+                if self._idle:
+                    conn, last_used = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                    conn, last_used = None, None
+                else:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        raise PoolTimeout(f"No database connection available after {self.checkout_timeout}s")
+                    self._cond.wait(remaining)
+                    continue
+
+            if conn is None:
+                try:
+                    return self._connect()
+                except Exception:
+                    self._forget()
+                    raise
+
+            if time.monotonic() - last_used < self.ping_after or self._is_healthy(conn):
+                return conn
+
+            self._discard(conn)
+
+    def release(self, conn, broken=False):
+        """Return a connection to the pool, or drop it if it is unusable"""
+        with self._cond:
+            if not broken and not self._closed:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+                return
+
+        self._discard(conn)
+
+    def close(self):
+        """Close every idle connection and refuse further checkouts"""
+        with self._cond:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+            self._cond.notify_all()
+
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def prefill(self):
+        """Open connections until min_size is reached"""
+        while True:
+            with self._cond:
+                if self._closed or self._size >= self.min_size:
+                    return
+                self._size += 1
+            try:
+                conn = self._connect()
+            except Exception:
+                self._forget()
+                raise
+            self.release(conn)
+
+    def stats(self):
+        """Current pool usage, for diagnostics"""
+        with self._cond:
+            return {
+                'size': self._size,
+                'idle': len(self._idle),
+                'in_use': self._size - len(self._idle),
+                'max_size': self.max_size,
+            }
+
+    def _evict_idle_locked(self):
+        """Close connections idle past idle_timeout, keeping min_size open"""
+        if not self._idle or self.idle_timeout is None:
+            return
+
+        cutoff = time.monotonic() - self.idle_timeout
+        keep = []
+        expired = []
+        for conn, last_used in self._idle:
+            if last_used < cutoff and self._size - len(expired) > self.min_size:
+                expired.append(conn)
+            else:
+                keep.append((conn, last_used))
+
+        if expired:
+            self._idle = keep
+            self._size -= len(expired)
+            for conn in expired:
+                try:
+                    conn.close()
+                except Exception:
+                    pass
+
+    def _is_healthy(self, conn):
+        try:
+            cursor = conn.cursor()
+            cursor.execute("SELECT 1")
+            cursor.fetchone()
+            cursor.close()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        self._forget()
+
+    def _forget(self):
+        with self._cond:
+            self._size -= 1
+            self._cond.notify()
+
+def get_pool():
+    """Return the process-wide pool, creating it from the cached config"""
+    global _pool
+    if _pool is None:
+        with _pool_lock:
+            if _pool is None:
+                config = load_db_config()
+                _pool = ConnectionPool(
+                    _connect,
+                    min_size=config.get("pool_min_size", DEFAULT_POOL_MIN_SIZE),
+                    max_size=config.get("pool_max_size", DEFAULT_POOL_MAX_SIZE),
+                    idle_timeout=config.get("pool_idle_timeout", DEFAULT_POOL_IDLE_TIMEOUT),
+                    checkout_timeout=config.get("pool_checkout_timeout", DEFAULT_POOL_CHECKOUT_TIMEOUT),
+                    ping_after=config.get("pool_ping_after", DEFAULT_POOL_PING_AFTER),
+                )
+                try:
+                    _pool.prefill()
+                except Exception:
+                    pass
+    return _pool
+
+def close_pool():
+    """Close the process-wide pool, if one was created"""
+    global _pool
+    with _pool_lock:
+        pool, _pool = _pool, None
+    if pool is not None:
+        pool.close()
+
+class QueryCancelled(Exception):
+    """Raised when database work is stopped through its CancelToken"""
+
+class CancelToken:
+    """Stops the database work of a background call once cancelled or past its timeout.
+
+    Work run inside "with token:" gets its pooled connections limited by
+    the backend (Backend.limit_statements), so a running statement stops
+    where the backend allows it, and borrowing another connection raises
+    QueryCancelled. The timeout, in seconds, counts from entering the
+    block. cancel() may be called from any thread.
+    """
+
+    def __init__(self, timeout=None):
+        self.timeout = timeout
+        self.deadline = None
+        self._cancelled = threading.Event()
+
+    def cancel(self):
+        self._cancelled.set()
+
+    def cancelled(self):
+        """True once cancelled or past the deadline"""
+        return self._cancelled.is_set() or (self.deadline is not None and time.monotonic() >= self.deadline)
+
+    def remaining(self):
+        """Seconds left before the deadline, or None without a timeout"""
+        return None if self.deadline is None else max(0.0, self.deadline - time.monotonic())
+
+    def check(self):
+        if self.cancelled():
+            raise QueryCancelled("Query cancelled")
+
+    def __enter__(self):
+        if self.timeout is not None:
+            self.deadline = time.monotonic() + self.timeout
+        self._outer = getattr(_local, "cancel_token", None)
+        _local.cancel_token = self
+        return self
+
+    def __exit__(self, *exc_info):
+        _local.cancel_token = self._outer
+        return False
+
+@contextmanager
+def pooled_connection():
+    """Borrow a pooled connection; commit on success, roll back on error.
+
+    Inside a CancelToken block the connection's statements are limited by
+    the token, and errors caused by cancelling it surface as QueryCancelled.
+    """
+    token = getattr(_local, "cancel_token", None)
+    if token is not None:
+        token.check()
+        backend = get_backend()
+    pool = get_pool()
+    conn = pool.acquire()
+    try:
+        if token is not None:
+            backend.limit_statements(conn, token)
+        yield conn
+        conn.commit()
+    except BaseException as e:
+        broken = False
+        try:
+            conn.rollback()
+            if token is not None:
+                backend.limit_statements(conn, None)
+        except Exception:
+            broken = True
+        pool.release(conn, broken=broken)
+        if token is not None and token.cancelled() and not isinstance(e, QueryCancelled):
+            raise QueryCancelled("Query cancelled") from e
+        raise
+    else:
+        if token is not None:
+            backend.limit_statements(conn, None)
+        pool.release(conn)
 
 def get_connection():
-    config = load_db_config()
-    conn = pyodbc.connect(
-        f"DRIVER={{ODBC Driver 17 for SQL Server}};"
-        f"SERVER={config['server']};"
-        f"DATABASE={config['database']};"
-        f"UID={config['username']};"
-        f"PWD={config['password']};"
-    )
-    return conn
\ No newline at end of file
+    """Open a dedicated, unpooled connection (caller must close it)"""
+    return _connect()
@@ -0,0 +1,275 @@
+# database/event_writer.py
+import atexit
+import os
+import queue
+import threading
+import time
+from itertools import groupby
+
+from database import db_connection
+from database.db_connection import get_backend, load_db_config, pooled_connection
+from database.queries import _aggregate_update
+
+# Writer defaults, overridable from db_config.json
+DEFAULT_EVENT_QUEUE_SIZE = 10000      # events held in memory before producers wait
+DEFAULT_EVENT_BATCH_SIZE = 200        # events written per transaction at most
+DEFAULT_EVENT_FLUSH_INTERVAL = 1.0    # seconds an event may wait for its batch to fill
+DEFAULT_EVENT_PUT_TIMEOUT = 0.1       # seconds a producer waits on a full queue
+DEFAULT_FLUSH_TIMEOUT = 30            # seconds flush_events waits for the writer
+
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+_writer = None
+_writer_lock = threading.Lock()
+
+class _FlushRequest:
+    """Queue marker: set once every event queued before it is written"""
+
+    def __init__(self, stop=False):
+        self.done = threading.Event()
+        self.stop = stop
+
+class EventWriter:
+    """Background thread writing sleep/idle events in batches.
+
+    Producers only append to a bounded in-memory queue. The writer thread
+    takes up to batch_size events, or whatever arrived within
+    flush_interval of the first one, and writes them in one transaction
+    with executemany, folding them into the session aggregates. A failed
+    batch is retried with backoff while new events keep queuing; once the
+    queue is full, producers wait up to put_timeout and the event is then
+    dropped and counted. Events the database itself rejects are dropped
+    one at a time so they cannot stall the queue.
+    """
+
+    def __init__(self, queue_size=DEFAULT_EVENT_QUEUE_SIZE, batch_size=DEFAULT_EVENT_BATCH_SIZE,
+                 flush_interval=DEFAULT_EVENT_FLUSH_INTERVAL, put_timeout=DEFAULT_EVENT_PUT_TIMEOUT):
+        if queue_size < 1 or batch_size < 1:
+            raise ValueError("Invalid event writer size: queue_size and batch_size must be positive")
+
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.put_timeout = put_timeout
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._closed = False
+        self._stats = {
+            'queued': 0,
+            'written': 0,
+            'dropped': 0,
+            'batches': 0,
+            'rejected': 0,
+            'failures': 0,
+            'last_error': None,
+        }
+        self._thread = threading.Thread(target=self._run, name="event-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, account_id, session_id, event_type, event_time, source):
+        """Queue one event; returns False if it was dropped"""
+        if self._closed:
+            return False
+        try:
+            self._queue.put((account_id, session_id, event_type, event_time, source),
+                            timeout=self.put_timeout)
+        except queue.Full:
+            self._count(dropped=1)
+            return False
+
+        self._count(queued=1)
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until every event queued so far is written; returns False on timeout"""
+        if not self._thread.is_alive():
+            return self._queue.empty()
+        request = _FlushRequest()
+        try:
+            self._queue.put(request, timeout=timeout)
+        except queue.Full:
+            return False
+        return request.done.wait(timeout)
+
+    def close(self, timeout=10):
+        """Write what is queued and stop the writer thread"""
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread.is_alive():
+            request = _FlushRequest(stop=True)
+            try:
+                self._queue.put(request, timeout=timeout)
+            except queue.Full:
+                return
+            request.done.wait(timeout)
+
+    def pending(self):
+        """Events queued but not yet written"""
+        return self._queue.qsize()
+
+    def stats(self):
+        """Counters for diagnostics and benchmarks"""
+        with self._lock:
+            stats = dict(self._stats)
+        stats['pending'] = self.pending()
+        return stats
+
+    def _run(self):
+        while True:
+            batch, requests = self._next_batch()
+            if batch:
+                self._write_with_retry(batch, stop_requested=any(request.stop for request in requests))
+            for request in requests:
+                request.done.set()
+            if any(request.stop for request in requests):
+                return
+
+    def _next_batch(self):
+        """Collect events until the batch is full, the interval lapses or a flush is requested"""
+        batch = []
+        requests = []
+        item = self._queue.get()
+        deadline = time.monotonic() + self.flush_interval
+
+        while True:
+            if isinstance(item, _FlushRequest):
+                requests.append(item)
+                return batch, requests
+
+            batch.append(item)
+            if len(batch) >= self.batch_size:
+                return batch, requests
+
+            remaining = deadline - time.monotonic()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                return batch, requests
+
+    def _write_with_retry(self, batch, stop_requested=False):
+        delay = RETRY_DELAY
+        while batch:
+            try:
+                self._write(batch)
+                self._count(written=len(batch), batches=1)
+                return
+            except Exception as e:
+                self._count(failures=1, last_error=str(e))
+
+            if self._database_reachable():
+                # The database is up, so it refused something in the batch:
+                # write the events one by one and drop only the rejected ones
+                batch = self._write_individually(batch)
+                if not batch:
+                    return
+            if stop_requested:
+                # Shutting down: give the batch up rather than hold up exit
+                self._count(dropped=len(batch))
+                return
+            time.sleep(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def _write_individually(self, batch):
+        """Write events one per transaction; returns those left unwritten by an outage"""
+        for index, event in enumerate(batch):
+            try:
+                self._write([event])
+                self._count(written=1, batches=1)
+            except Exception as e:
+                if not self._database_reachable():
+                    return batch[index:]
+                self._count(rejected=1, last_error=str(e))
+        return []
+
+    def _database_reachable(self):
+        try:
+            with pooled_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            return True
+        except Exception:
+            return False
+
+    def _count(self, last_error=None, **counts):
+        with self._lock:
+            for key, value in counts.items():
+                self._stats[key] += value
+            if last_error is not None:
+                self._stats['last_error'] = last_error
+
+    def _write(self, batch):
+        with pooled_connection() as conn:
+            write_events(get_backend().bulk_cursor(conn), batch)
+
+def write_events(cursor, events):
+    """Insert (account_id, session_id, event_type, event_time, source) rows and fold them into the aggregates"""
+    cursor.executemany("""
+        INSERT INTO sleep_events (account_id, session_id, event_type, event_time, source)
+        VALUES (?, ?, ?, ?, ?)
+    """, events)
+    _fold_events(cursor, events)
+
+def _fold_events(cursor, events):
+    """Fold inserted event rows into their sessions' aggregates; each session's must be in time order"""
+    # Aggregates depend on event order, so apply runs of the same type in sequence
+    for event_type, run in groupby(events, key=lambda event: event[2]):
+        sql, time_params = _aggregate_update(event_type)
+        cursor.executemany(sql, [(event_time,) * time_params + (session_id,)
+                                 for _, session_id, _, event_time, _ in run])
+
+def journal_enabled():
+    """True when events and clock-outs go through the local offline journal"""
+    config = load_db_config()
+    return bool(config.get("offline_journal")) and not config.get("collector")
+
+def get_event_writer():
+    """Return the process-wide event writer, starting it on first use"""
+    global _writer
+    if _writer is None:
+        with _writer_lock:
+            if _writer is None:
+                config = load_db_config()
+                if config.get("collector"):
+                    from collector.client import CollectorEventSink
+                    _writer = CollectorEventSink(
+                        config["collector"],
+                        queue_size=config.get("event_queue_size", DEFAULT_EVENT_QUEUE_SIZE),
+                        batch_size=config.get("event_batch_size", DEFAULT_EVENT_BATCH_SIZE),
+                        flush_interval=config.get("event_flush_interval", DEFAULT_EVENT_FLUSH_INTERVAL),
+                        put_timeout=config.get("event_put_timeout", DEFAULT_EVENT_PUT_TIMEOUT),
+                    )
+                    return _writer
+                if config.get("offline_journal"):
+                    from database.offline_journal import (DEFAULT_SYNC_BATCH_SIZE, JournalSyncWriter,
+                                                          journal_path)
+                    _writer = JournalSyncWriter(
+                        journal_path(config["offline_journal"], os.path.dirname(os.path.abspath(db_connection.CONFIG_PATH))),
+                        batch_size=config.get("journal_sync_batch_size", DEFAULT_SYNC_BATCH_SIZE),
+                    )
+                    return _writer
+                _writer = EventWriter(
+                    queue_size=config.get("event_queue_size", DEFAULT_EVENT_QUEUE_SIZE),
+                    batch_size=config.get("event_batch_size", DEFAULT_EVENT_BATCH_SIZE),
+                    flush_interval=config.get("event_flush_interval", DEFAULT_EVENT_FLUSH_INTERVAL),
+                    put_timeout=config.get("event_put_timeout", DEFAULT_EVENT_PUT_TIMEOUT),
+                )
+    return _writer
+
+def flush_events(timeout=DEFAULT_FLUSH_TIMEOUT):
+    """Write any queued events now, if the writer has been started"""
+    if _writer is None:
+        return True
+    return _writer.flush(timeout)
+
+def close_event_writer(timeout=10):
+    """Flush and stop the process-wide writer, if one was started"""
+    global _writer
+    with _writer_lock:
+        writer, _writer = _writer, None
+    if writer is not None:
+        writer.close(timeout)
+
+atexit.register(close_event_writer)
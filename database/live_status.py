@@ -0,0 +1,90 @@
+# database/live_status.py
+import threading
+import time
+from datetime import datetime
+
+from database.db_connection import pooled_connection
+from database.queries import _aggregate_minutes, _overlap_sql
+
+class LiveStatusEngine:
+    """Builds the live roster of open sessions in a constant number of queries.
+
+    Every open session comes back from a single query with its running
+    sleep/idle aggregates, so no events are scanned. The query count and
+    timings of the latest call are kept in last_stats.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_stats = {
+            'queries': 0,
+            'sessions': 0,
+            'query_ms': 0.0,
+            'total_ms': 0.0,
+        }
+
+    def snapshot(self, now=None):
+        """Return one status dict per open session, newest clock-in first"""
+        started = time.perf_counter()
+        queries = 0
+
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(f"""
+                SELECT s.id, s.account_id, a.username, s.clock_in, s.device_mac_address,
+                       s.sleep_seconds, s.idle_seconds, s.idle_open_since, {_overlap_sql('s.')}
+                FROM sessions s
+                JOIN accounts a ON s.account_id = a.id
+                WHERE s.clock_out IS NULL
+                ORDER BY s.clock_in DESC, s.id
+            """)
+            queries += 1
+            rows = cursor.fetchall()
+
+        query_done = time.perf_counter()
+        if now is None:
+            now = datetime.now()
+
+        sessions_with_status = []
+        for session_id, account_id, username, clock_in, mac_address, sleep_seconds, idle_seconds, idle_start, \
+                overlap_seconds in rows:
+            sleep_minutes, idle_minutes, away_minutes = _aggregate_minutes(
+                sleep_seconds, idle_seconds, idle_start, now, overlap_seconds)
+            is_idle = idle_start is not None
+            current_idle_duration = int((now - idle_start).total_seconds() / 60) if is_idle else 0
+
+            # Calculate work time; time both asleep and idle is only taken off once
+            total_session_minutes = int((now - clock_in).total_seconds() / 60)
+            work_minutes = max(0, total_session_minutes - away_minutes)
+
+            sessions_with_status.append({
+                'session_id': session_id,
+                'account_id': account_id,
+                'username': username,
+                'clock_in': clock_in,
+                'mac_address': mac_address or 'Unknown',
+                'is_idle': is_idle,
+                'sleep_minutes': sleep_minutes,
+                'idle_minutes': idle_minutes,
+                'work_minutes': work_minutes,
+                'total_minutes': total_session_minutes,
+                'current_idle_duration': current_idle_duration
+            })
+
+        finished = time.perf_counter()
+        with self._lock:
+            self.last_stats = {
+                'queries': queries,
+                'sessions': len(sessions_with_status),
+                'query_ms': (query_done - started) * 1000,
+                'total_ms': (finished - started) * 1000,
+            }
+
+        return sessions_with_status
+
+    def stats(self):
+        """Query count and latency of the most recent snapshot"""
+        with self._lock:
+            return dict(self.last_stats)
+
+live_status_engine = LiveStatusEngine()
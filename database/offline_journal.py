@@ -0,0 +1,322 @@
+# database/offline_journal.py
+import os
+import sqlite3
+import threading
+import uuid
+from itertools import groupby
+
+import database.backends.sqlite  # noqa: F401  registers the DATETIME adapters and converters
+from database.aggregates import _rebuild_aggregates
+from database.db_connection import get_backend, pooled_connection
+from database.event_writer import _fold_events
+from database.queries import _close_session
+
+DEFAULT_JOURNAL_PATH = "event_journal.db"
+DEFAULT_SYNC_BATCH_SIZE = 1000        # journal entries replayed per central transaction
+DEFAULT_SYNC_INTERVAL = 1.0           # seconds between sync attempts when idle
+CLOCK_OUT_SYNC_TIMEOUT = 5            # seconds end_session waits for its clock-out to sync
+
+RETRY_DELAY = 1.0
+MAX_RETRY_DELAY = 30.0
+
+JOURNAL_SCHEMA = """
+CREATE TABLE IF NOT EXISTS journal (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    kind TEXT NOT NULL CHECK (kind IN ('event', 'end_session')),
+    event_uid TEXT,
+    account_id INTEGER,
+    session_id INTEGER NOT NULL,
+    event_type TEXT,
+    event_time DATETIME NOT NULL,
+    source TEXT
+);
+"""
+
+# Journal uids looked up per statement, below SQL Server's parameter limit
+UID_LOOKUP_BATCH = 500
+
+# Skips events already replayed, so a batch can be re-sent after a crash
+# between the central commit and the local delete
+INSERT_EVENT_IF_NEW = """
+    INSERT INTO sleep_events (event_uid, account_id, session_id, event_type, event_time, source)
+    SELECT ?, ?, ?, ?, ?, ?
+    WHERE NOT EXISTS (SELECT 1 FROM sleep_events WHERE event_uid = ?)
+"""
+
+# A row when the session already holds an event, or a clock-out, later than
+# the given time: events from then on are then out of order for it
+LATER_THAN = """
+    SELECT 1 FROM sessions s
+    WHERE s.id = ?
+      AND (s.clock_out > ? OR EXISTS (SELECT 1 FROM sleep_events e
+                                      WHERE e.session_id = s.id AND e.event_time > ?))
+"""
+
+class OfflineJournal:
+    """Append-only local SQLite journal of event and clock-out writes"""
+
+    def __init__(self, path):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = self._open()
+
+    def _open(self):
+        conn = sqlite3.connect(self.path, timeout=30, detect_types=sqlite3.PARSE_DECLTYPES,
+                               check_same_thread=False, isolation_level=None)
+        conn.execute("PRAGMA journal_mode = WAL")
+        # Survives an application crash; only an OS crash can lose the last commits
+        conn.execute("PRAGMA synchronous = NORMAL")
+        conn.executescript(JOURNAL_SCHEMA)
+        return conn
+
+    def append_event(self, account_id, session_id, event_type, event_time, source):
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO journal (kind, event_uid, account_id, session_id, event_type, event_time, source)
+                VALUES ('event', ?, ?, ?, ?, ?, ?)
+            """, (uuid.uuid4().hex, account_id, session_id, event_type, event_time, source))
+
+    def append_end_session(self, session_id, clock_out_time):
+        with self._lock:
+            self._conn.execute("""
+                INSERT INTO journal (kind, session_id, event_time) VALUES ('end_session', ?, ?)
+            """, (session_id, clock_out_time))
+
+    def read_batch(self, limit):
+        """Oldest unsynced entries: (seq, kind, event_uid, account_id, session_id, event_type, event_time, source)"""
+        with self._lock:
+            return self._conn.execute("""
+                SELECT seq, kind, event_uid, account_id, session_id, event_type, event_time, source
+                FROM journal ORDER BY seq LIMIT ?
+            """, (limit,)).fetchall()
+
+    def remove(self, seqs):
+        with self._lock:
+            self._conn.executemany("DELETE FROM journal WHERE seq = ?", [(seq,) for seq in seqs])
+
+    def last_seq(self):
+        with self._lock:
+            return self._conn.execute("SELECT MAX(seq) FROM journal").fetchone()[0]
+
+    def pending(self):
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+class JournalSyncWriter:
+    """Event writer that journals locally first and syncs in the background.
+
+    submit() only appends to the local journal, so capture stays fast and
+    survives crashes and outages. A sync thread replays the journal to the
+    central database in order, in batches of up to batch_size entries:
+    events are inserted idempotently by event_uid and folded into their
+    sessions' aggregates the way the live writer does, and journaled
+    clock-outs are applied to sessions that are still open. A session whose
+    replayed events arrive out of time order has its aggregates rebuilt
+    from its events instead. Entries are deleted locally only after the
+    central transaction commits. While the database is unreachable the
+    journal simply grows and sync retries with backoff.
+    """
+
+    def __init__(self, path, batch_size=DEFAULT_SYNC_BATCH_SIZE, sync_interval=DEFAULT_SYNC_INTERVAL):
+        self.journal = OfflineJournal(path)
+        self.batch_size = batch_size
+        self.sync_interval = sync_interval
+
+        self._wake = threading.Event()
+        self._cond = threading.Condition()
+        self._synced_seq = 0
+        self._stopping = False
+        self._closed = False
+        self._offline = False
+        self._stats = {
+            'queued': 0,
+            'written': 0,
+            'dropped': 0,
+            'batches': 0,
+            'rejected': 0,
+            'failures': 0,
+            'last_error': None,
+        }
+        self._thread = threading.Thread(target=self._run, name="journal-sync", daemon=True)
+        self._thread.start()
+
+    def submit(self, account_id, session_id, event_type, event_time, source):
+        """Journal one event; returns False only if the local write failed"""
+        if self._closed:
+            return False
+        try:
+            self.journal.append_event(account_id, session_id, event_type, event_time, source)
+        except Exception as e:
+            self._count(dropped=1, last_error=str(e))
+            return False
+        self._count(queued=1)
+        self._wake.set()
+        return True
+
+    def submit_end_session(self, session_id, clock_out_time):
+        """Journal a clock-out behind the session's events"""
+        self.journal.append_end_session(session_id, clock_out_time)
+        self._wake.set()
+        return True
+
+    def flush(self, timeout=None):
+        """Wait until everything journaled so far is synced; returns False on timeout"""
+        target = self.journal.last_seq()
+        if target is None:
+            return True
+        self._wake.set()
+        with self._cond:
+            return self._cond.wait_for(lambda: self._synced_seq >= target, timeout)
+
+    def close(self, timeout=10):
+        """Give sync a last chance, then stop; unsynced entries wait in the journal"""
+        if self._closed:
+            return
+        self._closed = True
+        if not self._offline:
+            self.flush(timeout)
+        self._stopping = True
+        self._wake.set()
+        self._thread.join(timeout)
+        if not self._thread.is_alive():
+            self.journal.close()
+
+    def pending(self):
+        return self.journal.pending()
+
+    def stats(self):
+        with self._cond:
+            stats = dict(self._stats)
+        stats['pending'] = self.pending()
+        return stats
+
+    def _run(self):
+        delay = RETRY_DELAY
+        while not self._stopping:
+            self._wake.clear()
+            try:
+                entries = self.journal.read_batch(self.batch_size)
+            except Exception as e:
+                self._count(failures=1, last_error=str(e))
+                entries = []
+
+            if not entries:
+                self._wake.wait(self.sync_interval)
+                continue
+
+            self._offline = not self._sync(entries)
+            if not self._offline:
+                delay = RETRY_DELAY
+                continue
+
+            # Central database unreachable: keep the entries and back off
+            self._wake.wait(delay)
+            delay = min(delay * 2, MAX_RETRY_DELAY)
+
+    def _sync(self, entries):
+        """Replay entries; returns False if the central database is unreachable"""
+        try:
+            self._replay(entries)
+            self._synced(entries, written=len(entries), batches=1)
+            return True
+        except Exception as e:
+            self._count(failures=1, last_error=str(e))
+
+        if not self._database_reachable():
+            return False
+
+        # The database is up, so it refused something in the batch:
+        # replay entries one by one and drop only the rejected ones
+        for entry in entries:
+            try:
+                self._replay([entry])
+                self._synced([entry], written=1, batches=1)
+            except Exception as e:
+                if not self._database_reachable():
+                    return False
+                self._synced([entry], rejected=1)
+                self._count(last_error=str(e))
+        return True
+
+    def _replay(self, entries):
+        backend = get_backend()
+        with pooled_connection() as conn:
+            cursor = backend.bulk_cursor(conn)
+            for kind, run in groupby(entries, key=lambda entry: entry[1]):
+                run = list(run)
+                if kind == 'event':
+                    self._replay_events(conn, cursor, run)
+                else:
+                    for entry in run:
+                        _close_session(conn.cursor(), entry[4], entry[6], if_open=True)
+
+    def _replay_events(self, conn, cursor, run):
+        """Insert a run of journaled events and fold them into the sessions' aggregates"""
+        lookup = conn.cursor()
+        uids = [entry[2] for entry in run]
+        replayed = set()
+        for offset in range(0, len(uids), UID_LOOKUP_BATCH):
+            batch = uids[offset:offset + UID_LOOKUP_BATCH]
+            lookup.execute(f"SELECT event_uid FROM sleep_events WHERE event_uid IN ({', '.join('?' for _ in batch)})",
+                           batch)
+            replayed.update(row[0] for row in lookup.fetchall())
+        events = [entry for entry in run if entry[2] not in replayed]
+        if not events:
+            return
+
+        # Checked before inserting, against what the database already holds
+        earliest, latest, rebuild = {}, {}, set()
+        for _, _, _, _, session_id, _, event_time, _ in events:
+            if session_id in latest and event_time < latest[session_id]:
+                rebuild.add(session_id)
+            earliest.setdefault(session_id, event_time)
+            latest[session_id] = max(latest.get(session_id, event_time), event_time)
+        for session_id, event_time in earliest.items():
+            if session_id not in rebuild:
+                lookup.execute(LATER_THAN, (session_id, event_time, event_time))
+                if lookup.fetchone():
+                    rebuild.add(session_id)
+
+        cursor.executemany(INSERT_EVENT_IF_NEW, [
+            (uid, account_id, session_id, event_type, event_time, source, uid)
+            for _, _, uid, account_id, session_id, event_type, event_time, source in events
+        ])
+        _fold_events(cursor, [entry[3:] for entry in events if entry[4] not in rebuild])
+        if rebuild:
+            _rebuild_aggregates(conn.cursor(), sorted(rebuild))
+
+    def _synced(self, entries, **counts):
+        self.journal.remove([entry[0] for entry in entries])
+        with self._cond:
+            for key, value in counts.items():
+                self._stats[key] += value
+            self._synced_seq = max(self._synced_seq, entries[-1][0])
+            self._cond.notify_all()
+
+    def _database_reachable(self):
+        try:
+            with pooled_connection() as conn:
+                cursor = conn.cursor()
+                cursor.execute("SELECT 1")
+                cursor.fetchone()
+            return True
+        except Exception:
+            return False
+
+    def _count(self, last_error=None, **counts):
+        with self._cond:
+            for key, value in counts.items():
+                self._stats[key] += value
+            if last_error is not None:
+                self._stats['last_error'] = last_error
+
+def journal_path(setting, config_dir):
+    """Journal file for the offline_journal config value (a path, or true for the default)"""
+    path = setting if isinstance(setting, str) else DEFAULT_JOURNAL_PATH
+    if not os.path.isabs(path) and config_dir:
+        path = os.path.join(config_dir, path)
+    return path
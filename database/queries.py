@@ -1,182 +1,371 @@
 # database/queries.py
-from database.db_connection import get_connection
-from datetime import datetime
+from database.aggregates import _rebuild_aggregates, _session_aggregates
+from database.db_connection import pooled_connection, get_backend
+from datetime import datetime, timedelta
 from utils.mac_address import get_mac_address
 
+DEFAULT_SESSION_TIMEOUT_MINUTES = 240   # sessions open longer than this are clocked out
+
+def _day_start(day):
+    """Midnight at the start of a date, for half-open datetime ranges"""
+    return datetime(day.year, day.month, day.day)
+
+# Aggregate columns on sessions that each event type opens or closes
+_EVENT_AGGREGATES = {
+    'sleep': ('sleep', 'open'),
+    'resume': ('sleep', 'close'),
+    'idle_start': ('idle', 'open'),
+    'idle_end': ('idle', 'close'),
+}
+
+# Running aggregate columns of a session, in the order _session_aggregates returns them
+_AGGREGATE_COLUMNS = ('sleep_seconds', 'idle_seconds', 'sleep_open_since', 'idle_open_since',
+                      'overlap_seconds', 'sleep_overlap_pending', 'idle_overlap_pending')
+
+def _overlap_sql(prefix=""):
+    """SQL for the seconds a session was both asleep and idle, as counted so far.
+
+    overlap_seconds also holds overlap with the open sleep period, which is
+    dropped again if that period never ends, so it is left out here.
+    """
+    return f"({prefix}overlap_seconds - CASE WHEN {prefix}sleep_open_since IS NULL THEN 0 " \
+           f"ELSE {prefix}sleep_overlap_pending END)"
+
+def _aggregate_minutes(sleep_seconds, idle_seconds, idle_open_since, now, overlap_seconds=0):
+    """Sleep, idle and away minutes from a session's running aggregates.
+
+    An open idle period counts up to now; an open sleep period is not counted.
+    Away time covers both, with stretches that were asleep and idle at once
+    (overlap_seconds, read through _overlap_sql) counted a single time.
+    """
+    total_idle_seconds = idle_seconds or 0
+
+    # If still idle (no end event), calculate current idle time
+    if idle_open_since:
+        total_idle_seconds += (now - idle_open_since).total_seconds()
+
+    away_seconds = (sleep_seconds or 0) + total_idle_seconds - (overlap_seconds or 0)
+    return int((sleep_seconds or 0) / 60), int(total_idle_seconds / 60), int(away_seconds / 60)
+
+def _aggregate_update(event_type):
+    """UPDATE applying one event to its session's aggregates, and how many leading params are the event time.
+
+    The params are the event time that many times, then the session id.
+    Each kind keeps its closed seconds and open start; overlap_seconds
+    gains the overlap of each period that closes while the other kind is
+    open, and <kind>_overlap_pending holds what was counted against a
+    period still open, to take back if a new start replaces it. Events
+    reaching a session after its clock-out change nothing.
+    """
+    kind, action = _EVENT_AGGREGATES[event_type]
+    other = 'idle' if kind == 'sleep' else 'sleep'
+    if action == 'open':
+        return f"""
+            UPDATE sessions
+            SET overlap_seconds = overlap_seconds
+                    - CASE WHEN {kind}_open_since IS NULL THEN 0 ELSE {kind}_overlap_pending END,
+                {kind}_overlap_pending = 0,
+                {kind}_open_since = ?
+            WHERE id = ? AND clock_out IS NULL
+        """, 1
+
+    backend = get_backend()
+    seconds = backend.seconds_between(f"{kind}_open_since", "?")
+    # The closing period overlaps the open one from the later of the two starts
+    both = backend.seconds_between(
+        f"CASE WHEN {other}_open_since > {kind}_open_since THEN {other}_open_since ELSE {kind}_open_since END", "?")
+    overlap = f"CASE WHEN {other}_open_since IS NULL THEN 0 WHEN {both} > 0 THEN {both} ELSE 0 END"
+    return f"""
+        UPDATE sessions
+        SET {kind}_seconds = {kind}_seconds + {seconds},
+            overlap_seconds = overlap_seconds + {overlap},
+            {other}_overlap_pending = {other}_overlap_pending + {overlap},
+            {kind}_overlap_pending = 0,
+            {kind}_open_since = NULL
+        WHERE id = ? AND clock_out IS NULL AND {kind}_open_since IS NOT NULL
+    """, 5
+
 def start_session(account_id, clock_in_time, mac_address=None):
     """Start a new session with MAC address"""
     if mac_address is None:
         mac_address = get_mac_address()
-    
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO sessions (account_id, clock_in, session_date, device_mac_address)
-        OUTPUT INSERTED.id
-        VALUES (?, ?, ?, ?)
-    """, (account_id, clock_in_time, clock_in_time.date(), mac_address))
-    session_id = cursor.fetchone()[0]
-    conn.commit()
-    conn.close()
+
+    from collector.client import get_collector_client
+    collector = get_collector_client()
+    if collector is not None:
+        return collector.start_session(account_id, clock_in_time, mac_address)
+
+    backend = get_backend()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            INSERT INTO sessions (account_id, clock_in, session_date, device_mac_address)
+            {backend.output('id')}
+            VALUES (?, ?, ?, ?){backend.returning('id')}
+        """, (account_id, clock_in_time, clock_in_time.date(), mac_address))
+        session_id = cursor.fetchone()[0]
     return session_id
 
-def end_session(session_id, clock_out_time):
-    """End session with complete sleep and idle calculation"""
-    conn = get_connection()
-    cursor = conn.cursor()
+def _close_session(cursor, session_id, clock_out_time, if_open=False):
+    """Clock a session out from its aggregates in one statement; returns the work minutes.
 
-    # Calculate sleep minutes
-    sleep_minutes = calculate_sleep_minutes_for_session(session_id)
-    
-    # Calculate idle minutes
-    idle_minutes = calculate_idle_minutes_simple(session_id)
+    Closing a session that is already closed changes nothing and returns
+    its recorded work minutes; a missing session raises ValueError. With
+    if_open, both cases return None instead, so a replayed clock-out is
+    harmless.
+    """
+    closed = _close_sessions(cursor, clock_out_time, session_ids=[session_id])
+    if closed:
+        return closed[0][1]
+    if if_open:
+        return None
 
-    # Get clock in time
-    cursor.execute("SELECT clock_in FROM sessions WHERE id = ?", (session_id,))
-    clock_in = cursor.fetchone()[0]
-    
-    # Calculate total work minutes (total time - sleep - idle)
-    total_session_minutes = int((clock_out_time - clock_in).total_seconds() / 60)
-    actual_work_minutes = max(0, total_session_minutes - sleep_minutes - idle_minutes)
+    cursor.execute("SELECT total_work_minutes FROM sessions WHERE id = ?", (session_id,))
+    row = cursor.fetchone()
+    if row is None:
+        raise ValueError(f"Session {session_id} does not exist")
+    return row[0]
 
-    # Update session with all calculated times
-    cursor.execute("""
+def end_session(session_id, clock_out_time):
+    """End session with complete sleep and idle calculation; returns the work minutes.
+
+    The totals come from the session's running aggregates and are written
+    in the same statement that clocks it out, so a failure leaves the
+    session open rather than closed with wrong totals. Ending a session
+    twice is harmless, and an unknown session raises ValueError.
+
+    With the offline journal enabled the clock-out is journaled behind the
+    session's events; None is returned if it could not be synced yet, and
+    the journal applies it once the database is reachable again. Otherwise
+    None means the queued events could not be written in time, and the
+    session is left open rather than closed without them.
+    """
+    from database.event_writer import flush_events, get_event_writer, journal_enabled
+
+    if journal_enabled():
+        from database.offline_journal import CLOCK_OUT_SYNC_TIMEOUT
+        get_event_writer().submit_end_session(session_id, clock_out_time)
+        if not flush_events(CLOCK_OUT_SYNC_TIMEOUT):
+            return None
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT total_work_minutes FROM sessions WHERE id = ?", (session_id,))
+            row = cursor.fetchone()
+        if row is None:
+            raise ValueError(f"Session {session_id} does not exist")
+        return row[0]
+
+    # Events still queued for the writer must reach the aggregates first
+    if not flush_events():
+        return None
+
+    from collector.client import get_collector_client
+    collector = get_collector_client()
+    if collector is not None:
+        return collector.end_session(session_id, clock_out_time)
+
+    with pooled_connection() as conn:
+        return _close_session(conn.cursor(), session_id, clock_out_time)
+
+def _close_sessions_sql(condition):
+    """UPDATE clocking out the open sessions matching condition from their aggregates.
+
+    Returns (sql, clock_out_params): the first clock_out_params ?s are the
+    clock-out time, the rest are the condition's. The statement returns the
+    closed sessions' (id, total_work_minutes).
+    """
+    backend = get_backend()
+    idle_seconds = f"(idle_seconds + CASE WHEN idle_open_since IS NULL THEN 0 " \
+                   f"ELSE {backend.seconds_between('idle_open_since', '?')} END)"
+    idle_params = 1
+    # Same truncations as _aggregate_minutes, so stored and live totals agree
+    away_seconds = f"(sleep_seconds + {idle_seconds} - {_overlap_sql()})"
+    work_minutes = f"(CAST({backend.seconds_between('clock_in', '?')} / 60 AS INT) " \
+                   f"- CAST({away_seconds} / 60 AS INT))"
+    work_params = 1 + idle_params
+    # clock_out, work_minutes twice in the CASE, then idle_seconds
+    clock_out_params = 1 + 2 * work_params + idle_params
+    return f"""
         UPDATE sessions
-        SET clock_out = ?, total_work_minutes = ?, sleep_minutes = ?
-        WHERE id = ?
-    """, (clock_out_time, actual_work_minutes, sleep_minutes, session_id))
-    
-    conn.commit()
-    conn.close()
-    
-    return actual_work_minutes
+        SET clock_out = ?,
+            total_work_minutes = CASE WHEN {work_minutes} > 0 THEN {work_minutes} ELSE 0 END,
+            sleep_minutes = CAST(sleep_seconds / 60 AS INT),
+            idle_seconds = {idle_seconds},
+            overlap_seconds = {_overlap_sql()},
+            sleep_overlap_pending = 0,
+            idle_overlap_pending = 0,
+            idle_open_since = NULL,
+            sleep_open_since = NULL
+        {backend.output('id', 'total_work_minutes')}
+        WHERE clock_out IS NULL AND {condition}{backend.returning('id', 'total_work_minutes')}
+    """, clock_out_params
+
+def _close_filter(session_ids=None, account_id=None, clock_in_before=None):
+    """WHERE condition and params picking sessions to close, or None when none can match"""
+    conditions = []
+    params = []
+    if session_ids is not None:
+        session_ids = list(session_ids)
+        if not session_ids:
+            return None
+        conditions.append(f"id IN ({', '.join('?' for _ in session_ids)})")
+        params.extend(session_ids)
+    if account_id is not None:
+        conditions.append("account_id = ?")
+        params.append(account_id)
+    if clock_in_before is not None:
+        conditions.append("clock_in < ?")
+        params.append(clock_in_before)
+    return " AND ".join(conditions) or "1 = 1", params
+
+def _close_sessions(cursor, clock_out_time, session_ids=None, account_id=None, clock_in_before=None):
+    """Clock out every open session matching the filters in one statement.
+
+    Sleep and idle totals come from the running aggregates, an idle period
+    still open ending at the clock-out. Returns the closed sessions as (id, total_work_minutes).
+    """
+    close_filter = _close_filter(session_ids, account_id, clock_in_before)
+    if close_filter is None:
+        return []
+    condition, params = close_filter
+    sql, clock_out_params = _close_sessions_sql(condition)
+    cursor.execute(sql, [clock_out_time] * clock_out_params + params)
+    return [tuple(row) for row in cursor.fetchall()]
+
+def _open_session_ids(session_ids=None, account_id=None, clock_in_before=None):
+    """Ids of the open sessions matching the filters"""
+    close_filter = _close_filter(session_ids, account_id, clock_in_before)
+    if close_filter is None:
+        return []
+    condition, params = close_filter
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id FROM sessions WHERE clock_out IS NULL AND {condition}", params)
+        return [row[0] for row in cursor.fetchall()]
+
+def close_sessions(clock_out_time, session_ids=None, account_id=None, clock_in_before=None):
+    """Clock out the matching open sessions; returns them as (id, total_work_minutes).
+
+    Everything is closed in one statement when the database is written
+    directly. Journaled and collector clock-outs have to queue behind the
+    session's events, so those go through end_session one by one. A
+    session end_session left open, or every matching one when the queued
+    events cannot be written in time, comes back as (id, None); with the
+    offline journal that means its clock-out is journaled instead.
+    """
+    from database.event_writer import flush_events, journal_enabled
+    from collector.client import get_collector_client
+
+    if journal_enabled() or get_collector_client() is not None:
+        return [(session_id, end_session(session_id, clock_out_time))
+                for session_id in _open_session_ids(session_ids, account_id, clock_in_before)]
+
+    # Events still queued for the writer must reach the aggregates first
+    if not flush_events():
+        return [(session_id, None) for session_id in _open_session_ids(session_ids, account_id, clock_in_before)]
+    with pooled_connection() as conn:
+        return _close_sessions(conn.cursor(), clock_out_time, session_ids, account_id, clock_in_before)
+
+def sweep_stale_sessions(timeout_minutes=DEFAULT_SESSION_TIMEOUT_MINUTES, now=None):
+    """Clock out every session open longer than timeout_minutes; returns how many were closed"""
+    if now is None:
+        now = datetime.now()
+    closed = close_sessions(now, clock_in_before=now - timedelta(minutes=timeout_minutes))
+    return sum(work_minutes is not None for _, work_minutes in closed)
 
 def calculate_sleep_minutes_for_session(session_id):
     """Calculate total sleep minutes for a session"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT event_type, event_time FROM sleep_events
-            WHERE session_id = ? AND event_type IN ('sleep', 'resume')
-            ORDER BY event_time
-        """, (session_id,))
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT sleep_seconds FROM sessions WHERE id = ?", (session_id,))
+            row = cursor.fetchone()
         
-        events = cursor.fetchall()
-        conn.close()
-        
-        sleep_minutes = 0
-        sleep_start = None
-        
-        for event_type, event_time in events:
-            if event_type == 'sleep':
-                sleep_start = event_time
-            elif event_type == 'resume' and sleep_start:
-                sleep_duration = (event_time - sleep_start).total_seconds() / 60
-                sleep_minutes += sleep_duration
-                sleep_start = None
-        
-        return int(sleep_minutes)
+        return int(row[0] / 60) if row else 0
         
     except Exception:
         return 0
 
+def _submit_event(account_id, session_id, event_type, source):
+    """Queue an event and, once accepted, note it against the session's in-memory stats"""
+    from database.event_writer import get_event_writer
+    from utils.session_stats import record_event
+    event_time = datetime.now()
+    accepted = get_event_writer().submit(account_id, session_id, event_type, event_time, source)
+    if accepted:
+        record_event(session_id, event_type)
+    return accepted
+
 def log_sleep_event(account_id, session_id, event_type, source='system'):
-    """Log sleep events"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO sleep_events (account_id, session_id, event_type, event_time, source)
-        VALUES (?, ?, ?, ?, ?)
-    """, (account_id, session_id, event_type, datetime.now(), source))
-    conn.commit()
-    conn.close()
+    """Queue a sleep event for the background writer (never waits on the database)"""
+    return _submit_event(account_id, session_id, event_type, source)
 
 def log_idle_event(account_id, session_id, event_type):
-    """Log idle events to database"""
+    """Queue an idle event for the background writer; False if it was dropped"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            INSERT INTO sleep_events (account_id, session_id, event_type, event_time, source)
-            VALUES (?, ?, ?, ?, 'idle')
-        """, (account_id, session_id, event_type, datetime.now()))
-        
-        conn.commit()
-        conn.close()
-        return True
+        return _submit_event(account_id, session_id, event_type, 'idle')
         
     except Exception:
-        try:
-            conn.close()
-        except:
-            pass
         return False
 
 def calculate_idle_minutes_simple(session_id):
     """Calculate total idle minutes for a session"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT event_type, event_time 
-            FROM sleep_events 
-            WHERE session_id = ? AND event_type IN ('idle_start', 'idle_end')
-            ORDER BY event_time
-        """, (session_id,))
-        
-        events = cursor.fetchall()
-        conn.close()
-        
-        total_idle_minutes = 0
-        idle_start = None
-        
-        for event_type, event_time in events:
-            if event_type == 'idle_start':
-                idle_start = event_time
-            elif event_type == 'idle_end' and idle_start:
-                idle_duration = (event_time - idle_start).total_seconds() / 60
-                total_idle_minutes += idle_duration
-                idle_start = None
-        
-        # If still idle (no end event), calculate current idle time
-        if idle_start:
-            current_idle = (datetime.now() - idle_start).total_seconds() / 60
-            total_idle_minutes += current_idle
-        
-        return int(total_idle_minutes)
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT idle_seconds, idle_open_since FROM sessions WHERE id = ?
+            """, (session_id,))
+            row = cursor.fetchone()
+        
+        if not row:
+            return 0
+        return _aggregate_minutes(0, row[0], row[1], datetime.now())[1]
         
     except Exception:
         return 0
 
+def get_session_minutes(session_id, now=None):
+    """(sleep, idle, away) minutes of a session so far, or None if it does not exist.
+
+    Away time is when the user was asleep or idle, each moment counted
+    once, so work time is the session length minus it.
+    """
+    if now is None:
+        now = datetime.now()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT sleep_seconds, idle_seconds, idle_open_since, {_overlap_sql()}
+            FROM sessions WHERE id = ?
+        """, (session_id,))
+        row = cursor.fetchone()
+    if row is None:
+        return None
+    return _aggregate_minutes(row[0], row[1], row[2], now, row[3])
+
+def get_session_aggregates(session_id):
+    """The running aggregate columns of an open session (see _AGGREGATE_COLUMNS), or None"""
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {", ".join(_AGGREGATE_COLUMNS)} FROM sessions WHERE id = ? AND clock_out IS NULL
+        """, (session_id,))
+        row = cursor.fetchone()
+    return tuple(row) if row else None
+
 def is_session_currently_idle_simple(session_id):
     """Check if session is currently idle"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        # Check if session is still active
-        cursor.execute("SELECT clock_out FROM sessions WHERE id = ?", (session_id,))
-        result = cursor.fetchone()
-        if not result or result[0] is not None:
-            conn.close()
-            return False  # Session is closed
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT clock_out, idle_open_since FROM sessions WHERE id = ?
+            """, (session_id,))
+            row = cursor.fetchone()
         
-        # Get last idle event
-        cursor.execute("""
-            SELECT TOP 1 event_type, event_time 
-            FROM sleep_events 
-            WHERE session_id = ? AND event_type IN ('idle_start', 'idle_end')
-            ORDER BY event_time DESC
-        """, (session_id,))
-        
-        last_event = cursor.fetchone()
-        conn.close()
-        
-        return last_event and last_event[0] == 'idle_start'
+        # Only an active session with an unmatched idle_start is idle
+        return bool(row) and row[0] is None and row[1] is not None
         
     except Exception:
         return False
@@ -184,25 +373,15 @@ def is_session_currently_idle_simple(session_id):
 def get_current_idle_duration_minutes(session_id):
     """Get current idle duration in minutes if currently idle"""
     try:
-        if not is_session_currently_idle_simple(session_id):
-            return 0
-            
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT TOP 1 event_time 
-            FROM sleep_events 
-            WHERE session_id = ? AND event_type = 'idle_start'
-            ORDER BY event_time DESC
-        """, (session_id,))
-        
-        result = cursor.fetchone()
-        conn.close()
-        
-        if result:
-            idle_start = result[0]
-            current_idle = (datetime.now() - idle_start).total_seconds() / 60
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT idle_open_since FROM sessions WHERE id = ? AND clock_out IS NULL
+            """, (session_id,))
+            row = cursor.fetchone()
+        
+        if row and row[0]:
+            current_idle = (datetime.now() - row[0]).total_seconds() / 60
             return int(current_idle)
         
         return 0
@@ -210,50 +389,196 @@ def get_current_idle_duration_minutes(session_id):
     except Exception:
         return 0
 
-def fetch_all_sessions_with_idle():
-    """Fetch all sessions with complete sleep and idle information"""
-    try:
-        conn = get_connection()
+def rebuild_session_aggregates(session_ids=None, batch_size=500):
+    """Recompute the running sleep/idle aggregates from sleep_events.
+
+    Used to backfill existing data and to repair sessions whose events were
+    written out of order. Rebuilds every session when session_ids is None.
+    """
+    if session_ids is None:
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("SELECT id FROM sessions")
+            session_ids = [row[0] for row in cursor.fetchall()]
+    session_ids = list(session_ids)
+
+    for offset in range(0, len(session_ids), batch_size):
+        with pooled_connection() as conn:
+            _rebuild_aggregates(conn.cursor(), session_ids[offset:offset + batch_size])
+
+    return len(session_ids)
+
+def _like_prefix(text):
+    """LIKE pattern matching values that start with text (wildcards escaped)"""
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_').replace('[', '\\[')
+    return escaped + '%'
+
+def _session_filters(from_date=None, to_date=None, account_id=None, username_prefix=None, mac_address=None):
+    """Sargable WHERE conditions and parameters for the session filters"""
+    conditions = []
+    params = []
+
+    if from_date:
+        conditions.append("s.session_date >= ?")
+        params.append(from_date)
+    if to_date:
+        conditions.append("s.session_date <= ?")
+        params.append(to_date)
+    if account_id is not None:
+        conditions.append("s.account_id = ?")
+        params.append(account_id)
+    if username_prefix:
+        conditions.append("a.username LIKE ? ESCAPE '\\'")
+        params.append(_like_prefix(username_prefix.strip()))
+    if mac_address:
+        conditions.append("s.device_mac_address LIKE ? ESCAPE '\\'")
+        params.append(_like_prefix(mac_address.strip().upper().replace('-', ':')))
+
+    return conditions, params
+
+# Columns read by the session listings; _session_row turns a row into the
+# (mac, username, clock_in, clock_out, date, work, sleep, idle, id, account_id) tuple
+_SESSION_COLUMNS = """
+    COALESCE(s.device_mac_address, 'Unknown') as mac_address,
+    a.username,
+    s.clock_in,
+    s.clock_out,
+    s.session_date,
+    COALESCE(s.total_work_minutes, 0) as work_minutes,
+    COALESCE(s.sleep_minutes, 0) as sleep_minutes,
+    s.id as session_id,
+    s.account_id,
+    s.sleep_seconds,
+    s.idle_seconds,
+    s.idle_open_since
+"""
+
+def _session_row(row, now):
+    """Session tuple with sleep and idle minutes read from the running aggregates"""
+    mac_address, username, clock_in, clock_out, session_date, work_minutes, sleep_minutes, \
+        session_id, account_id, sleep_seconds, idle_seconds, idle_open_since = row
+
+    live_sleep_minutes, idle_minutes, _ = _aggregate_minutes(sleep_seconds, idle_seconds, idle_open_since, now)
+
+    # Calculate sleep minutes for active sessions or use stored value
+    if clock_out is None:
+        sleep_minutes = live_sleep_minutes
+
+    return (mac_address, username, clock_in, clock_out, session_date, work_minutes,
+            sleep_minutes, idle_minutes, session_id, account_id)
+
+def fetch_sessions_with_idle(from_date=None, to_date=None, account_id=None, username_prefix=None, mac_address=None):
+    """Fetch sessions matching the optional filters, with sleep and idle totals.
+
+    Dates are inclusive session_date bounds; username_prefix and mac_address
+    match the start of the value.
+    """
+    conditions, params = _session_filters(from_date, to_date, account_id, username_prefix, mac_address)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    with pooled_connection() as conn:
         cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {_SESSION_COLUMNS}
+            FROM sessions s
+            JOIN accounts a ON s.account_id = a.id
+            {where}
+            ORDER BY s.session_date DESC, s.clock_in DESC, s.id DESC
+        """, params)
+        rows = cursor.fetchall()
+    
+    now = datetime.now()
+    return [_session_row(row, now) for row in rows]
 
-        cursor.execute("""
-            SELECT 
-                ISNULL(s.device_mac_address, 'Unknown') as mac_address,
-                a.username,
-                s.clock_in,
-                s.clock_out,
-                s.session_date,
-                ISNULL(s.total_work_minutes, 0) as work_minutes,
-                ISNULL(s.sleep_minutes, 0) as sleep_minutes,
-                0 as idle_minutes,
-                s.id as session_id,
-                s.account_id
+def fetch_sessions_page(after=None, page_size=200, from_date=None, to_date=None, account_id=None,
+                        username_prefix=None, mac_address=None):
+    """Fetch one page of sessions (newest first) using keyset pagination.
+
+    after is the (session_date, clock_in, session_id) cursor returned with
+    the previous page, or None for the first page. Returns the page and the
+    cursor for the next one, which is None once the last page is reached.
+    Filters work as in fetch_sessions_with_idle.
+    """
+    backend = get_backend()
+    conditions, params = _session_filters(from_date, to_date, account_id, username_prefix, mac_address)
+
+    if after is not None:
+        after_date, after_clock_in, after_id = after
+        # Leading range on session_date keeps the seek predicate index-friendly
+        conditions.append("""s.session_date <= ? AND (
+            s.session_date < ?
+            OR s.clock_in < ?
+            OR (s.clock_in = ? AND s.id < ?))""")
+        params.extend([after_date, after_date, after_clock_in, after_clock_in, after_id])
+
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {backend.top(page_size)}{_SESSION_COLUMNS}
             FROM sessions s
             JOIN accounts a ON s.account_id = a.id
-            ORDER BY s.session_date DESC, s.clock_in DESC
-        """)
-        
-        sessions = cursor.fetchall()
-        conn.close()
-        
-        # Calculate idle minutes for each session
-        enhanced_sessions = []
-        for session in sessions:
-            session_list = list(session)
-            session_id = session_list[8]
-            
-            # Calculate sleep minutes for active sessions or use stored value
-            if session_list[3] is None:
-                sleep_minutes = calculate_sleep_minutes_for_session(session_id)
-                session_list[6] = sleep_minutes
-            
-            # Calculate idle minutes
-            idle_minutes = calculate_idle_minutes_simple(session_id)
-            session_list[7] = idle_minutes
-            
-            enhanced_sessions.append(tuple(session_list))
-        
-        return enhanced_sessions
+            {where}
+            ORDER BY s.session_date DESC, s.clock_in DESC, s.id DESC{backend.limit(page_size)}
+        """, params)
+        rows = cursor.fetchall()
+
+    now = datetime.now()
+    sessions = [_session_row(row, now) for row in rows]
+
+    next_cursor = None
+    if len(sessions) == page_size:
+        last = sessions[-1]
+        next_cursor = (last[4], last[2], last[8])
+
+    return sessions, next_cursor
+
+def fetch_session_changes(since, from_date=None, to_date=None, account_id=None, username_prefix=None,
+                          mac_address=None):
+    """Sessions changed since a watermark, and the watermark to pass next time.
+
+    since is the watermark from the previous call, or None to only read
+    the one to start from (take it before loading the full listing). A
+    session has changed when its row_version is at or above the
+    watermark; clocking in or out and each sleep/idle event folded into it
+    update the row. Open sessions with an idle period still running are
+    always returned, since their idle minutes grow without a write. Rows
+    are as in fetch_sessions_page, newest first, and filters work the
+    same. Deleted sessions are not reported.
+    """
+    backend = get_backend()
+    conditions, params = _session_filters(from_date, to_date, account_id, username_prefix, mac_address)
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        # Read before the changed rows so nothing committed in between is skipped
+        cursor.execute(backend.row_version_watermark())
+        watermark = cursor.fetchone()[0]
+        if since is None:
+            return [], watermark
+
+        # Separate statements so each can seek its own index
+        rows = {}
+        for changed, changed_params in (("s.row_version >= ?", [since]),
+                                        ("s.clock_out IS NULL AND s.idle_open_since IS NOT NULL", [])):
+            cursor.execute(f"""
+                SELECT {_SESSION_COLUMNS}
+                FROM sessions s
+                JOIN accounts a ON s.account_id = a.id
+                WHERE {" AND ".join([changed] + conditions)}
+            """, changed_params + params)
+            rows.update((row[7], row) for row in cursor.fetchall())
+
+    now = datetime.now()
+    sessions = [_session_row(row, now) for row in rows.values()]
+    sessions.sort(key=lambda session: (session[4], session[2], session[8]), reverse=True)
+    return sessions, watermark
+
+def fetch_all_sessions_with_idle():
+    """Fetch all sessions with complete sleep and idle information"""
+    try:
+        return fetch_sessions_with_idle()
         
     except Exception:
         return []
@@ -261,71 +586,21 @@ def fetch_all_sessions_with_idle():
 def get_active_sessions_with_status():
     """Get all active sessions with their current status including idle and sleep info"""
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        
-        cursor.execute("""
-            SELECT s.id, s.account_id, a.username, s.clock_in, s.device_mac_address
-            FROM sessions s
-            JOIN accounts a ON s.account_id = a.id
-            WHERE s.clock_out IS NULL
-            ORDER BY s.clock_in DESC
-        """)
-        
-        active_sessions = cursor.fetchall()
-        conn.close()
-        
-        sessions_with_status = []
-        for session in active_sessions:
-            session_id, account_id, username, clock_in, mac_address = session
-            
-            # Calculate current sleep and idle info
-            sleep_minutes = calculate_sleep_minutes_for_session(session_id)
-            idle_minutes = calculate_idle_minutes_simple(session_id)
-            is_idle = is_session_currently_idle_simple(session_id)
-            current_idle_duration = get_current_idle_duration_minutes(session_id) if is_idle else 0
-            
-            # Calculate work time
-            total_session_minutes = int((datetime.now() - clock_in).total_seconds() / 60)
-            work_minutes = max(0, total_session_minutes - sleep_minutes - idle_minutes)
-            
-            sessions_with_status.append({
-                'session_id': session_id,
-                'account_id': account_id,
-                'username': username,
-                'clock_in': clock_in,
-                'mac_address': mac_address or 'Unknown',
-                'is_idle': is_idle,
-                'sleep_minutes': sleep_minutes,
-                'idle_minutes': idle_minutes,
-                'work_minutes': work_minutes,
-                'total_minutes': total_session_minutes,
-                'current_idle_duration': current_idle_duration
-            })
-        
-        return sessions_with_status
+        from database.live_status import live_status_engine
+        return live_status_engine.snapshot()
         
     except Exception:
         return []
 
+def get_live_status_stats():
+    """Query count and latency of the last get_active_sessions_with_status call"""
+    from database.live_status import live_status_engine
+    return live_status_engine.stats()
+
 def fetch_sessions_by_date_range_with_idle(from_date, to_date):
     """Fetch sessions by date range with idle information"""
     try:
-        sessions = fetch_all_sessions_with_idle()
-        
-        # Filter by date range
-        filtered_sessions = []
-        for session in sessions:
-            session_date = session[4]
-            if isinstance(session_date, str):
-                session_date = datetime.strptime(session_date, '%Y-%m-%d').date()
-            elif hasattr(session_date, 'date'):
-                session_date = session_date.date()
-            
-            if from_date <= session_date <= to_date:
-                filtered_sessions.append(session)
-        
-        return filtered_sessions
+        return fetch_sessions_with_idle(from_date=from_date, to_date=to_date)
         
     except Exception:
         return []
@@ -345,106 +620,194 @@ def authenticate_user(username, password):
     """Authenticate user and register MAC address"""
     mac_address = get_mac_address()
     
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, role FROM accounts WHERE username = ? AND password = ? AND is_active = 1
-    """, (username, password))
-    row = cursor.fetchone()
-    
-    if row:
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("""
-            UPDATE accounts 
-            SET registered_mac_address = ? 
-            WHERE id = ?
-        """, (mac_address, row.id))
-        conn.commit()
-        conn.close()
-        return row.id, row.role
+            SELECT id, role FROM accounts WHERE username = ? AND password = ? AND is_active = 1
+        """, (username, password))
+        row = cursor.fetchone()
+        
+        if row:
+            cursor.execute("""
+                UPDATE accounts 
+                SET registered_mac_address = ? 
+                WHERE id = ?
+            """, (mac_address, row[0]))
+            return row[0], row[1]
     
-    conn.close()
     return None, None
 
+def login_session(username, password, mac_address=None, now=None):
+    """Authenticate, record the device and resume or start the session in one transaction.
+
+    Returns None for bad or disabled credentials, otherwise the dashboard's
+    initial state: a dict with account_id, role, session_id, clock_in,
+    resumed, sleep_minutes, idle_minutes, away_minutes, is_idle and
+    aggregates, the session's running aggregate columns for
+    utils.session_stats. On SQL Server the whole login is the LoginSession
+    procedure, a single round trip.
+    """
+    if mac_address is None:
+        mac_address = get_mac_address()
+    if now is None:
+        now = datetime.now()
+
+    backend = get_backend()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        procedure = backend.login_procedure()
+        if procedure:
+            cursor.execute(procedure, (username, password, mac_address, now))
+            # A procedure from an older SQL.txt returns no result set at all
+            # for refused credentials
+            row = cursor.fetchone() if cursor.description is not None else None
+            if row is None:
+                return None
+            account_id, role, session_id, clock_in = row[:4]
+            aggregates, resumed = tuple(row[4:11]), row[11]
+        else:
+            cursor.execute(f"""
+                SELECT a.id, a.role, a.registered_mac_address,
+                       s.id, s.clock_in, {", ".join("s." + column for column in _AGGREGATE_COLUMNS)}
+                FROM accounts a
+                LEFT JOIN sessions s ON s.id = (
+                    SELECT {backend.top(1)}id FROM sessions
+                    WHERE account_id = a.id AND clock_out IS NULL
+                    ORDER BY clock_in DESC{backend.limit(1)}
+                )
+                WHERE a.username = ? AND a.password = ? AND a.is_active = 1
+            """, (username, password))
+            row = cursor.fetchone()
+            if row is None:
+                return None
+            account_id, role, registered_mac, session_id, clock_in = row[:5]
+            aggregates = tuple(row[5:])
+
+            # Only write the device when it changed, so most logins stay read-only
+            if registered_mac != mac_address:
+                cursor.execute("UPDATE accounts SET registered_mac_address = ? WHERE id = ?",
+                               (mac_address, account_id))
+
+            resumed = session_id is not None
+            if not resumed:
+                cursor.execute(f"""
+                    INSERT INTO sessions (account_id, clock_in, session_date, device_mac_address)
+                    {backend.output('id')}
+                    VALUES (?, ?, ?, ?){backend.returning('id')}
+                """, (account_id, now, now.date(), mac_address))
+                session_id = cursor.fetchone()[0]
+                clock_in, aggregates = now, (0, 0, None, None, 0, 0, 0)
+
+    sleep_seconds, idle_seconds, sleep_open_since, idle_open_since, overlap_seconds, sleep_pending, _ = aggregates
+    if sleep_open_since is not None:
+        overlap_seconds -= sleep_pending
+    sleep_minutes, idle_minutes, away_minutes = _aggregate_minutes(
+        sleep_seconds, idle_seconds, idle_open_since, now, overlap_seconds)
+    return {
+        'account_id': account_id,
+        'role': role,
+        'session_id': session_id,
+        'clock_in': clock_in,
+        'resumed': bool(resumed),
+        'sleep_minutes': sleep_minutes,
+        'idle_minutes': idle_minutes,
+        'away_minutes': away_minutes,
+        'is_idle': idle_open_since is not None,
+        'aggregates': aggregates,
+    }
+
 def get_active_session(account_id):
     """Check if user has an active session"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT id, clock_in FROM sessions 
-        WHERE account_id = ? AND clock_out IS NULL
-        ORDER BY clock_in DESC
-    """, (account_id,))
-    row = cursor.fetchone()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, clock_in FROM sessions 
+            WHERE account_id = ? AND clock_out IS NULL
+            ORDER BY clock_in DESC
+        """, (account_id,))
+        row = cursor.fetchone()
     
     if row:
-        return row.id, row.clock_in
+        return row[0], row[1]
     return None, None
 
 def auto_clock_out_all_sessions(account_id):
     """Automatically clock out all active sessions for a user"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    cursor.execute("""
-        SELECT id, clock_in FROM sessions 
-        WHERE account_id = ? AND clock_out IS NULL
-    """, (account_id,))
-    
-    active_sessions = cursor.fetchall()
-    clock_out_time = datetime.now()
-    
-    for session_id, clock_in_time in active_sessions:
-        end_session(session_id, clock_out_time)
-    
-    conn.close()
-    return len(active_sessions)
+    closed = close_sessions(datetime.now(), account_id=account_id)
+    return sum(work_minutes is not None for _, work_minutes in closed)
 
 def fetch_all_users():
     try:
-        conn = get_connection()
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT id, username, role,
-                CASE WHEN is_active = 1 THEN 'Active' ELSE 'Disabled' END AS status,
-                ISNULL(registered_mac_address, 'Not Set') as mac_address
-            FROM accounts
-        """)
-        users = cursor.fetchall()
-        conn.close()
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                SELECT id, username, role,
+                    CASE WHEN is_active = 1 THEN 'Active' ELSE 'Disabled' END AS status,
+                    COALESCE(registered_mac_address, 'Not Set') as mac_address
+                FROM accounts
+            """)
+            users = cursor.fetchall()
         return users
     
     except Exception:
         return []
 
+def fetch_users_page(after=None, page_size=200, username_prefix=None):
+    """Fetch one page of accounts ordered by username using keyset pagination.
+
+    after is the last username of the previous page, or None for the
+    first page. Rows are (id, username, role, status, mac_address) as in
+    fetch_all_users. Returns the page and the cursor for the next one,
+    which is None once the last page is reached.
+    """
+    backend = get_backend()
+    conditions, params = [], []
+    if username_prefix and username_prefix.strip():
+        conditions.append("username LIKE ? ESCAPE '\\'")
+        params.append(_like_prefix(username_prefix.strip()))
+    if after is not None:
+        conditions.append("username > ?")
+        params.append(after)
+    where = "WHERE " + " AND ".join(conditions) if conditions else ""
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT {backend.top(page_size)}id, username, role,
+                CASE WHEN is_active = 1 THEN 'Active' ELSE 'Disabled' END AS status,
+                COALESCE(registered_mac_address, 'Not Set') as mac_address
+            FROM accounts
+            {where}
+            ORDER BY username{backend.limit(page_size)}
+        """, params)
+        users = cursor.fetchall()
+
+    next_cursor = users[-1][1] if len(users) == page_size else None
+    return users, next_cursor
+
 def create_user(username, password, role):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO accounts (username, password, role, is_active)
-        VALUES (?, ?, ?, 0)
-    """, (username, password, role))
-    conn.commit()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO accounts (username, password, role, is_active)
+            VALUES (?, ?, ?, 0)
+        """, (username, password, role))
 
 def toggle_user_status(user_id, new_status):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        UPDATE accounts 
-        SET is_active = ? 
-        WHERE id = ?
-    """, (1 if new_status == 'active' else 0, user_id))
-    conn.commit()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            UPDATE accounts 
+            SET is_active = ? 
+            WHERE id = ?
+        """, (1 if new_status == 'active' else 0, user_id))
     return True
 
 def delete_user(user_id):
     """Delete a user and all associated data"""
-    conn = get_connection()
-    cursor = conn.cursor()
-    
-    try:
+    # The pooled connection rolls the whole delete back if any step fails
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
         cursor.execute("""
             DELETE FROM sleep_events 
             WHERE session_id IN (
@@ -453,50 +816,39 @@ def delete_user(user_id):
         """, (user_id,))
         
         cursor.execute("DELETE FROM sessions WHERE account_id = ?", (user_id,))
+        cursor.execute("DELETE FROM daily_rollup WHERE account_id = ?", (user_id,))
+        cursor.execute("DELETE FROM activity_bitmap WHERE account_id = ?", (user_id,))
         cursor.execute("DELETE FROM feedback WHERE account_id = ?", (user_id,))
         cursor.execute("DELETE FROM accounts WHERE id = ?", (user_id,))
         
         if cursor.rowcount == 0:
             raise Exception("User not found or could not be deleted")
         
-        conn.commit()
-        conn.close()
-        return True
-        
-    except Exception as e:
-        conn.rollback()
-        conn.close()
-        raise e
+    return True
 
 def insert_feedback(account_id, mood, comment, anonymous):
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        INSERT INTO feedback (account_id, mood, comment, is_anonymous)
-        VALUES (?, ?, ?, ?)
-    """, (account_id, mood, comment, anonymous))
-    conn.commit()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            INSERT INTO feedback (account_id, mood, comment, is_anonymous)
+            VALUES (?, ?, ?, ?)
+        """, (account_id, mood, comment, anonymous))
 
 def fetch_all_feedback():
-    conn = get_connection()
-    cursor = conn.cursor()
-    cursor.execute("""
-        SELECT f.id, a.username, f.mood, f.comment, 
-               CASE WHEN f.is_anonymous = 1 THEN 'Yes' ELSE 'No' END as anonymous,
-               f.submitted_at
-        FROM feedback f
-        LEFT JOIN accounts a ON f.account_id = a.id
-        ORDER BY f.submitted_at DESC
-    """)
-    results = cursor.fetchall()
-    conn.close()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT f.id, a.username, f.mood, f.comment, 
+                   CASE WHEN f.is_anonymous = 1 THEN 'Yes' ELSE 'No' END as anonymous,
+                   f.submitted_at
+            FROM feedback f
+            LEFT JOIN accounts a ON f.account_id = a.id
+            ORDER BY f.submitted_at DESC
+        """)
+        results = cursor.fetchall()
     return results
 
 def fetch_filtered_feedback(start_date=None, end_date=None, mood='All', keyword=''):
-    conn = get_connection()
-    cursor = conn.cursor()
-
     query = """
         SELECT f.id, a.username, f.mood, f.comment, 
                CASE WHEN f.is_anonymous = 1 THEN 'Yes' ELSE 'No' END as anonymous,
@@ -508,8 +860,8 @@ def fetch_filtered_feedback(start_date=None, end_date=None, mood='All', keyword=
     params = []
 
     if start_date and end_date:
-        query += " AND CAST(f.submitted_at AS DATE) BETWEEN ? AND ?"
-        params.extend([start_date, end_date])
+        query += " AND f.submitted_at >= ? AND f.submitted_at < ?"
+        params.extend([_day_start(start_date), _day_start(end_date) + timedelta(days=1)])
 
     if mood != "All":
         query += " AND f.mood = ?"
@@ -523,11 +875,11 @@ def fetch_filtered_feedback(start_date=None, end_date=None, mood='All', keyword=
     query += " ORDER BY f.submitted_at DESC"
 
     try:
-        cursor.execute(query, params)
-        results = cursor.fetchall()
-        conn.close()
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            results = cursor.fetchall()
         return results
     
     except Exception:
-        conn.close()
         return []
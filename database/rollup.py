@@ -0,0 +1,139 @@
+# database/rollup.py
+import threading
+from datetime import datetime
+
+from database.activity import activity_days, refresh_activity
+from database.db_connection import get_backend, pooled_connection
+from database.queries import _like_prefix
+
+ROLLUP_WATERMARK = 'daily_rollup'
+
+# Dates recomputed per statement, keeping the IN lists a manageable size
+ROLLUP_BATCH_DAYS = 200
+
+_refresh_lock = threading.Lock()
+
+def _rollup_insert_sql(day_count):
+    """INSERT ... SELECT rebuilding daily_rollup rows for the given dates"""
+    placeholders = ", ".join("?" for _ in range(day_count))
+    # Only finished sessions are counted: an open one has no work minutes
+    # yet, so its idle time alone would skew the day. Per-session minutes
+    # are truncated before summing so a day's totals match the sum of the
+    # rows shown in the sessions table
+    return f"""
+        INSERT INTO daily_rollup (account_id, rollup_date, work_minutes, sleep_minutes, idle_minutes,
+                                  session_count, first_clock_in, last_clock_out, device_count)
+        SELECT s.account_id,
+               s.session_date,
+               SUM(COALESCE(s.total_work_minutes, 0)),
+               SUM(COALESCE(s.sleep_minutes, 0)),
+               SUM(CAST(s.idle_seconds / 60 AS INT)),
+               COUNT(*),
+               MIN(s.clock_in),
+               MAX(s.clock_out),
+               COUNT(DISTINCT s.device_mac_address)
+        FROM sessions s
+        WHERE s.account_id IS NOT NULL AND s.clock_out IS NOT NULL
+          AND s.session_date IN ({placeholders})
+        GROUP BY s.account_id, s.session_date
+    """
+
+def refresh_daily_rollup(full=False, now=None):
+    """Recompute daily_rollup for the days touched since the last refresh.
+
+    A day is touched when any of its sessions has a row_version at or above
+    the stored watermark, which is the backend's lowest possibly-uncommitted
+    version as of the previous refresh; clocking a session out touches it,
+    so its day is recomputed once it counts. With no watermark, or
+    full=True, every day is rebuilt. The activity bitmaps of the same
+    sessions are rebuilt alongside, and those of open sessions on every
+    call since they keep growing. Returns the number of days recomputed.
+
+    Meant to run on a schedule (the collector's --rollup-interval, or the
+    admin dashboard's throttled timer), not on every read of the rollup.
+    """
+    if now is None:
+        now = datetime.now()
+
+    backend = get_backend()
+    with _refresh_lock, pooled_connection() as conn:
+        cursor = conn.cursor()
+
+        cursor.execute("SELECT watermark FROM rollup_watermark WHERE name = ?", (ROLLUP_WATERMARK,))
+        row = cursor.fetchone()
+        watermark = None if full or not row else row[0]
+
+        # Read before the changed rows so nothing committed in between is skipped
+        cursor.execute(backend.row_version_watermark())
+        new_watermark = cursor.fetchone()[0]
+
+        # Dates are de-duplicated here: SELECT DISTINCT steers SQLite onto the
+        # date index instead of the row_version and open-session indexes
+        if watermark is None:
+            cursor.execute("DELETE FROM daily_rollup")
+            cursor.execute("SELECT DISTINCT session_date FROM sessions")
+            days = {row[0] for row in cursor.fetchall()}
+            touched = None
+        else:
+            # A session can run past midnight, so the activity bitmaps it
+            # touches are found from its clock-out as well
+            cursor.execute("SELECT session_date, clock_out FROM sessions WHERE row_version >= ?", (watermark,))
+            touched = cursor.fetchall()
+            days = {row[0] for row in touched}
+            cursor.execute("SELECT session_date, NULL FROM sessions WHERE clock_out IS NULL")
+            touched += cursor.fetchall()
+
+        days = sorted(days)
+        for offset in range(0, len(days), ROLLUP_BATCH_DAYS):
+            batch = days[offset:offset + ROLLUP_BATCH_DAYS]
+            placeholders = ", ".join("?" for _ in batch)
+            if watermark is not None:
+                cursor.execute(f"DELETE FROM daily_rollup WHERE rollup_date IN ({placeholders})", batch)
+            cursor.execute(_rollup_insert_sql(len(batch)), batch)
+
+        if touched is None:
+            refresh_activity(conn, now=now)
+        else:
+            refresh_activity(conn, {day for session_date, clock_out in touched
+                                    for day in activity_days(session_date, clock_out, now)}, now)
+
+        if new_watermark is not None:
+            cursor.execute("UPDATE rollup_watermark SET watermark = ? WHERE name = ?",
+                           (new_watermark, ROLLUP_WATERMARK))
+            if cursor.rowcount == 0:
+                cursor.execute("INSERT INTO rollup_watermark (name, watermark) VALUES (?, ?)",
+                               (ROLLUP_WATERMARK, new_watermark))
+
+    return len(days)
+
+def fetch_rollup_summary(from_date, to_date, account_id=None, username_prefix=None):
+    """Per-employee totals from daily_rollup for an inclusive date range.
+
+    Each row is (account_id, username, work, sleep, idle, session_count,
+    days_worked, first_clock_in, last_clock_out, max_devices_per_day),
+    ordered by username.
+    """
+    conditions = ["r.rollup_date >= ?", "r.rollup_date <= ?"]
+    params = [from_date, to_date]
+
+    if account_id is not None:
+        conditions.append("r.account_id = ?")
+        params.append(account_id)
+    if username_prefix:
+        conditions.append("a.username LIKE ? ESCAPE '\\'")
+        params.append(_like_prefix(username_prefix.strip()))
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"""
+            SELECT r.account_id, a.username,
+                   SUM(r.work_minutes), SUM(r.sleep_minutes), SUM(r.idle_minutes),
+                   SUM(r.session_count), COUNT(*),
+                   MIN(r.first_clock_in), MAX(r.last_clock_out), MAX(r.device_count)
+            FROM daily_rollup r
+            JOIN accounts a ON a.id = r.account_id
+            WHERE {" AND ".join(conditions)}
+            GROUP BY r.account_id, a.username
+            ORDER BY a.username
+        """, params)
+        return cursor.fetchall()
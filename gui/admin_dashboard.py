@@ -1,17 +1,21 @@
 # gui/admin_dashboard.py
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QPushButton, QTableWidget,
-    QTableWidgetItem, QHeaderView, QHBoxLayout, QMessageBox,
+    QWidget, QVBoxLayout, QLabel, QPushButton, QTableView,
+    QHeaderView, QHBoxLayout, QMessageBox,
     QGroupBox, QDateEdit, QLineEdit, QComboBox, QDialog,
     QTextEdit, QDialogButtonBox, QAbstractItemView
 )
 from PyQt5.QtCore import QTimer, QDate, Qt
-from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtGui import QBrush, QColor, QFont
 from datetime import datetime, date, timedelta
 import threading
+from gui.data_service import DataService
 from gui.manage_users import ManageUsers
+from gui.table_models import Column, ColumnTableModel
+from database.db_connection import load_db_config
+from database.rollup import fetch_rollup_summary, refresh_daily_rollup
 from database.queries import (
-    fetch_all_sessions_with_idle, fetch_sessions_by_date_range_with_idle, 
+    fetch_sessions_page, fetch_session_changes,
     fetch_filtered_feedback, insert_feedback, fetch_all_users, start_session, 
     end_session, get_active_session, auto_clock_out_all_sessions,
     get_active_sessions_with_status
@@ -22,6 +26,167 @@ from utils.session_timeout import start_timeout_monitor
 from utils.mac_address import get_mac_address
 from utils.idle_monitor import start_idle_monitoring, stop_idle_monitoring, get_idle_status
 
+SESSION_PAGE_SIZE = 200        # sessions fetched per page of the sessions table
+SESSION_PREFETCH_ROWS = 20     # fetch the next page this many rows before the end
+FILTER_DEBOUNCE_MS = 400       # quiet time after typing before the session filters apply
+SESSION_QUERY_TIMEOUT = 60     # seconds a sessions table load may run before its queries are stopped
+ROLLUP_REFRESH_SECONDS = 300   # seconds between daily_rollup refreshes when no server does them
+
+SESSION_HEADERS = [
+    "MAC Address", "Employee Name", "Clock In", "Clock Out",
+    "Date", "Work Time (min)", "Sleep Time (min)", "Idle Time (min)"
+]
+# Month and year views show one row of daily_rollup totals per employee
+SUMMARY_HEADERS = [
+    "Devices/Day", "Employee Name", "First Clock In", "Last Clock Out",
+    "Period", "Work Time (min)", "Sleep Time (min)", "Idle Time (min)"
+]
+LIVE_STATUS_HEADERS = [
+    "Employee", "MAC Address", "Clock In", "Total Time",
+    "Work Time", "Sleep Time", "Idle Time", "Current Status"
+]
+FEEDBACK_HEADERS = ["Employee Name", "Mood", "Comment", "Anonymous", "Submitted At"]
+
+# Cell styles, shared by every cell showing them rather than built per paint
+RED_BRUSH = QBrush(QColor(255, 200, 200))      # idle, or idle over an hour
+YELLOW_BRUSH = QBrush(QColor(255, 255, 200))   # over half an hour asleep or idle
+GREEN_BRUSH = QBrush(QColor(200, 255, 200))    # active
+IDLE_FONT = QFont("Arial", 10, QFont.Bold)
+
+def _minutes_field(field, suffix=""):
+    return lambda model, row: f"{model.value(row, field) or 0}{suffix}"
+
+def _hours_minutes_field(field):
+    def text(model, row):
+        hours, minutes = divmod(model.value(row, field), 60)
+        return f"{hours}h {minutes}m"
+    return text
+
+def _sleep_background(field):
+    return lambda model, row: YELLOW_BRUSH if (model.value(row, field) or 0) > 30 else None
+
+def _idle_background(field):
+    def background(model, row):
+        idle_minutes = model.value(row, field) or 0
+        if idle_minutes > 60:
+            return RED_BRUSH
+        if idle_minutes > 30:
+            return YELLOW_BRUSH
+        return None
+    return background
+
+def _session_row(session):
+    """fetch_sessions_page tuple with the Clock Out column's text appended"""
+    clock_out = session[3]
+    session_id, account_id = session[8], session[9]
+    clock_out_text = str(clock_out if clock_out else "🔴 Active")
+    # Show current status for active sessions
+    if not clock_out and session_id and account_id:
+        idle_status = get_idle_status(account_id, session_id)
+        if idle_status and idle_status.get('is_idle'):
+            clock_out_text = "🔴 Active (💤 Idle)"
+    return tuple(session) + (clock_out_text,)
+
+# Sessions table rows are fetch_sessions_page tuples, see _session_row
+SESSION_COLUMNS = [
+    Column(SESSION_HEADERS[0], 0),
+    Column(SESSION_HEADERS[1], 1),
+    Column(SESSION_HEADERS[2], 2),
+    Column(SESSION_HEADERS[3], 3, text=lambda model, row: model.value(row, 10), fields=(3, 10)),
+    Column(SESSION_HEADERS[4], 4),
+    Column(SESSION_HEADERS[5], 5, text=_minutes_field(5)),
+    Column(SESSION_HEADERS[6], 6, text=_minutes_field(6), background=_sleep_background(6)),
+    Column(SESSION_HEADERS[7], 7, text=_minutes_field(7), background=_idle_background(7)),
+]
+SESSION_FIELDS = 11
+
+# Summary rows are fetch_rollup_summary rows with the period appended
+SUMMARY_COLUMNS = [
+    Column(SUMMARY_HEADERS[0], 9),
+    Column(SUMMARY_HEADERS[1], 1),
+    Column(SUMMARY_HEADERS[2], 7),
+    Column(SUMMARY_HEADERS[3], 8, text=lambda model, row: str(model.value(row, 8) or "🔴 Active")),
+    Column(SUMMARY_HEADERS[4], 10, text=lambda model, row: f"{model.value(row, 10)} ({model.value(row, 6)} days, "
+                                                           f"{model.value(row, 5)} sessions)",
+           fields=(5, 6, 10)),
+    Column(SUMMARY_HEADERS[5], 2),
+    Column(SUMMARY_HEADERS[6], 3),
+    Column(SUMMARY_HEADERS[7], 4),
+]
+SUMMARY_FIELDS = 11
+
+def _live_status_background(model, row):
+    return RED_BRUSH if model.value(row, 7) else GREEN_BRUSH
+
+def _live_status_font(model, row):
+    return IDLE_FONT if model.value(row, 7) else None
+
+def _live_status_text(model, row):
+    if model.value(row, 7):
+        return f"💤 Idle ({model.value(row, 8)}m)"
+    return "💻 Active"
+
+# Live status rows: (username, mac, clock_in, total, work, sleep, idle,
+# is_idle, current_idle_duration, session_id), see _live_status_row
+LIVE_STATUS_COLUMNS = [
+    Column(LIVE_STATUS_HEADERS[0], 0, background=_live_status_background, font=_live_status_font, fields=(0, 7)),
+    Column(LIVE_STATUS_HEADERS[1], 1),
+    Column(LIVE_STATUS_HEADERS[2], 2, text=lambda model, row: model.value(row, 2).strftime('%H:%M:%S')
+                                                              if model.value(row, 2) else 'Unknown'),
+    Column(LIVE_STATUS_HEADERS[3], 3, text=_hours_minutes_field(3)),
+    Column(LIVE_STATUS_HEADERS[4], 4, text=_hours_minutes_field(4)),
+    Column(LIVE_STATUS_HEADERS[5], 5, text=_minutes_field(5, "m"), background=_sleep_background(5)),
+    Column(LIVE_STATUS_HEADERS[6], 6, text=_minutes_field(6, "m"), background=_idle_background(6)),
+    Column(LIVE_STATUS_HEADERS[7], 8, text=_live_status_text, background=_live_status_background,
+           font=_live_status_font, fields=(7, 8)),
+]
+LIVE_STATUS_FIELDS = 10
+
+def _live_status_row(session):
+    return (session['username'], session['mac_address'], session['clock_in'], session['total_minutes'],
+            session['work_minutes'], session['sleep_minutes'], session['idle_minutes'], session['is_idle'],
+            session['current_idle_duration'], session['session_id'])
+
+def _truncated_comment(model, row):
+    comment = model.value(row, 3)
+    if not comment:
+        return ""
+    return comment[:50] + "..." if len(comment) > 50 else comment
+
+# Feedback rows are fetch_filtered_feedback rows
+FEEDBACK_COLUMNS = [
+    Column(FEEDBACK_HEADERS[0], 1, text=lambda model, row: model.value(row, 1) or "Anonymous"),
+    Column(FEEDBACK_HEADERS[1], 2),
+    Column(FEEDBACK_HEADERS[2], 3, text=_truncated_comment),
+    Column(FEEDBACK_HEADERS[3], 4),
+    Column(FEEDBACK_HEADERS[4], 5, text=lambda model, row: model.value(row, 5).strftime("%Y-%m-%d %H:%M:%S")),
+]
+FEEDBACK_FIELDS = 6
+
+def _table_view(model):
+    """Read-only view over a ColumnTableModel, sortable by clicking a header"""
+    view = QTableView()
+    view.setModel(model)
+    view.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    view.setSelectionBehavior(QAbstractItemView.SelectRows)
+    view.verticalHeader().setVisible(False)
+    # Rows first show in the order they were loaded
+    view.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+    view.setSortingEnabled(True)
+    return view
+
+def _load_sessions_page(page_size, filters):
+    """(watermark, sessions, cursor) for the first page of the sessions table"""
+    # Taken first so changes made while the page loads are patched in later
+    _, watermark = fetch_session_changes(None)
+    sessions, cursor = fetch_sessions_page(None, page_size, **filters)
+    return watermark, sessions, cursor
+
+def _load_session_summary(filters):
+    """Per-employee daily_rollup totals for the filtered period, as last refreshed"""
+    return fetch_rollup_summary(filters['from_date'], filters['to_date'],
+                                username_prefix=filters.get('username_prefix'))
+
 class CommentViewDialog(QDialog):
     """Dialog to view full comment text"""
     def __init__(self, comment, parent=None):
@@ -48,7 +213,7 @@ class CommentViewDialog(QDialog):
         self.setLayout(layout)
 
 class AdminDashboard(QWidget):
-    def __init__(self, account_id):
+    def __init__(self, account_id, login_state=None):
         super().__init__()
         self.account_id = account_id
         self.current_session_id = None
@@ -56,6 +221,13 @@ class AdminDashboard(QWidget):
         self.manage_window = None
         self.feedback_given = False
         self.feedback_shown = False
+        self.session_filters = {}
+        self.session_summary = None
+        self.session_cursor = None
+        self.session_watermark = None   # row_version the next delta refresh starts from
+        self.session_keys = []          # (date, clock_in, id) of each sessions table row, newest first
+        self.session_rows = {}          # session_id -> sessions table row
+        self.data_service = DataService(self)
 
         self.setWindowTitle("Admin Dashboard - Live Employee Monitoring")
         self.resize(1600, 1000)
@@ -85,7 +257,7 @@ class AdminDashboard(QWidget):
                 background-color: #cccccc; 
                 color: #555555; 
             }
-            QTableWidget { 
+            QTableView { 
                 background-color: #ffffff; 
                 font-size: 13px; 
             }
@@ -110,7 +282,17 @@ class AdminDashboard(QWidget):
         self.status_update_timer = QTimer()
         self.status_update_timer.timeout.connect(self.update_live_status)
 
-        self.check_and_handle_existing_session()
+        # daily_rollup is refreshed off the read path: by the collector or a
+        # SQL Agent job when "server_rollup" is set, otherwise on this timer
+        self.rollup_timer = QTimer()
+        self.rollup_timer.timeout.connect(self.refresh_rollup)
+
+        # login_session already resumed or started the session
+        if login_state:
+            self.current_session_id = login_state['session_id']
+            self.clock_in_time = login_state['clock_in']
+        else:
+            self.check_and_handle_existing_session()
 
         self.create_header_elements()
         self.create_live_status_section()
@@ -126,6 +308,9 @@ class AdminDashboard(QWidget):
         self.load_feedback()
         
         self.status_update_timer.start(10000)
+        if not load_db_config().get("server_rollup"):
+            self.refresh_rollup()
+            self.rollup_timer.start(ROLLUP_REFRESH_SECONDS * 1000)
 
     def create_header_elements(self):
         """Create header labels and status display"""
@@ -146,13 +331,8 @@ class AdminDashboard(QWidget):
         self.live_summary_label.setStyleSheet("font-size: 16px; color: #2c3e50; font-weight: bold;")
         live_status_layout.addWidget(self.live_summary_label)
         
-        self.live_status_table = QTableWidget()
-        self.live_status_table.setColumnCount(8)
-        self.live_status_table.setHorizontalHeaderLabels([
-            "Employee", "MAC Address", "Clock In", "Total Time", 
-            "Work Time", "Sleep Time", "Idle Time", "Current Status"
-        ])
-        self.live_status_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+        self.live_status_model = ColumnTableModel(LIVE_STATUS_COLUMNS, LIVE_STATUS_FIELDS, self)
+        self.live_status_table = _table_view(self.live_status_model)
         self.live_status_table.setMaximumHeight(200)
         
         live_status_layout.addWidget(self.live_status_table)
@@ -175,12 +355,12 @@ class AdminDashboard(QWidget):
 
         session_filter_layout.addWidget(QLabel("Employee:"))
         self.employee_search = QLineEdit()
-        self.employee_search.setPlaceholderText("Search employee name...")
+        self.employee_search.setPlaceholderText("Employee name starts with...")
         session_filter_layout.addWidget(self.employee_search)
 
         session_filter_layout.addWidget(QLabel("MAC:"))
         self.mac_search = QLineEdit()
-        self.mac_search.setPlaceholderText("Search MAC address...")
+        self.mac_search.setPlaceholderText("MAC address starts with...")
         session_filter_layout.addWidget(self.mac_search)
 
         self.day_combo = QComboBox()
@@ -200,7 +380,18 @@ class AdminDashboard(QWidget):
             self.year_combo.addItem(str(year))
 
         self.apply_session_filter_btn = QPushButton("Apply Filter")
-        self.apply_session_filter_btn.clicked.connect(self.filter_sessions_by_dropdowns)
+        self.apply_session_filter_btn.clicked.connect(lambda: self.filter_sessions_by_dropdowns())
+
+        # Filters also apply on their own once the user pauses, a single
+        # load per burst of keystrokes or combo changes
+        self.filter_debounce_timer = QTimer(self)
+        self.filter_debounce_timer.setSingleShot(True)
+        self.filter_debounce_timer.setInterval(FILTER_DEBOUNCE_MS)
+        self.filter_debounce_timer.timeout.connect(lambda: self.filter_sessions_by_dropdowns(warn=False))
+        for search in (self.employee_search, self.mac_search):
+            search.textChanged.connect(self.filter_debounce_timer.start)
+        for combo in (self.day_combo, self.month_combo, self.year_combo):
+            combo.currentIndexChanged.connect(self.filter_debounce_timer.start)
 
         self.clear_session_filter_btn = QPushButton("Clear Filter")
         self.clear_session_filter_btn.clicked.connect(self.clear_session_filters)
@@ -256,23 +447,16 @@ class AdminDashboard(QWidget):
 
     def create_tables(self):
         """Create data tables with proper sleep and idle columns"""
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels([
-            "MAC Address", "Employee Name", "Clock In", "Clock Out", 
-            "Date", "Work Time (min)", "Sleep Time (min)", "Idle Time (min)"
-        ])
-        self.table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
-
-        self.feedback_table = QTableWidget()
-        self.feedback_table.setColumnCount(5)
-        self.feedback_table.setHorizontalHeaderLabels([
-            "Employee Name", "Mood", "Comment", "Anonymous", "Submitted At"
-        ])
-        self.feedback_table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
-        self.feedback_table.setSelectionBehavior(QAbstractItemView.SelectRows)
-        self.feedback_table.cellDoubleClicked.connect(self.show_full_comment)
+        # The sessions view shows the session rows or, for month and year
+        # filters, the per-employee totals
+        self.sessions_model = ColumnTableModel(SESSION_COLUMNS, SESSION_FIELDS, self)
+        self.summary_model = ColumnTableModel(SUMMARY_COLUMNS, SUMMARY_FIELDS, self)
+        self.table = _table_view(self.sessions_model)
+        self.table.verticalScrollBar().valueChanged.connect(self.on_sessions_scrolled)
+
+        self.feedback_model = ColumnTableModel(FEEDBACK_COLUMNS, FEEDBACK_FIELDS, self)
+        self.feedback_table = _table_view(self.feedback_model)
+        self.feedback_table.doubleClicked.connect(self.show_full_comment)
 
     def create_layout(self):
         """Create and set the main layout"""
@@ -342,10 +526,15 @@ class AdminDashboard(QWidget):
                 pass
 
     def update_live_status(self):
+        """Refresh the live status and the sessions table in the background"""
+        self.data_service.submit('live_status', get_active_sessions_with_status,
+                                 on_result=self.show_live_status,
+                                 on_error=lambda e: self.live_summary_label.setText("❌ Error loading live status"))
+        self.refresh_sessions()
+
+    def show_live_status(self, active_sessions):
         """Update live status of all active sessions"""
         try:
-            active_sessions = get_active_sessions_with_status()
-            
             total_active = len(active_sessions)
             idle_count = sum(1 for session in active_sessions if session['is_idle'])
             active_count = total_active - idle_count
@@ -359,76 +548,35 @@ class AdminDashboard(QWidget):
             
             self.populate_live_status_table(active_sessions)
             
-            self.load_sessions()
-            
         except Exception:
             self.live_summary_label.setText("❌ Error loading live status")
 
     def populate_live_status_table(self, active_sessions):
         """Populate the live status table with real-time data"""
         try:
-            self.live_status_table.setRowCount(len(active_sessions))
-            
-            for row_idx, session in enumerate(active_sessions):
-                name_item = QTableWidgetItem(session['username'])
-                if session['is_idle']:
-                    name_item.setBackground(QColor(255, 200, 200))
-                    name_item.setFont(QFont("Arial", 10, QFont.Bold))
-                else:
-                    name_item.setBackground(QColor(200, 255, 200))
-                
-                self.live_status_table.setItem(row_idx, 0, name_item)
-                
-                self.live_status_table.setItem(row_idx, 1, QTableWidgetItem(session['mac_address']))
-                
-                clock_in_str = session['clock_in'].strftime('%H:%M:%S') if session['clock_in'] else 'Unknown'
-                self.live_status_table.setItem(row_idx, 2, QTableWidgetItem(clock_in_str))
-                
-                total_hours = session['total_minutes'] // 60
-                total_mins = session['total_minutes'] % 60
-                self.live_status_table.setItem(row_idx, 3, QTableWidgetItem(f"{total_hours}h {total_mins}m"))
-                
-                work_hours = session['work_minutes'] // 60
-                work_mins = session['work_minutes'] % 60
-                self.live_status_table.setItem(row_idx, 4, QTableWidgetItem(f"{work_hours}h {work_mins}m"))
-                
-                sleep_item = QTableWidgetItem(f"{session['sleep_minutes']}m")
-                if session['sleep_minutes'] > 30:
-                    sleep_item.setBackground(QColor(255, 255, 200))
-                self.live_status_table.setItem(row_idx, 5, sleep_item)
-                
-                idle_item = QTableWidgetItem(f"{session['idle_minutes']}m")
-                if session['idle_minutes'] > 60:
-                    idle_item.setBackground(QColor(255, 200, 200))
-                elif session['idle_minutes'] > 30:
-                    idle_item.setBackground(QColor(255, 255, 200))
-                self.live_status_table.setItem(row_idx, 6, idle_item)
-                
-                if session['is_idle']:
-                    idle_duration = session['current_idle_duration']
-                    status_text = f"💤 Idle ({idle_duration}m)"
-                    status_item = QTableWidgetItem(status_text)
-                    status_item.setBackground(QColor(255, 200, 200))
-                    status_item.setFont(QFont("Arial", 10, QFont.Bold))
-                else:
-                    status_item = QTableWidgetItem("💻 Active")
-                    status_item.setBackground(QColor(200, 255, 200))
-                
-                self.live_status_table.setItem(row_idx, 7, status_item)
-                
+            # Merged by session_id into the last snapshot: only sessions that
+            # started or ended add or remove rows, and only changed cells repaint
+            self.live_status_model.set_rows([_live_status_row(session) for session in active_sessions],
+                                            key_field=9)
         except Exception:
             pass
 
-    def filter_sessions_by_dropdowns(self):
-        """Filter sessions based on dropdown selections and text inputs"""
+    def filter_sessions_by_dropdowns(self, warn=True):
+        """Filter sessions based on dropdown selections and text inputs.
+
+        An impossible date is reported when warn is set and otherwise left
+        until the user finishes picking it.
+        """
+        self.filter_debounce_timer.stop()
         day = self.day_combo.currentText()
         month = self.month_combo.currentText()
         year = self.year_combo.currentText()
-        employee_search = self.employee_search.text().strip().lower()
-        mac_search = self.mac_search.text().strip().lower()
+        employee_search = self.employee_search.text().strip()
+        mac_search = self.mac_search.text().strip()
         
         start_date = None
         end_date = None
+        period = None
 
         try:
             if year != "Year":
@@ -448,32 +596,26 @@ class AdminDashboard(QWidget):
                             end_date = date(year_int + 1, 1, 1) - timedelta(days=1)
                         else:
                             end_date = date(year_int, month_int + 1, 1) - timedelta(days=1)
+                        period = f"{month} {year_int}"
                 else:
                     start_date = date(year_int, 1, 1)
                     end_date = date(year_int, 12, 31)
-
-            if start_date and end_date:
-                sessions = fetch_sessions_by_date_range_with_idle(start_date, end_date)
-            else:
-                sessions = fetch_all_sessions_with_idle()
-            
-            if employee_search or mac_search:
-                filtered_sessions = []
-                for session in sessions:
-                    mac_address, username = session[0], session[1]
-                    
-                    employee_match = not employee_search or employee_search in username.lower()
-                    mac_match = not mac_search or mac_search in mac_address.lower()
-                    
-                    if employee_match and mac_match:
-                        filtered_sessions.append(session)
-                sessions = filtered_sessions
-                
-            self.populate_sessions_table(sessions)
+                    period = str(year_int)
+
+            # The rollup has no per-device rows, so a MAC search lists sessions
+            self.session_summary = period if period and not mac_search else None
+            self.session_filters = {
+                'from_date': start_date,
+                'to_date': end_date,
+                'username_prefix': employee_search or None,
+                'mac_address': mac_search or None,
+            }
+            self.load_sessions(reset=True)
         
         except (ValueError, TypeError):
-            QMessageBox.warning(self, "Invalid Date", "Please select a valid date combination.")
-            self.load_sessions()
+            if warn:
+                QMessageBox.warning(self, "Invalid Date", "Please select a valid date combination.")
+                self.load_sessions()
 
     def clear_session_filters(self):
         """Clear all session filters"""
@@ -482,7 +624,10 @@ class AdminDashboard(QWidget):
         self.day_combo.setCurrentIndex(0)
         self.month_combo.setCurrentIndex(0)
         self.year_combo.setCurrentIndex(0)
-        self.load_sessions()
+        self.filter_debounce_timer.stop()
+        self.session_filters = {}
+        self.session_summary = None
+        self.load_sessions(reset=True)
 
     def clear_feedback_filters(self):
         """Clear all feedback filters"""
@@ -492,12 +637,11 @@ class AdminDashboard(QWidget):
         self.keyword_input.clear()
         self.load_feedback()
 
-    def show_full_comment(self, row, column):
+    def show_full_comment(self, index):
         """Show full comment in dialog when user double-clicks"""
-        if column == 2:
-            comment_item = self.feedback_table.item(row, 2)
-            if comment_item:
-                comment = comment_item.text()
+        if index.column() == 2:
+            comment = self.feedback_model.value(self.feedback_model.stored_row(index.row()), 3)
+            if comment:
                 dialog = CommentViewDialog(comment, self)
                 dialog.exec_()
 
@@ -509,73 +653,166 @@ class AdminDashboard(QWidget):
             hours, minutes = divmod(minutes, 60)
             self.timer_label.setText(f"⏱ Admin Session Time: {hours:02d}:{minutes:02d}:{seconds:02d}")
 
-    def load_sessions(self):
-        """Load all sessions from database with complete idle and sleep information"""
-        try:
-            sessions = fetch_all_sessions_with_idle()
-            self.populate_sessions_table(sessions)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load sessions: {str(e)}")
-
-    def populate_sessions_table(self, sessions):
+    def load_sessions(self, reset=False):
+        """Reload the sessions table from the first page using the active filters.
+
+        A periodic refresh keeps as many rows as are already loaded so the
+        user's scroll position survives; reset goes back to a single page.
+        Month and year views load per-employee totals instead.
+        """
+        if self.session_summary:
+            self.load_session_summary()
+            return
+
+        page_size = SESSION_PAGE_SIZE if reset else max(SESSION_PAGE_SIZE, self.sessions_model.rowCount())
+        # A new load replaces the table, so one still running is cancelled
+        self.data_service.submit('sessions', _load_sessions_page, page_size, dict(self.session_filters),
+                                 on_result=lambda result: self.show_sessions_page(result, reset),
+                                 on_error=self.error_box("Failed to load sessions"),
+                                 supersede=True, timeout=SESSION_QUERY_TIMEOUT)
+
+    def show_sessions_page(self, result, reset):
+        watermark, sessions, self.session_cursor = result
+        self.populate_sessions_table(sessions)
+        self.session_watermark = watermark
+        if reset:
+            self.table.scrollToTop()
+
+    def refresh_sessions(self):
+        """Patch sessions changed since the last load into the table instead of reloading it"""
+        # A load already under way brings the table up to date
+        if self.data_service.busy('sessions'):
+            return
+        if self.session_summary or self.session_watermark is None:
+            self.load_sessions()
+            return
+
+        self.data_service.submit('sessions', fetch_session_changes, self.session_watermark,
+                                 **self.session_filters,
+                                 on_result=self.apply_session_changes,
+                                 on_error=self.error_box("Failed to refresh sessions"),
+                                 timeout=SESSION_QUERY_TIMEOUT)
+
+    def apply_session_changes(self, result):
+        sessions, self.session_watermark = result
+        self.patch_sessions_table(sessions)
+
+    def load_session_summary(self):
+        """Load per-employee totals for the selected month or year from daily_rollup"""
+        period = self.session_summary
+        self.data_service.submit('sessions', _load_session_summary, dict(self.session_filters),
+                                 on_result=lambda rows: self.show_session_summary(rows, period),
+                                 on_error=self.error_box("Failed to load session totals"),
+                                 supersede=True, timeout=SESSION_QUERY_TIMEOUT)
+
+    def refresh_rollup(self):
+        """Bring daily_rollup up to date in the background"""
+        if self.data_service.busy('rollup'):
+            return
+        self.data_service.submit('rollup', refresh_daily_rollup,
+                                 on_result=self.rollup_refreshed,
+                                 on_error=lambda e: print(f"Error refreshing daily rollup: {e}"))
+
+    def rollup_refreshed(self, days):
+        if days and self.session_summary:
+            self.load_session_summary()
+
+    def show_session_summary(self, rows, period):
+        self.session_cursor = None
+        self.session_watermark = None
+        self.populate_summary_table(rows, period)
+
+    def load_next_sessions_page(self):
+        """Append the next page of sessions, if there is one"""
+        if self.session_cursor is None or self.data_service.busy('sessions'):
+            return
+
+        self.data_service.submit('sessions', fetch_sessions_page, self.session_cursor, SESSION_PAGE_SIZE,
+                                 **self.session_filters,
+                                 on_result=self.append_sessions_page,
+                                 on_error=self.error_box("Failed to load more sessions"),
+                                 timeout=SESSION_QUERY_TIMEOUT)
+
+    def append_sessions_page(self, result):
+        sessions, self.session_cursor = result
+        self.populate_sessions_table(sessions, append=True)
+
+    def error_box(self, message):
+        """on_error callback reporting a failed background load in a message box"""
+        return lambda e: QMessageBox.critical(self, "Error", f"{message}: {str(e)}")
+
+    def on_sessions_scrolled(self, value):
+        """Fetch the next page as the user nears the bottom of the sessions table"""
+        scroll_bar = self.table.verticalScrollBar()
+        if value >= scroll_bar.maximum() - SESSION_PREFETCH_ROWS:
+            self.load_next_sessions_page()
+
+    def populate_sessions_table(self, sessions, append=False):
         """Populate table with sessions data including complete sleep and idle time"""
         try:
-            self.table.setRowCount(len(sessions))
-            for row_idx, session in enumerate(sessions):
-                if len(session) >= 9:
-                    mac_address, username, clock_in, clock_out, session_date, work_minutes, sleep_minutes, idle_minutes, session_id = session[:9]
-                    account_id = session[9] if len(session) > 9 else None
-                else:
-                    mac_address, username, clock_in, clock_out, session_date, work_minutes, sleep_minutes = session
-                    idle_minutes = 0
-                    session_id = None
-                    account_id = None
-                
-                work_minutes = work_minutes if work_minutes is not None else 0
-                sleep_minutes = sleep_minutes if sleep_minutes is not None else 0
-                idle_minutes = idle_minutes if idle_minutes is not None else 0
-                
-                work_item = QTableWidgetItem(str(work_minutes))
-                
-                sleep_item = QTableWidgetItem(str(sleep_minutes))
-                if sleep_minutes > 30:
-                    sleep_item.setBackground(QColor(255, 255, 200))
-                
-                idle_item = QTableWidgetItem(str(idle_minutes))
-                if idle_minutes > 60:
-                    idle_item.setBackground(QColor(255, 200, 200))
-                elif idle_minutes > 30:
-                    idle_item.setBackground(QColor(255, 255, 200))
-                
-                # Set all table items
-                self.table.setItem(row_idx, 0, QTableWidgetItem(str(mac_address)))
-                self.table.setItem(row_idx, 1, QTableWidgetItem(str(username)))
-                self.table.setItem(row_idx, 2, QTableWidgetItem(str(clock_in)))
-                
-                # Show current status for active sessions
-                clock_out_text = str(clock_out if clock_out else "🔴 Active")
-                if not clock_out and session_id and account_id:
-                    # Check if currently idle
-                    idle_status = get_idle_status(account_id, session_id)
-                    if idle_status and idle_status.get('is_idle'):
-                        clock_out_text = "🔴 Active (💤 Idle)"
-                
-                self.table.setItem(row_idx, 3, QTableWidgetItem(clock_out_text))
-                self.table.setItem(row_idx, 4, QTableWidgetItem(str(session_date)))
-                self.table.setItem(row_idx, 5, work_item)
-                self.table.setItem(row_idx, 6, sleep_item)
-                self.table.setItem(row_idx, 7, idle_item)
-                
+            if not append:
+                self.show_model(self.sessions_model)
+                self.session_keys = []
+                self.session_rows = {}
+            first_row = self.sessions_model.rowCount() if append else 0
+            for row_idx, session in enumerate(sessions, start=first_row):
+                key = self.session_key(session)
+                self.session_keys.append(key)
+                self.session_rows[key[2]] = row_idx
+            rows = [_session_row(session) for session in sessions]
+            if append:
+                self.sessions_model.append_rows(rows)
+            else:
+                self.sessions_model.set_rows(rows)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to populate sessions table: {str(e)}")
 
+    def patch_sessions_table(self, sessions):
+        """Rewrite the rows of changed sessions and insert new ones where they sort.
+
+        Sessions sorting after the last loaded row are left to arrive with
+        their page. Rows are positions in load order, whatever column the
+        view is sorted by.
+        """
+        for session in sessions:
+            key = self.session_key(session)
+            row_idx = self.session_rows.get(key[2])
+            if row_idx is not None:
+                self.sessions_model.update_row(row_idx, _session_row(session))
+                continue
+            if self.session_cursor is not None and key < self.session_cursor:
+                continue
+            row_idx = next((index for index, loaded in enumerate(self.session_keys) if loaded < key),
+                           len(self.session_keys))
+            self.session_keys.insert(row_idx, key)
+            self.session_rows = {loaded[2]: index for index, loaded in enumerate(self.session_keys)}
+            self.sessions_model.insert_rows(row_idx, [_session_row(session)])
+
+    @staticmethod
+    def session_key(session):
+        """(date, clock_in, id) ordering a session row in the table"""
+        return (session[4], session[2], session[8])
+
+    def populate_summary_table(self, rows, period):
+        """Populate table with one row of period totals per employee"""
+        self.summary_model.set_rows([tuple(row) + (period,) for row in rows])
+        self.show_model(self.summary_model)
+        self.table.scrollToTop()
+
+    def show_model(self, model):
+        """Switch the sessions view between the sessions and summary models"""
+        if self.table.model() is model:
+            return
+        # Each model starts unsorted, like the view's header
+        self.table.horizontalHeader().setSortIndicator(-1, Qt.AscendingOrder)
+        model.sort(-1)
+        self.table.setModel(model)
+
     def load_feedback(self):
         """Load all feedback from database"""
-        try:
-            feedbacks = fetch_filtered_feedback()
-            self.populate_feedback_table(feedbacks)
-        except Exception as e:
-            QMessageBox.critical(self, "Error", f"Failed to load feedback: {str(e)}")
+        self.data_service.submit('feedback', fetch_filtered_feedback,
+                                 on_result=self.populate_feedback_table,
+                                 on_error=self.error_box("Failed to load feedback"))
 
     def load_feedback_filtered(self):
         """Load filtered feedback based on user selections"""
@@ -585,34 +822,25 @@ class AdminDashboard(QWidget):
             mood = self.mood_filter.currentText()
             keyword = self.keyword_input.text()
             
-            feedbacks = fetch_filtered_feedback(start_date, end_date, mood, keyword)
-            self.populate_feedback_table(feedbacks)
+            self.data_service.submit('feedback', fetch_filtered_feedback, start_date, end_date, mood, keyword,
+                                     on_result=self.populate_feedback_table,
+                                     on_error=self.error_box("Failed to filter feedback"),
+                                     supersede=True)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to filter feedback: {str(e)}")
 
     def populate_feedback_table(self, feedbacks):
         """Populate feedback table with data"""
         try:
-            self.feedback_table.setRowCount(len(feedbacks))
-            for row_idx, feedback in enumerate(feedbacks):
-                feedback_id, username, mood, comment, anonymous, submitted_at = feedback
-                display_name = username if username else "Anonymous"
-                self.feedback_table.setItem(row_idx, 0, QTableWidgetItem(display_name))
-                self.feedback_table.setItem(row_idx, 1, QTableWidgetItem(mood))
-                
-                truncated_comment = ""
-                if comment:
-                    truncated_comment = comment[:50] + "..." if len(comment) > 50 else comment
-                
-                self.feedback_table.setItem(row_idx, 2, QTableWidgetItem(truncated_comment))
-                self.feedback_table.setItem(row_idx, 3, QTableWidgetItem(anonymous))
-                self.feedback_table.setItem(row_idx, 4, QTableWidgetItem(submitted_at.strftime("%Y-%m-%d %H:%M:%S")))
+            self.feedback_model.set_rows(feedbacks)
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to populate feedback table: {str(e)}")
 
     def refresh_all(self):
         """Refresh all data and live status"""
         self.update_live_status()
+        # A full reload also drops sessions deleted since, which deltas do not report
+        self.load_sessions()
         self.load_feedback()
 
     def open_manage_users(self):
@@ -669,6 +897,10 @@ class AdminDashboard(QWidget):
             if self.manage_window and self.manage_window.isVisible():
                 self.manage_window.close()
 
+            self.status_update_timer.stop()
+            self.rollup_timer.stop()
+            self.data_service.shutdown()
+
             if self.current_session_id:
                 stop_idle_monitoring(self.account_id, self.current_session_id)
 
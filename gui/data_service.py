@@ -0,0 +1,116 @@
+# gui/data_service.py
+from PyQt5.QtCore import QObject, QRunnable, QThreadPool, pyqtSignal
+
+from database.db_connection import CancelToken
+
+DEFAULT_MAX_THREADS = 4   # database calls a window runs at once
+
+class _TaskSignals(QObject):
+    # task, whether it succeeded, and its result or exception
+    done = pyqtSignal(object, bool, object)
+
+class _Task(QRunnable):
+    """One blocking call run on a pool thread"""
+
+    def __init__(self, kind, func, args, kwargs, on_result, on_error, timeout=None):
+        super().__init__()
+        # Kept alive by the service until its result is delivered, not by the pool
+        self.setAutoDelete(False)
+        self.kind = kind
+        self.func = func
+        self.args = args
+        self.kwargs = kwargs
+        self.on_result = on_result
+        self.on_error = on_error
+        self.token = CancelToken(timeout)
+        self.signals = _TaskSignals()
+
+    def run(self):
+        try:
+            with self.token:
+                result = self.func(*self.args, **self.kwargs)
+        except Exception as e:
+            self.signals.done.emit(self, False, e)
+        else:
+            self.signals.done.emit(self, True, result)
+
+class DataService(QObject):
+    """Runs a window's database calls on a thread pool and hands the results back on the GUI thread.
+
+    Every call has a kind, such as "live_status" or "sessions". At most one
+    call of a kind runs at a time: one submitted meanwhile waits, and a
+    later submission of the same kind replaces it, so overlapping timer
+    ticks cost one query between them rather than a backlog. A call
+    submitted with supersede=True starts at once instead: the running call
+    is cancelled through its CancelToken and whatever it returns is
+    dropped, so only the latest result reaches the window. Results and
+    exceptions go to the call's on_result/on_error callbacks and to the
+    finished/failed signals, all delivered on the thread that owns the
+    service.
+    """
+
+    finished = pyqtSignal(str, object)   # kind, result
+    failed = pyqtSignal(str, object)     # kind, exception
+
+    def __init__(self, parent=None, max_threads=DEFAULT_MAX_THREADS):
+        super().__init__(parent)
+        self._pool = QThreadPool(self)
+        self._pool.setMaxThreadCount(max_threads)
+        self._running = {}   # kind -> task on a pool thread
+        self._waiting = {}   # kind -> task to start once the running one is done
+        self._superseded = set()   # cancelled tasks still on a pool thread
+
+    def submit(self, kind, func, *args, on_result=None, on_error=None, supersede=False, timeout=None, **kwargs):
+        """Run func(*args, **kwargs) in the background, after any running call of the same kind.
+
+        supersede cancels the running call instead of waiting for it;
+        timeout stops the call's queries after that many seconds.
+        """
+        task = _Task(kind, func, args, kwargs, on_result, on_error, timeout)
+        if supersede:
+            self._waiting.pop(kind, None)
+            running = self._running.pop(kind, None)
+            if running is not None:
+                running.token.cancel()
+                self._superseded.add(running)
+            self._start(task)
+        elif kind in self._running:
+            self._waiting[kind] = task
+        else:
+            self._start(task)
+
+    def busy(self, kind):
+        """True while a call of this kind is running or waiting"""
+        return kind in self._running or kind in self._waiting
+
+    def shutdown(self, timeout_ms=5000):
+        """Drop waiting calls, cancel running ones and wait for them; False if they did not finish in time"""
+        self._waiting.clear()
+        self._pool.clear()
+        for task in self._running.values():
+            task.token.cancel()
+        return self._pool.waitForDone(timeout_ms)
+
+    def _start(self, task):
+        self._running[task.kind] = task
+        task.signals.done.connect(self._on_done)
+        self._pool.start(task)
+
+    def _on_done(self, task, succeeded, value):
+        # A superseded call's result is stale whatever it is
+        if task in self._superseded:
+            self._superseded.discard(task)
+            return
+        del self._running[task.kind]
+        waiting = self._waiting.pop(task.kind, None)
+        if waiting is not None:
+            self._start(waiting)
+
+        if succeeded:
+            if task.on_result:
+                task.on_result(value)
+            self.finished.emit(task.kind, value)
+        else:
+            if task.on_error:
+                task.on_error(value)
+            self.failed.emit(task.kind, value)
@@ -8,23 +8,27 @@ from PyQt5.QtGui import QFont
 from datetime import datetime
 from database.queries import (
     start_session, end_session, insert_feedback, 
-    get_active_session, auto_clock_out_all_sessions,
-    calculate_idle_minutes_simple, calculate_sleep_minutes_for_session
+    get_active_session, auto_clock_out_all_sessions
 )
 from utils.activity_monitor import start_activity_monitor
 from utils.session_timeout import start_timeout_monitor
 from utils.mac_address import get_mac_address
 from utils.idle_monitor import start_idle_monitoring, stop_idle_monitoring, get_idle_status, get_idle_duration
+from utils.session_stats import start_tracking, stop_tracking
+from gui.data_service import DataService
 import threading
 
 class EmployeeDashboard(QWidget):
-    def __init__(self, account_id):
+    def __init__(self, account_id, login_state=None):
         super().__init__()
         self.setWindowTitle("Employee Dashboard - Time Tracking")
         self.setFixedSize(600, 500)
         self.account_id = account_id
         self.session_id = None
         self.clock_in_time = None
+        self.initial_aggregates = None
+        self.session_stats = None
+        self.data_service = DataService(self)
         self.feedback_given = False
         self.feedback_shown = False
 
@@ -71,7 +75,13 @@ class EmployeeDashboard(QWidget):
             }
         """)
 
-        self.check_and_handle_existing_session()
+        # login_session already resumed or started the session
+        if login_state:
+            self.session_id = login_state['session_id']
+            self.clock_in_time = login_state['clock_in']
+            self.initial_aggregates = login_state['aggregates']
+        else:
+            self.check_and_handle_existing_session()
 
         self.create_ui()
 
@@ -216,6 +226,9 @@ class EmployeeDashboard(QWidget):
             self.stats_timer.start(10000)  # Update stats every 10 seconds
             
             try:
+                # Tracked before the monitors start so their first events are counted
+                if self.session_stats is None:
+                    self.session_stats = start_tracking(self.session_id, self.initial_aggregates)
                 start_timeout_monitor(self.account_id, self.session_id, self.clock_in_time)
                 threading.Thread(
                     target=start_activity_monitor,
@@ -274,17 +287,20 @@ class EmployeeDashboard(QWidget):
 
     def update_session_stats(self):
         """Update session statistics display"""
-        if self.session_id:
+        if self.session_stats:
             try:
-                # Calculate current session statistics
-                sleep_minutes = calculate_sleep_minutes_for_session(self.session_id)
-                idle_minutes = calculate_idle_minutes_simple(self.session_id)
+                # Totals kept in memory; the database is only read back, on
+                # a worker thread, after an event is logged or every
+                # stats_reconcile_seconds
+                if self.session_stats.reconcile_due():
+                    self.data_service.submit('stats_reconcile', self.session_stats.reconcile)
+                sleep_minutes, idle_minutes, away_minutes = self.session_stats.minutes()
                 
-                # Calculate work time (total - sleep - idle)
+                # Calculate work time (total - time asleep or idle, overlaps counted once)
                 work_minutes = 0
                 if self.clock_in_time:
                     total_minutes = int((datetime.now() - self.clock_in_time).total_seconds() / 60)
-                    work_minutes = max(0, total_minutes - sleep_minutes - idle_minutes)
+                    work_minutes = max(0, total_minutes - away_minutes)
                 
                 def format_minutes(minutes):
                     if minutes < 60:
@@ -346,9 +362,11 @@ class EmployeeDashboard(QWidget):
             self.timer.stop()
             self.idle_status_timer.stop()
             self.stats_timer.stop()
+            self.data_service.shutdown()
 
             if self.session_id:
                 stop_idle_monitoring(self.account_id, self.session_id)
+                stop_tracking(self.session_id)
 
             if self.session_id:
                 end_session(self.session_id, datetime.now())
@@ -368,9 +386,11 @@ class EmployeeDashboard(QWidget):
             self.timer.stop()
             self.idle_status_timer.stop()
             self.stats_timer.stop()
+            self.data_service.shutdown()
 
             if self.session_id:
                 stop_idle_monitoring(self.account_id, self.session_id)
+                stop_tracking(self.session_id)
 
             if self.session_id:
                 end_session(self.session_id, datetime.now())
@@ -4,7 +4,7 @@ from PyQt5.QtWidgets import (
     QMessageBox, QCheckBox, QSpacerItem, QSizePolicy
 )
 from PyQt5.QtCore import Qt
-from database.queries import authenticate_user, auto_clock_out_all_sessions
+from database.queries import login_session
 from gui.admin_dashboard import AdminDashboard
 from gui.employee_dashboard import EmployeeDashboard
 from utils.mac_address import get_mac_address
@@ -118,20 +118,27 @@ class LoginWindow(QWidget):
         current_mac = get_mac_address()
         print(f"Login attempt from MAC: {current_mac}")
 
-        account_id, role = authenticate_user(username, password)
+        try:
+            login_state = login_session(username, password, current_mac)
+        except Exception as e:
+            QMessageBox.critical(self, "Error", f"Login failed: {str(e)}")
+            return
+
+        account_id = login_state['account_id'] if login_state else None
+        role = login_state['role'] if login_state else None
 
         if account_id is None:
             QMessageBox.warning(self, "Login Failed", "User is not enabled or invalid credentials.")
         elif role == 'admin':
             try:
-                self.admin = AdminDashboard(account_id)
+                self.admin = AdminDashboard(account_id, login_state)
                 self.admin.show()
                 self.close()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to open admin dashboard: {str(e)}")
         elif role == 'employee':
             try:
-                self.emp = EmployeeDashboard(account_id)
+                self.emp = EmployeeDashboard(account_id, login_state)
                 self.emp.show()
                 self.close()
             except Exception as e:
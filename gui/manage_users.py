@@ -1,18 +1,103 @@
 # gui/manage_users.py
 from PyQt5.QtWidgets import (
-    QWidget, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem,
+    QWidget, QVBoxLayout, QLabel, QTableView, QStyledItemDelegate, QStyle, QStyleOptionViewItem,
     QPushButton, QHBoxLayout, QLineEdit, QComboBox, QMessageBox, QHeaderView
 )
-from PyQt5.QtCore import Qt
-from PyQt5.QtGui import QColor, QFont
+from PyQt5.QtCore import Qt, QEvent, QModelIndex, QRect, QTimer, pyqtSignal
+from PyQt5.QtGui import QBrush, QColor, QFont, QPainter
 
-from database.queries import fetch_all_users, create_user, toggle_user_status, delete_user
+from database.queries import fetch_users_page, create_user, toggle_user_status, delete_user
+from gui.data_service import DataService
+from gui.table_models import Column, ColumnTableModel
+
+USER_PAGE_SIZE = 200        # accounts fetched per page of the users table
+USER_PREFETCH_ROWS = 20     # fetch the next page this many rows before the end
+SEARCH_DEBOUNCE_MS = 400    # quiet time after typing before the search runs
+
+# Cell colours, shared by every row rather than built per paint
+ACTIVE_COLOR = QColor("green")
+DISABLED_COLOR = QColor("red")
+DISABLE_BUTTON_COLOR = QColor("#F7630C")
+ENABLE_BUTTON_COLOR = QColor("#107C10")
+DELETE_BUTTON_COLOR = QColor("#D13438")
+
+def _status_color(model, row):
+    return ACTIVE_COLOR if model.value(row, 3) == "Active" else DISABLED_COLOR
+
+# Rows are fetch_users_page rows: (id, username, role, status, mac_address)
+USER_COLUMNS = [
+    Column("ID", 0),
+    Column("Username", 1),
+    Column("Role", 2),
+    Column("MAC Address", 4),
+    Column("Status", 3, foreground=_status_color),
+    # Button columns: the delegate draws the text on the background colour
+    Column("Toggle", 3, text=lambda model, row: "Disable" if model.value(row, 3) == "Active" else "Enable",
+           background=lambda model, row: DISABLE_BUTTON_COLOR if model.value(row, 3) == "Active"
+                                         else ENABLE_BUTTON_COLOR),
+    Column("Delete", 0, text=lambda model, row: "Delete", background=lambda model, row: DELETE_BUTTON_COLOR),
+]
+USER_FIELDS = 5
+TOGGLE_COLUMN = 5
+DELETE_COLUMN = 6
+
+class ButtonDelegate(QStyledItemDelegate):
+    """Paints a cell as a push button and reports clicks on it.
+
+    The button shows the cell's display text on its background colour, so
+    a column needs no widget per row; clicked carries the cell's index.
+    """
+
+    clicked = pyqtSignal(QModelIndex)
+
+    def paint(self, painter, option, index):
+        # Cell background and selection without the item's own text or colour
+        cell = QStyleOptionViewItem(option)
+        self.initStyleOption(cell, index)
+        cell.text = ""
+        cell.backgroundBrush = QBrush()
+        if cell.widget:
+            cell.widget.style().drawControl(QStyle.CE_ItemViewItem, cell, painter, cell.widget)
+
+        color = index.data(Qt.BackgroundRole) or QColor("#0078D7")
+        if option.state & QStyle.State_MouseOver:
+            color = color.lighter(115)
+        painter.save()
+        painter.setRenderHint(QPainter.Antialiasing)
+        painter.setPen(Qt.NoPen)
+        painter.setBrush(color)
+        rect = self.button_rect(option.rect)
+        painter.drawRoundedRect(rect, 4, 4)
+        font = QFont(option.font)
+        font.setBold(True)
+        font.setPixelSize(11)
+        painter.setFont(font)
+        painter.setPen(Qt.white)
+        painter.drawText(rect, Qt.AlignCenter, index.data(Qt.DisplayRole))
+        painter.restore()
+
+    def editorEvent(self, event, model, option, index):
+        if event.type() == QEvent.MouseButtonRelease and event.button() == Qt.LeftButton \
+                and self.button_rect(option.rect).contains(event.pos()):
+            self.clicked.emit(index)
+            return True
+        return super().editorEvent(event, model, option, index)
+
+    @staticmethod
+    def button_rect(cell):
+        """The button's area, centred in the cell like the old 100x26 buttons"""
+        width = min(100, cell.width() - 10)
+        height = min(26, cell.height() - 4)
+        return QRect(cell.x() + (cell.width() - width) // 2, cell.y() + (cell.height() - height) // 2,
+                     width, height)
 
 class ManageUsers(QWidget):
     def __init__(self):
         super().__init__()
         self.setWindowTitle("User Management")
         self.resize(1100, 500)
+        self.data_service = DataService(self)
+        self.user_cursor = None
 
         self.layout = QVBoxLayout()
         self.setLayout(self.layout)
@@ -47,9 +132,20 @@ class ManageUsers(QWidget):
 
         self.layout.addLayout(form_layout)
 
-        self.table = QTableWidget()
-        self.table.setColumnCount(7)
-        self.table.setHorizontalHeaderLabels(["ID", "Username", "Role", "MAC Address", "Status", "Toggle", "Delete"])
+        # Searching asks the database rather than filtering loaded rows
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔍 Search username")
+        self.search_input.setFixedWidth(250)
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(SEARCH_DEBOUNCE_MS)
+        self.search_timer.timeout.connect(self.load_users)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.layout.addWidget(self.search_input, alignment=Qt.AlignLeft)
+
+        self.model = ColumnTableModel(USER_COLUMNS, USER_FIELDS, self)
+        self.table = QTableView()
+        self.table.setModel(self.model)
         
         header = self.table.horizontalHeader()
         header.setSectionResizeMode(0, QHeaderView.Fixed)
@@ -66,18 +162,30 @@ class ManageUsers(QWidget):
         self.table.setColumnWidth(4, 100)
         self.table.setColumnWidth(5, 110)
         self.table.setColumnWidth(6, 110)
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(40)
+
+        self.toggle_delegate = ButtonDelegate(self.table)
+        self.toggle_delegate.clicked.connect(self.on_toggle_clicked)
+        self.table.setItemDelegateForColumn(TOGGLE_COLUMN, self.toggle_delegate)
+        self.delete_delegate = ButtonDelegate(self.table)
+        self.delete_delegate.clicked.connect(self.on_delete_clicked)
+        self.table.setItemDelegateForColumn(DELETE_COLUMN, self.delete_delegate)
+        # Hover feedback on the painted buttons
+        self.table.setMouseTracking(True)
         
         self.table.setStyleSheet("""
-            QTableWidget { 
+            QTableView { 
                 font-size: 14px; 
                 gridline-color: #e0e0e0;
             }
-            QTableWidget::item {
+            QTableView::item {
                 padding: 5px;
             }
         """)
         self.table.setAlternatingRowColors(True)
         self.table.setSelectionBehavior(self.table.SelectRows)
+        self.table.verticalScrollBar().valueChanged.connect(self.on_users_scrolled)
         self.layout.addWidget(self.table)
 
         self.load_users()
@@ -105,65 +213,58 @@ class ManageUsers(QWidget):
         """
 
     def load_users(self):
-        users = fetch_all_users()
-        self.table.setRowCount(len(users))
-
-        for row, user_data in enumerate(users):            
-            if len(user_data) == 4:
-                user_id, username, role, status = user_data
-                mac_address = "N/A"
-            elif len(user_data) == 5:
-                user_id, username, role, status, mac_address = user_data
-            elif len(user_data) == 6:
-                user_id, username, role, mac_address, status, _ = user_data
-            else:
-                print(f"Warning: Unexpected user data length: {len(user_data)} for row {row}")
-                print(f"Data: {user_data}")
-                user_id = user_data[0] if len(user_data) > 0 else "Unknown"
-                username = user_data[1] if len(user_data) > 1 else "Unknown"
-                role = user_data[2] if len(user_data) > 2 else "employee"
-                status = user_data[3] if len(user_data) > 3 else "Active"
-                mac_address = user_data[4] if len(user_data) > 4 else "N/A"
-
-            self.table.setItem(row, 0, QTableWidgetItem(str(user_id)))
-            self.table.setItem(row, 1, QTableWidgetItem(str(username)))
-            self.table.setItem(row, 2, QTableWidgetItem(str(role)))
-            self.table.setItem(row, 3, QTableWidgetItem(str(mac_address)))
-
-            status_item = QTableWidgetItem(str(status))
-            status_color = QColor("green") if status == "Active" else QColor("red")
-            status_item.setForeground(status_color)
-            self.table.setItem(row, 4, status_item)
-
-            toggle_btn = QPushButton("Disable" if status == "Active" else "Enable")
-            toggle_btn.setStyleSheet(self.button_style("#F7630C" if status == "Active" else "#107C10"))
-            toggle_btn.setMaximumSize(100, 26)
-            toggle_btn.clicked.connect(
-                lambda checked, uid=user_id, stat=status: self.toggle_user(uid, stat)
-            )
-            
-            toggle_container = QWidget()
-            toggle_layout = QHBoxLayout(toggle_container)
-            toggle_layout.addWidget(toggle_btn)
-            toggle_layout.setContentsMargins(5, 2, 5, 2)
-            toggle_layout.setAlignment(Qt.AlignCenter)
-            self.table.setCellWidget(row, 5, toggle_container)
-
-            delete_btn = QPushButton("Delete")
-            delete_btn.setStyleSheet(self.button_style("#D13438"))
-            delete_btn.setMaximumSize(100, 26)
-            delete_btn.clicked.connect(
-                lambda checked, uid=user_id, uname=username: self.delete_user(uid, uname)
-            )
-            
-            delete_container = QWidget()
-            delete_layout = QHBoxLayout(delete_container)
-            delete_layout.addWidget(delete_btn)
-            delete_layout.setContentsMargins(5, 2, 5, 2)
-            delete_layout.setAlignment(Qt.AlignCenter)
-            self.table.setCellWidget(row, 6, delete_container)
-
-            self.table.setRowHeight(row, 40)
+        """Load the first page of accounts matching the search box"""
+        self.search_timer.stop()
+        # A new search replaces the table, so one still running is cancelled
+        self.data_service.submit('users', fetch_users_page, None, USER_PAGE_SIZE, self.search_input.text(),
+                                 on_result=self.show_users_page,
+                                 on_error=self.error_box("Failed to load users"),
+                                 supersede=True)
+
+    def show_users_page(self, result):
+        users, self.user_cursor = result
+        self.model.set_rows(users)
+        self.table.scrollToTop()
+
+    def load_next_users_page(self):
+        """Append the next page of accounts, if there is one"""
+        if self.user_cursor is None or self.data_service.busy('users'):
+            return
+
+        self.data_service.submit('users', fetch_users_page, self.user_cursor, USER_PAGE_SIZE,
+                                 self.search_input.text(),
+                                 on_result=self.append_users_page,
+                                 on_error=self.error_box("Failed to load more users"))
+
+    def append_users_page(self, result):
+        users, self.user_cursor = result
+        self.model.append_rows(users)
+
+    def on_users_scrolled(self, value):
+        """Fetch the next page as the user nears the bottom of the table"""
+        scroll_bar = self.table.verticalScrollBar()
+        if value >= scroll_bar.maximum() - USER_PREFETCH_ROWS:
+            self.load_next_users_page()
+
+    def error_box(self, message):
+        """on_error callback reporting a failed background load in a message box"""
+        return lambda e: QMessageBox.critical(self, "Error", f"{message}: {str(e)}")
+
+    def on_toggle_clicked(self, index):
+        row = index.row()
+        self.toggle_user(self.model.value(row, 0), self.model.value(row, 3))
+
+    def on_delete_clicked(self, index):
+        row = index.row()
+        self.delete_user(self.model.value(row, 0), self.model.value(row, 1))
+
+    def user_row(self, user_id):
+        """Row of a loaded account, or None; looked up again since a page may have loaded meanwhile"""
+        return next((row for row in range(self.model.rowCount()) if self.model.value(row, 0) == user_id), None)
+
+    def closeEvent(self, event):
+        self.data_service.shutdown()
+        super().closeEvent(event)
 
     def create_user(self):
         username = self.username_input.text().strip()
@@ -187,7 +288,11 @@ class ManageUsers(QWidget):
         new_status = "Disabled" if current_status == "Active" else "Active"
         try:
             toggle_user_status(user_id, 'inactive' if new_status == "Disabled" else 'active')
-            self.load_users()
+            row = self.user_row(user_id)
+            if row is not None:
+                values = list(self.model.row_values(row))
+                values[3] = new_status
+                self.model.update_row(row, values)
             QMessageBox.information(self, "Success", f"User status updated to {new_status}.")
         except Exception as e:
             QMessageBox.critical(self, "Error", f"Failed to update user status: {e}")
@@ -209,7 +314,9 @@ class ManageUsers(QWidget):
         if reply == QMessageBox.Yes:
             try:
                 delete_user(user_id)
+                row = self.user_row(user_id)
+                if row is not None:
+                    self.model.remove_rows(row)
                 QMessageBox.information(self, "Success", f"User '{username}' deleted successfully.")
-                self.load_users()
             except Exception as e:
                 QMessageBox.critical(self, "Error", f"Failed to delete user: {e}")
\ No newline at end of file
@@ -0,0 +1,269 @@
+# gui/table_models.py
+from PyQt5.QtCore import QAbstractTableModel, QModelIndex, Qt
+
+def _sort_key(value):
+    # None sorts before every value
+    return (value is not None, value)
+
+class Column:
+    """One column of a ColumnTableModel.
+
+    field is the position of the column's value in the rows given to the
+    model. text, background, foreground and font are called as
+    f(model, row) with the stored row, only for cells the view draws; text
+    defaults to the value as a string and the others to Qt's defaults.
+    fields lists every field those read, so a cell is repainted when any
+    of them changes; it defaults to just field.
+    """
+
+    def __init__(self, header, field, text=None, background=None, font=None, foreground=None, fields=None):
+        self.header = header
+        self.field = field
+        self.fields = frozenset(fields if fields is not None else (field,))
+        self.text = text
+        self.background = background
+        self.font = font
+        self.foreground = foreground
+
+class ColumnTableModel(QAbstractTableModel):
+    """Read-only table model keeping its rows as one list per field.
+
+    Rows are given as tuples and split into per-field lists, so a table
+    holds a reference per value rather than an item object per cell, and
+    cells are formatted only when the view asks for them, i.e. for the
+    rows on screen. Sorting orders a permutation of the stored rows, kept
+    per field until that field's values change; the rows themselves stay
+    in the order they were given, which is also the order shown unsorted.
+    Mutators address rows by that stored position and announce exactly
+    the rows they touch.
+    """
+
+    def __init__(self, columns, field_count, parent=None):
+        super().__init__(parent)
+        self._columns = list(columns)
+        self._fields = [[] for _ in range(field_count)]
+        self._sort_field = None
+        self._descending = False
+        self._order = None        # view row -> stored row while sorted
+        self._positions = None    # stored row -> view row while sorted
+        self._ascending = {}      # field -> stored rows in ascending order of its values
+
+    # Qt interface
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._fields[0])
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._columns)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole and 0 <= section < len(self._columns):
+            return self._columns[section].header
+        return None
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        column = self._columns[index.column()]
+        row = self.stored_row(index.row())
+        if role == Qt.DisplayRole:
+            if column.text:
+                return column.text(self, row)
+            value = self._fields[column.field][row]
+            return "" if value is None else str(value)
+        if role == Qt.BackgroundRole and column.background:
+            return column.background(self, row)
+        if role == Qt.ForegroundRole and column.foreground:
+            return column.foreground(self, row)
+        if role == Qt.FontRole and column.font:
+            return column.font(self, row)
+        return None
+
+    def sort(self, column, order=Qt.AscendingOrder):
+        """Order the view by a column; column -1 goes back to the stored order"""
+        field = self._columns[column].field if 0 <= column < len(self._columns) else None
+        self._relayout(field, order == Qt.DescendingOrder)
+
+    # Reading
+
+    def value(self, row, field):
+        """A field of a stored row"""
+        return self._fields[field][row]
+
+    def row_values(self, row):
+        """A stored row as the tuple it was given as"""
+        return tuple(values[row] for values in self._fields)
+
+    def stored_row(self, view_row):
+        return view_row if self._order is None else self._order[view_row]
+
+    def view_row(self, row):
+        return row if self._positions is None else self._positions[row]
+
+    # Changing
+
+    def set_rows(self, rows, key_field=None):
+        """Replace every row.
+
+        With key_field the new rows are merged into the current ones by
+        key: rows whose key is gone are removed, new keys are inserted
+        where they appear and kept keys only have the cells whose values
+        differ written and announced, so the view keeps its scroll position
+        and selection and repaints just those cells. Kept keys must stay in
+        the same relative order; otherwise the model is reset.
+        """
+        rows = list(rows)
+        if key_field is not None and self._merge(rows, key_field):
+            return
+
+        self.beginResetModel()
+        self._fields = [list(values) for values in zip(*rows)] if rows else [[] for _ in self._fields]
+        self._ascending.clear()
+        self._apply_sort()
+        self.endResetModel()
+
+    def append_rows(self, rows):
+        self.insert_rows(self.rowCount(), rows)
+
+    def insert_rows(self, row, rows):
+        """Insert rows before a stored row; while sorted they are placed by the sort"""
+        rows = list(rows)
+        if not rows:
+            return
+        count = self.rowCount()
+        # While sorted the rows first appear at the end of the view and the
+        # view is then re-sorted, which keeps persistent indexes valid
+        first = row if self._order is None else count
+        self.beginInsertRows(QModelIndex(), first, first + len(rows) - 1)
+        for values, new in zip(self._fields, zip(*rows)):
+            values[row:row] = new
+        if self._order is not None:
+            shift = len(rows)
+            self._order = [stored + shift if stored >= row else stored for stored in self._order]
+            self._order.extend(range(row, row + shift))
+            self._positions = self._inverse(self._order)
+        self._ascending.clear()
+        self.endInsertRows()
+        if self._sort_field is not None:
+            self._relayout(self._sort_field, self._descending)
+
+    def remove_rows(self, row, count=1):
+        """Remove count stored rows starting at row"""
+        # Highest first, so the stored rows still to go keep their positions
+        for removed in reversed(range(row, row + count)):
+            view_row = self.view_row(removed)
+            self.beginRemoveRows(QModelIndex(), view_row, view_row)
+            for values in self._fields:
+                del values[removed]
+            if self._order is not None:
+                self._order = [stored - (stored > removed) for stored in self._order if stored != removed]
+                self._positions = self._inverse(self._order)
+            self._ascending.clear()
+            self.endRemoveRows()
+
+    def update_row(self, row, values):
+        """Overwrite a stored row; returns whether anything changed"""
+        fields = self._write(row, values)
+        self._announce([(row, fields)] if fields else [])
+        return bool(fields)
+
+    def _merge(self, rows, key_field):
+        """Bring the rows in line with new ones by key; False if kept keys changed order"""
+        keys = [row[key_field] for row in rows]
+        wanted = set(keys)
+        current = self._fields[key_field]
+        kept = [key for key in current if key in wanted]
+        kept_keys = set(kept)
+        # Nothing to keep is a reset, which is cheaper than removing row by row
+        if not kept or kept != [key for key in keys if key in kept_keys]:
+            return False
+
+        # Remove runs of stored rows whose keys are gone, last run first
+        row = len(current)
+        while row > 0:
+            row -= 1
+            if current[row] in wanted:
+                continue
+            end = row
+            while row > 0 and current[row - 1] not in wanted:
+                row -= 1
+            self.remove_rows(row, end - row + 1)
+
+        # The stored keys are now the kept ones, in the order of the new rows
+        changed = []
+        row = 0
+        while row < len(rows):
+            if row < len(current) and current[row] == keys[row]:
+                fields = self._write(row, rows[row])
+                if fields:
+                    changed.append((row, fields))
+                row += 1
+                continue
+            # New keys up to the next kept one
+            end = row
+            while end < len(rows) and not (row < len(current) and keys[end] == current[row]):
+                end += 1
+            self.insert_rows(row, rows[row:end])
+            row = end
+        self._announce(changed)
+        return True
+
+    def _write(self, row, values):
+        """Store a row's values and return the fields that changed"""
+        changed = set()
+        for field, value in enumerate(values):
+            stored = self._fields[field]
+            if stored[row] != value:
+                stored[row] = value
+                changed.add(field)
+        return changed
+
+    def _announce(self, changes):
+        """Tell the view about changed cells, given as (stored row, changed fields) pairs"""
+        all_fields = set().union(*(fields for _, fields in changes)) if changes else set()
+        for field in all_fields:
+            self._ascending.pop(field, None)
+        if self._sort_field in all_fields:
+            self._relayout(self._sort_field, self._descending)
+            return
+        for row, fields in changes:
+            view_row = self.view_row(row)
+            # One signal per run of adjacent columns showing a changed field
+            first = None
+            for column, spec in enumerate(self._columns + [None]):
+                if spec is not None and spec.fields & fields:
+                    if first is None:
+                        first = column
+                elif first is not None:
+                    self.dataChanged.emit(self.index(view_row, first), self.index(view_row, column - 1))
+                    first = None
+
+    def _relayout(self, field, descending):
+        """Re-sort, moving persistent indexes (selection, current cell) with their rows"""
+        self.layoutAboutToBeChanged.emit()
+        persistent = self.persistentIndexList()
+        rows = [self.stored_row(index.row()) for index in persistent]
+        self._sort_field, self._descending = field, descending
+        self._apply_sort()
+        self.changePersistentIndexList(persistent, [self.index(self.view_row(row), index.column())
+                                                    for row, index in zip(rows, persistent)])
+        self.layoutChanged.emit()
+
+    def _apply_sort(self):
+        if self._sort_field is None:
+            self._order = self._positions = None
+            return
+        ascending = self._ascending.get(self._sort_field)
+        if ascending is None:
+            values = self._fields[self._sort_field]
+            ascending = sorted(range(len(values)), key=lambda row: _sort_key(values[row]))
+            self._ascending[self._sort_field] = ascending
+        self._order = ascending[::-1] if self._descending else list(ascending)
+        self._positions = self._inverse(self._order)
+
+    @staticmethod
+    def _inverse(order):
+        positions = [0] * len(order)
+        for view_row, row in enumerate(order):
+            positions[row] = view_row
+        return positions
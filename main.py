@@ -3,6 +3,7 @@ import os
 import json
 from PyQt5.QtWidgets import QApplication, QMessageBox, QFileDialog
 from gui.login_window import LoginWindow
+from database.backends import backend_class
 
 CONFIG_PATH = os.path.join(os.path.dirname(__file__), 'config', 'db_config.json')
 
@@ -15,7 +16,7 @@ def check_and_load_config():
     try:
         with open(CONFIG_PATH, 'r') as f:
             config = json.load(f)
-        required_keys = {"server", "database", "username", "password"}
+        required_keys = backend_class(config).required_config_keys
         if not required_keys.issubset(config.keys()):
             QMessageBox.critical(None, "Invalid Configuration",
                 f"Config file is missing required fields: {required_keys}")
@@ -0,0 +1,98 @@
+# tools/bench_activity.py
+"""Time org-wide "who was doing what at hh:mm" queries, raw sleep_events scan vs activity bitmaps.
+
+The scan path is what answering the question took before: every session
+overlapping the day and all of its events are read and paired in Python.
+The bitmap path reads one activity_bitmap row per employee and tests bits.
+Both answer for the same minutes and the counts are compared. Run from
+the project root:
+    python -m tools.bench_activity --employees 3000 --events 40
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+from itertools import groupby
+
+from database.db_connection import pooled_connection
+from tools.seed_data import seed, use_sqlite
+
+def timed(label, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<32} {(time.perf_counter() - started) * 1000:>9.1f} ms")
+    return result
+
+def scan_counts(day, minutes, now):
+    """[off, working, idle, asleep] per minute, from the sessions and events of the day"""
+    from utils.activity_bitmap import MINUTES_PER_DAY, day_states, session_periods
+
+    day_start = datetime(day.year, day.month, day.day)
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, account_id, clock_in, clock_out FROM sessions
+            WHERE account_id IS NOT NULL AND clock_in < ? AND (clock_out IS NULL OR clock_out > ?)
+        """, (day_start + timedelta(days=1), day_start))
+        sessions = cursor.fetchall()
+        cursor.execute("""
+            SELECT e.session_id, e.event_type, e.event_time
+            FROM sleep_events e
+            JOIN sessions s ON s.id = e.session_id
+            WHERE s.account_id IS NOT NULL AND s.clock_in < ? AND (s.clock_out IS NULL OR s.clock_out > ?)
+            ORDER BY e.session_id, e.event_time, e.id
+        """, (day_start + timedelta(days=1), day_start))
+        events = {session_id: [(row[1], row[2]) for row in group]
+                  for session_id, group in groupby(cursor.fetchall(), key=lambda row: row[0])}
+
+    states = {}
+    for session_id, account_id, clock_in, clock_out in sessions:
+        periods = session_periods(clock_in, clock_out, events.get(session_id, []), now)
+        states[account_id] = day_states(day, periods, states.get(account_id))
+    counts = []
+    for minute in minutes:
+        column = [0, 0, 0, 0]
+        for account_states in states.values():
+            if account_states.any():
+                column[account_states[minute % MINUTES_PER_DAY]] += 1
+        counts.append(column)
+    return counts
+
+def bitmap_counts(day, minutes):
+    from database.activity import fetch_day_planes
+    from utils.activity_bitmap import states_at
+
+    _, awake, away = fetch_day_planes(day)
+    counts = []
+    for minute in minutes:
+        states = states_at(awake, away, minute)
+        counts.append([int((states == state).sum()) for state in range(4)])
+    return counts
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=3000)
+    parser.add_argument("--events", type=int, default=40, help="events per session")
+    args = parser.parse_args()
+
+    use_sqlite()
+    day = date(2025, 3, 3)
+    print(f"seeding {args.employees} sessions of {args.events} events...")
+    seed(accounts=args.employees, sessions=args.employees, events_per_session=args.events,
+         start=datetime(day.year, day.month, day.day, 7, 0), days=1)
+
+    from database.activity import fetch_state_counts
+    from database.rollup import refresh_daily_rollup
+
+    now = datetime.now()
+    timed("build bitmaps (full refresh)", refresh_daily_rollup, True, now)
+    minutes = [11 * 60, 14 * 60 + 5, 16 * 60 + 30]
+    expected = timed("scan: 3 time slices", scan_counts, day, minutes, now)
+    actual = timed("bitmap: 3 time slices", bitmap_counts, day, minutes)
+    timed("bitmap: all 1440 minutes", fetch_state_counts, day)
+    for minute, counts in zip(minutes, actual):
+        print(f"  {minute // 60:02d}:{minute % 60:02d}  off {counts[0]}  working {counts[1]}  "
+              f"idle {counts[2]}  asleep {counts[3]}")
+    print(f"mismatches: {sum(left != right for left, right in zip(expected, actual))}")
+
+if __name__ == "__main__":
+    main()
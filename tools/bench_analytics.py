@@ -0,0 +1,127 @@
+# tools/bench_analytics.py
+"""Time organization-wide reports, row-by-row Python vs database.analytics.
+
+The per-row path is how reports are built today: datetime rows are
+looped over one at a time, each session's events paired with
+utils.intervals, and totals gathered in dicts. The NumPy path fetches
+integer timestamps and builds a SessionReport. Both report on the same
+data at the same moment and the results are compared. Run from the project root:
+    python -m tools.bench_analytics --sessions 50000 --events 20
+"""
+import argparse
+import time
+from collections import defaultdict
+from datetime import datetime
+from itertools import groupby
+
+from database.db_connection import pooled_connection
+from tools.seed_data import seed, use_sqlite
+
+PERCENTILES = (50, 90)
+
+def timed(label, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{label:<32} {elapsed:>9.1f} ms")
+    return result, elapsed
+
+def load_rows():
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT s.id, s.account_id, a.username, s.session_date, s.clock_in, s.clock_out,
+                   s.total_work_minutes
+            FROM sessions s
+            JOIN accounts a ON s.account_id = a.id
+            ORDER BY s.id
+        """)
+        sessions = cursor.fetchall()
+        cursor.execute("""
+            SELECT session_id, event_type, event_time FROM sleep_events
+            ORDER BY session_id, event_time, id
+        """)
+        events = cursor.fetchall()
+    return sessions, events
+
+def python_report(sessions, events, now):
+    """by_account, by_day, work percentiles and top 10 built with per-row loops"""
+    from database.queries import _aggregate_minutes, _session_aggregates
+
+    events_by_session = {session_id: [(row[1], row[2]) for row in group]
+                         for session_id, group in groupby(events, key=lambda row: row[0])}
+    accounts = defaultdict(lambda: [0, 0, 0, 0, set()])
+    days = defaultdict(lambda: [0, 0, 0, 0, set()])
+    work_by_account = defaultdict(list)
+    usernames = {}
+
+    for session_id, account_id, username, session_date, clock_in, clock_out, stored_work in sessions:
+        aggregates = _session_aggregates(events_by_session.get(session_id, []), clock_out)
+        sleep_seconds, idle_seconds, _, idle_open_since, overlap_seconds, sleep_pending = aggregates[:6]
+        if aggregates[2] is not None:
+            overlap_seconds -= sleep_pending
+        sleep, idle, away = _aggregate_minutes(sleep_seconds, idle_seconds, idle_open_since,
+                                               clock_out or now, overlap_seconds)
+        if stored_work is None:
+            work = max(0, int(((clock_out or now) - clock_in).total_seconds() / 60) - away)
+        else:
+            work = stored_work
+
+        usernames[account_id] = username
+        for totals, other in ((accounts[account_id], session_date), (days[session_date], account_id)):
+            totals[0] += work
+            totals[1] += sleep
+            totals[2] += idle
+            totals[3] += 1
+            totals[4].add(other)
+        work_by_account[account_id].append(work)
+
+    by_account = [(account_id, usernames[account_id], *totals[:4], len(totals[4]))
+                  for account_id, totals in sorted(accounts.items(), key=lambda item: usernames[item[0]])]
+    by_day = [(day, *totals[:4], len(totals[4])) for day, totals in sorted(days.items())]
+    percentiles = []
+    for account_id, _, *_ in by_account:
+        values = sorted(work_by_account[account_id])
+        percentiles.append((account_id, usernames[account_id],
+                            *(values[(len(values) - 1) * p // 100] for p in PERCENTILES)))
+    top = sorted(((row[0], row[1], row[2]) for row in by_account), key=lambda row: (-row[2], row[0]))[:10]
+    return by_account, by_day, percentiles, top
+
+def numpy_report(sessions, events, now):
+    from database.analytics import SessionReport
+
+    report = SessionReport(sessions, events, now)
+    return report.by_account(), report.by_day(), report.percentiles_by_account('work', PERCENTILES), \
+        report.top_accounts('work', 10)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=500)
+    parser.add_argument("--sessions", type=int, default=50000)
+    parser.add_argument("--events", type=int, default=20, help="events per session")
+    parser.add_argument("--open", type=int, default=200, help="sessions left open")
+    args = parser.parse_args()
+
+    use_sqlite()
+    print(f"seeding {args.sessions} sessions of {args.events} events...")
+    seed(accounts=args.accounts, sessions=args.sessions, events_per_session=args.events, open_sessions=args.open,
+         days=365)
+
+    from database.analytics import fetch_report_rows
+
+    now = datetime.now()
+    (sessions, events), python_fetch = timed("per-row: fetch datetimes", load_rows)
+    expected, python_compute = timed("per-row: report", python_report, sessions, events, now)
+    del sessions, events
+    (sessions, events), numpy_fetch = timed("NumPy: fetch microseconds", fetch_report_rows)
+    actual, numpy_compute = timed("NumPy: arrays and report", numpy_report, sessions, events, now)
+    print(f"{len(events)} events  report {python_compute / numpy_compute:.1f}x faster, "
+          f"end to end {(python_fetch + python_compute) / (numpy_fetch + numpy_compute):.1f}x")
+
+    names = ("by account", "by day", "work percentiles", "top 10")
+    mismatches = [name for name, left, right in zip(names, expected, actual) if left != right]
+    print(f"mismatches: {', '.join(mismatches) or 'none'}")
+    raise SystemExit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
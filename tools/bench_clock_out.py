@@ -0,0 +1,79 @@
+# tools/bench_clock_out.py
+"""Time bulk clock-out, end_session per session vs close_sessions, and check they agree.
+
+The same seeded database is clocked out both ways at the same instant and
+the closed rows are compared column by column. Run from the project root:
+    python -m tools.bench_clock_out --open 5000
+"""
+import argparse
+import os
+import shutil
+import tempfile
+import time
+from datetime import datetime
+
+from database import db_connection
+from tools.seed_data import seed, use_sqlite
+
+def closed_rows():
+    with db_connection.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT id, clock_out, total_work_minutes, sleep_minutes, idle_seconds,
+                   idle_open_since, sleep_open_since
+            FROM sessions ORDER BY id
+        """)
+        return [tuple(row) for row in cursor.fetchall()]
+
+def per_session(clock_out_time):
+    from database.queries import end_session
+    with db_connection.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM sessions WHERE clock_out IS NULL")
+        session_ids = [row[0] for row in cursor.fetchall()]
+    for session_id in session_ids:
+        end_session(session_id, clock_out_time)
+    return len(session_ids)
+
+def set_based(clock_out_time):
+    from database.queries import close_sessions
+    return len(close_sessions(clock_out_time))
+
+def run(label, path, close, clock_out_time):
+    use_sqlite(path)
+    started = time.perf_counter()
+    closed = close(clock_out_time)
+    elapsed = (time.perf_counter() - started) * 1000
+    print(f"{label:<24} {closed:>7} sessions {elapsed:>10.1f} ms")
+    rows = closed_rows()
+    db_connection.close_pool()
+    return rows
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--accounts", type=int, default=1000)
+    parser.add_argument("--open", type=int, default=5000, help="open sessions to clock out")
+    parser.add_argument("--events", type=int, default=10, help="events per session")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="sleep_tracker_")
+    seeded = os.path.join(directory, "seeded.db")
+    use_sqlite(seeded)
+    seed(accounts=args.accounts, sessions=args.open * 2, events_per_session=args.events, open_sessions=args.open)
+    db_connection.close_pool()
+    shutil.copy(seeded, os.path.join(directory, "copy.db"))
+
+    clock_out_time = datetime.now()
+    expected = run("end_session per session", seeded, per_session, clock_out_time)
+    actual = run("close_sessions", os.path.join(directory, "copy.db"), set_based, clock_out_time)
+
+    # julianday() in SQLite is only exact to the millisecond
+    mismatches = [(old, new) for old, new in zip(expected, actual)
+                  if old[:4] + old[5:] != new[:4] + new[5:] or abs((old[4] or 0) - (new[4] or 0)) > 0.002]
+    for old, new in mismatches[:10]:
+        print(f"  mismatch: {old} != {new}")
+    print(f"{len(mismatches)} mismatched sessions")
+    raise SystemExit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
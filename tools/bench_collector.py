@@ -0,0 +1,139 @@
+# tools/bench_collector.py
+"""Load-test the collector service against a local SQLite database.
+
+Starts the collector in a subprocess, then simulates many desktop clients
+that clock in, send events in small frames and clock out, and checks the
+resulting aggregates against a rebuild from the events. Run from the
+project root:
+    python -m tools.bench_collector --clients 1000 --frames 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from collector import protocol
+from tools.seed_data import seed, use_sqlite
+
+async def request(reader, writer, frame):
+    writer.write(frame)
+    await writer.drain()
+    length, _ = protocol.HEADER.unpack(await reader.readexactly(protocol.HEADER.size))
+    _, status, value, error = protocol.decode_reply(await reader.readexactly(length))
+    if status != protocol.STATUS_OK:
+        raise RuntimeError(error)
+    return value
+
+async def client(index, account_id, args, latencies):
+    """One simulated seat: clock in, send event frames, clock out"""
+    rng = random.Random(index)
+    if args.unix:
+        reader, writer = await asyncio.open_unix_connection(args.unix)
+    else:
+        reader, writer = await asyncio.open_connection("127.0.0.1", args.port)
+    try:
+        clock_in = datetime(2025, 3, 3, 8, 0) + timedelta(seconds=rng.randrange(3600))
+        session_id = await request(reader, writer, protocol.encode_start_session(
+            1, account_id, clock_in, f"00:00:00:00:{index // 256 % 256:02X}:{index % 256:02X}"))
+
+        moment = clock_in
+        for frame_number in range(args.frames):
+            events = []
+            for _ in range(args.events):
+                moment += timedelta(seconds=rng.randrange(1, 600))
+                events.append((account_id, session_id, rng.choice(protocol.EVENT_TYPES), moment, 'system'))
+            started = time.perf_counter()
+            await request(reader, writer, protocol.encode_events(frame_number + 2, events))
+            latencies.append(time.perf_counter() - started)
+
+        await request(reader, writer, protocol.encode_end_session(
+            args.frames + 2, session_id, moment + timedelta(minutes=5)))
+        return session_id
+    finally:
+        writer.close()
+
+async def run_clients(args, account_ids):
+    latencies = []
+    semaphore = asyncio.Semaphore(args.concurrency)
+
+    async def limited(index):
+        async with semaphore:
+            return await client(index, account_ids[index % len(account_ids)], args, latencies)
+
+    started = time.perf_counter()
+    session_ids = await asyncio.gather(*(limited(index) for index in range(args.clients)))
+    return session_ids, latencies, time.perf_counter() - started
+
+def wait_for_collector(args, process, timeout=15):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise SystemExit("collector exited during startup")
+        try:
+            if args.unix:
+                asyncio.run(asyncio.wait_for(asyncio.open_unix_connection(args.unix), 1))
+            else:
+                asyncio.run(asyncio.wait_for(asyncio.open_connection("127.0.0.1", args.port), 1))
+            return
+        except OSError:
+            time.sleep(0.1)
+    raise SystemExit("collector did not start")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--clients", type=int, default=1000, help="simulated seats")
+    parser.add_argument("--concurrency", type=int, default=500, help="seats connected at once")
+    parser.add_argument("--frames", type=int, default=10, help="event frames per seat")
+    parser.add_argument("--events", type=int, default=5, help="events per frame")
+    parser.add_argument("--connections", type=int, default=2, help="collector database connections")
+    parser.add_argument("--port", type=int, default=17070)
+    parser.add_argument("--tcp", action="store_true", help="use TCP instead of a Unix socket")
+    args = parser.parse_args()
+    args.unix = None if args.tcp else os.path.join(tempfile.mkdtemp(prefix="collector_"), "collector.sock")
+
+    config_path = use_sqlite()
+    account_ids = seed(accounts=max(1, args.clients // 10), sessions=0, events_per_session=0)
+
+    listen = ["--unix", args.unix] if args.unix else ["--tcp", f"127.0.0.1:{args.port}"]
+    process = subprocess.Popen([sys.executable, "-m", "collector", "--config", config_path,
+                                "--connections", str(args.connections), "--stats-interval", "3600"] + listen,
+                               stdout=subprocess.DEVNULL)
+    try:
+        wait_for_collector(args, process)
+        session_ids, latencies, elapsed = asyncio.run(run_clients(args, account_ids))
+    finally:
+        process.terminate()
+        process.wait()
+
+    events = args.clients * args.frames * args.events
+    latencies.sort()
+    print(f"seats: {args.clients}  events: {events}  collector connections: {args.connections}")
+    print(f"elapsed: {elapsed:.2f} s  ({events / elapsed:,.0f} events/s)")
+    print(f"frame ack p50: {latencies[len(latencies) // 2] * 1000:.1f} ms  "
+          f"p99: {latencies[int(len(latencies) * 0.99)] * 1000:.1f} ms")
+
+    from database.db_connection import pooled_connection
+    from database.queries import rebuild_session_aggregates
+    columns = "id, ROUND(sleep_seconds, 3), ROUND(idle_seconds, 3), clock_out IS NOT NULL"
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT COUNT(*) FROM sleep_events")
+        stored = cursor.fetchone()[0]
+        cursor.execute(f"SELECT {columns} FROM sessions")
+        before = set(cursor.fetchall())
+    rebuild_session_aggregates(session_ids)
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT {columns} FROM sessions")
+        after = set(cursor.fetchall())
+    print(f"events stored: {stored}  sessions closed: {sum(1 for row in after if row[3])}  "
+          f"aggregate mismatches: {len(before - after)}")
+    raise SystemExit(1 if stored != events or before != after else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,170 @@
+# tools/bench_end_session.py
+"""Time end_session on sessions with thousands of events, old event scan vs aggregates.
+
+The old path is what end_session used to run: the sleep and idle minutes
+recomputed from the session's events, each in its own transaction, then
+a clock_in read and a separate UPDATE. Both run on copies of the same seeded
+database at the same clock-out time, and end_session's work minutes are
+checked against the intervals engine run over each session's events; the
+script exits non-zero on a mismatch. Run from the project root:
+    python -m tools.bench_end_session --sessions 20 --events 5000
+"""
+import argparse
+import os
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime
+from itertools import groupby
+
+from database import db_connection
+from tools.seed_data import seed, use_sqlite
+
+class _Statements:
+    count = 0
+
+    @classmethod
+    def trace(cls, _):
+        cls.count += 1
+
+def _scan_minutes(session_id, start_type, end_type, open_until=None):
+    """Minutes between paired events, read in a transaction of its own as the old helpers did"""
+    with db_connection.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT event_type, event_time FROM sleep_events
+            WHERE session_id = ? AND event_type IN (?, ?)
+            ORDER BY event_time
+        """, (session_id, start_type, end_type))
+        events = cursor.fetchall()
+
+    minutes = 0
+    start = None
+    for event_type, event_time in events:
+        if event_type == start_type:
+            start = event_time
+        elif event_type == end_type and start:
+            minutes += (event_time - start).total_seconds() / 60
+            start = None
+    if start and open_until:
+        minutes += (open_until - start).total_seconds() / 60
+    return int(minutes)
+
+def legacy_end_session(session_id, clock_out_time):
+    sleep_minutes = _scan_minutes(session_id, 'sleep', 'resume')
+    idle_minutes = _scan_minutes(session_id, 'idle_start', 'idle_end', open_until=clock_out_time)
+    with db_connection.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT clock_in FROM sessions WHERE id = ?", (session_id,))
+        clock_in = cursor.fetchone()[0]
+        total_session_minutes = int((clock_out_time - clock_in).total_seconds() / 60)
+        actual_work_minutes = max(0, total_session_minutes - sleep_minutes - idle_minutes)
+        cursor.execute("""
+            UPDATE sessions
+            SET clock_out = ?, total_work_minutes = ?, sleep_minutes = ?
+            WHERE id = ?
+        """, (clock_out_time, actual_work_minutes, sleep_minutes, session_id))
+    return actual_work_minutes
+
+def fast_end_session(session_id, clock_out_time):
+    from database.queries import end_session
+    return end_session(session_id, clock_out_time)
+
+def reference_minutes(path, clock_out_time):
+    """Per open session, (work minutes as end_session should store them, as the old scan did).
+
+    Both come from the session's events through the intervals engine. The
+    old scan subtracted sleep and idle minutes separately, so stretches
+    both asleep and idle were taken off twice and each kind was truncated
+    to whole minutes on its own.
+    """
+    from database.aggregates import _session_aggregates
+
+    use_sqlite(path)
+    with db_connection.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("""
+            SELECT s.id, s.clock_in, e.event_type, e.event_time
+            FROM sessions s
+            LEFT JOIN sleep_events e ON e.session_id = s.id
+            WHERE s.clock_out IS NULL
+            ORDER BY s.id, e.event_time, e.id
+        """)
+        rows = cursor.fetchall()
+    db_connection.close_pool()
+
+    minutes = {}
+    for session_id, group in groupby(rows, key=lambda row: row[0]):
+        group = list(group)
+        events = [(row[2], row[3]) for row in group if row[2] is not None]
+        sleep_seconds, idle_seconds, _, _, overlap_seconds, _, _ = _session_aggregates(events, clock_out_time)
+        total_minutes = int((clock_out_time - group[0][1]).total_seconds() / 60)
+        work = total_minutes - int((sleep_seconds + idle_seconds - overlap_seconds) / 60)
+        legacy = total_minutes - int(sleep_seconds / 60) - int(idle_seconds / 60)
+        minutes[session_id] = (max(0, work), max(0, legacy))
+    return minutes
+
+def run(label, path, end, clock_out_time):
+    use_sqlite(path)
+    backend = db_connection.get_backend()
+    connect = backend.connect
+
+    def traced_connect():
+        conn = connect()
+        conn.set_trace_callback(_Statements.trace)
+        return conn
+
+    backend.connect = traced_connect
+    with db_connection.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM sessions WHERE clock_out IS NULL ORDER BY id")
+        session_ids = [row[0] for row in cursor.fetchall()]
+
+    timings = []
+    statements = []
+    results = {}
+    for session_id in session_ids:
+        _Statements.count = 0
+        started = time.perf_counter()
+        results[session_id] = end(session_id, clock_out_time)
+        timings.append((time.perf_counter() - started) * 1000)
+        statements.append(_Statements.count)
+    db_connection.close_pool()
+
+    print(f"{label:<28} median {statistics.median(timings):>8.2f} ms   max {max(timings):>8.2f} ms   "
+          f"statements {statistics.median(statements):>3.0f}")
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20, help="open sessions to end")
+    parser.add_argument("--events", type=int, default=5000, help="events per session")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="sleep_tracker_")
+    seeded = os.path.join(directory, "seeded.db")
+    use_sqlite(seeded)
+    print(f"seeding {args.sessions} sessions of {args.events} events...")
+    seed(accounts=args.sessions, sessions=args.sessions, events_per_session=args.events, open_sessions=args.sessions)
+    db_connection.close_pool()
+    copy = os.path.join(directory, "copy.db")
+    shutil.copy(seeded, copy)
+
+    clock_out_time = datetime.now()
+    expected = reference_minutes(seeded, clock_out_time)
+    old = run("event scan (old)", seeded, legacy_end_session, clock_out_time)
+    new = run("end_session, one statement", copy, fast_end_session, clock_out_time)
+
+    matches = sum(new[session_id] == work for session_id, (work, _) in expected.items())
+    print(f"end_session work minutes match the intervals engine for {matches} of {len(expected)} sessions")
+    # The old scan is only expected to reproduce its own arithmetic
+    explained = sum(old[session_id] == legacy for session_id, (_, legacy) in expected.items())
+    differing = sum(old[session_id] != new[session_id] for session_id in old)
+    print(f"old scan differs on {differing} sessions, by overlap counted twice and per-kind truncation "
+          f"({explained} of {len(expected)} reproduced)")
+    sys.exit(0 if matches == len(expected) else 1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,107 @@
+# tools/bench_intervals.py
+"""Check the running aggregates against the interval engine on long, overlapping event streams.
+
+Sessions get random sleep/idle events (overlapping, repeated and stray
+ones included) written through the event writer's incremental updates.
+Every session is then recomputed from its events with utils.intervals,
+and the live and clock-out totals are compared with the union of the
+sleep and idle intervals. Run from the project root:
+    python -m tools.bench_intervals --sessions 20 --events 20000
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from database import db_connection
+from tools.seed_data import use_sqlite
+
+EVENT_TYPES = ('sleep', 'resume', 'idle_start', 'idle_end')
+AGGREGATE_COLUMNS = ("sleep_seconds, idle_seconds, sleep_open_since, idle_open_since, "
+                     "overlap_seconds, sleep_overlap_pending, idle_overlap_pending")
+
+def random_events(rng, clock_in, count):
+    events = []
+    event_time = clock_in
+    for _ in range(count):
+        event_time += timedelta(seconds=rng.randint(1, 120), milliseconds=rng.randint(0, 999))
+        events.append((rng.choice(EVENT_TYPES), event_time))
+    return events
+
+def aggregates():
+    with db_connection.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute(f"SELECT id, {AGGREGATE_COLUMNS} FROM sessions ORDER BY id")
+        return {row[0]: row[1:] for row in cursor.fetchall()}
+
+def same(a, b):
+    """Aggregate rows equal, seconds to within the database's millisecond arithmetic"""
+    for x, y in zip(a, b):
+        if isinstance(x, float) or isinstance(y, float):
+            if abs((x or 0) - (y or 0)) > 0.01:
+                return False
+        elif x != y:
+            return False
+    return True
+
+def expected_minutes(events, until):
+    """(sleep, idle, away) minutes straight from the intervals"""
+    from utils.intervals import pair_intervals, total_seconds, union
+
+    sleep, _ = pair_intervals(events, 'sleep', 'resume')
+    idle, idle_open_since = pair_intervals(events, 'idle_start', 'idle_end')
+    if idle_open_since:
+        idle.append((idle_open_since, until))
+    return (int(total_seconds(sleep) / 60), int(total_seconds(idle) / 60),
+            int(total_seconds(union(sleep, idle)) / 60))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--events", type=int, default=20000, help="events per session")
+    args = parser.parse_args()
+
+    use_sqlite()
+    from database.event_writer import write_events
+    from database.queries import end_session, get_session_minutes, rebuild_session_aggregates, start_session
+
+    with db_connection.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("INSERT INTO accounts (username, password, role) VALUES ('bench_intervals', 'bench', 'employee')")
+        cursor.execute("SELECT id FROM accounts WHERE username = 'bench_intervals'")
+        account_id = cursor.fetchone()[0]
+
+    rng = random.Random(42)
+    clock_in = datetime(2025, 1, 1)
+    streams = {}
+    started = time.perf_counter()
+    for _ in range(args.sessions):
+        session_id = start_session(account_id, clock_in, "02:00:00:00:00:01")
+        events = random_events(rng, clock_in, args.events)
+        streams[session_id] = events
+        with db_connection.pooled_connection() as conn:
+            write_events(conn.cursor(), [(account_id, session_id, event_type, event_time, 'bench')
+                                         for event_type, event_time in events])
+    print(f"incremental writes      {(time.perf_counter() - started) * 1000:>9.1f} ms "
+          f"({args.sessions * args.events} events)")
+
+    now = max(events[-1][1] for events in streams.values()) + timedelta(minutes=5)
+    live = sum(get_session_minutes(session_id, now) != expected_minutes(events, now)
+               for session_id, events in streams.items())
+
+    incremental = aggregates()
+    started = time.perf_counter()
+    rebuild_session_aggregates(list(streams))
+    print(f"rebuild from events     {(time.perf_counter() - started) * 1000:>9.1f} ms")
+    rebuilt = aggregates()
+    drift = sum(not same(incremental[session_id], rebuilt[session_id]) for session_id in streams)
+
+    closed = sum(end_session(session_id, now) != max(0, int((now - clock_in).total_seconds() / 60)
+                                                      - expected_minutes(events, now)[2])
+                 for session_id, events in streams.items())
+
+    print(f"live totals off: {live}  rebuild drift: {drift}  clock-out totals off: {closed}")
+    raise SystemExit(1 if live or drift or closed else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+# tools/bench_live_status.py
+"""Measure the live-status roster against many concurrently open sessions.
+
+Run from the project root:
+    python -m tools.bench_live_status --sessions 5000
+"""
+import argparse
+import time
+
+from tools.seed_data import seed, use_sqlite
+
+def legacy_roster(session_ids):
+    """The previous per-session path: several queries per open session"""
+    from database.queries import (
+        calculate_idle_minutes_simple, calculate_sleep_minutes_for_session,
+        get_current_idle_duration_minutes, is_session_currently_idle_simple
+    )
+    for session_id in session_ids:
+        calculate_sleep_minutes_for_session(session_id)
+        calculate_idle_minutes_simple(session_id)
+        if is_session_currently_idle_simple(session_id):
+            get_current_idle_duration_minutes(session_id)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=5000, help="open sessions")
+    parser.add_argument("--events", type=int, default=20, help="events per session")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--legacy-sample", type=int, default=200,
+                        help="sessions to time the per-session path on (0 to skip)")
+    args = parser.parse_args()
+
+    use_sqlite()
+    seed(accounts=args.sessions, sessions=args.sessions, events_per_session=args.events,
+         open_sessions=args.sessions)
+
+    from database.live_status import live_status_engine
+
+    print(f"{'run':>4} {'sessions':>9} {'queries':>8} {'query ms':>9} {'total ms':>9}")
+    for run in range(1, args.runs + 1):
+        roster = live_status_engine.snapshot()
+        stats = live_status_engine.stats()
+        print(f"{run:>4} {stats['sessions']:>9} {stats['queries']:>8} "
+              f"{stats['query_ms']:>9.1f} {stats['total_ms']:>9.1f}")
+
+    if args.legacy_sample:
+        sample = [session['session_id'] for session in roster[:args.legacy_sample]]
+        started = time.perf_counter()
+        legacy_roster(sample)
+        elapsed = (time.perf_counter() - started) * 1000
+        print(f"per-session path: {elapsed:.1f} ms for {len(sample)} sessions "
+              f"(~{elapsed / max(len(sample), 1) * args.sessions:.0f} ms extrapolated to {args.sessions})")
+
+if __name__ == "__main__":
+    main()
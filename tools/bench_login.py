@@ -0,0 +1,128 @@
+# tools/bench_login.py
+"""Time login against its latency budget, old call sequence vs login_session.
+
+The old sequence is what LoginWindow and the dashboards used to run: MAC
+lookup, authenticate_user, get_active_session and start_session. Each
+statement and commit can be charged a simulated network round trip. Run
+from the project root:
+    python -m tools.bench_login --logins 200 --rtt-ms 2 --budget-ms 50
+"""
+import argparse
+import statistics
+import time
+from datetime import datetime
+
+from database import db_connection
+from tools.seed_data import seed, use_sqlite
+
+class _Counter:
+    round_trips = 0
+    rtt = 0.0
+
+    @classmethod
+    def trip(cls):
+        cls.round_trips += 1
+        if cls.rtt:
+            time.sleep(cls.rtt)
+
+class _Cursor:
+    """Cursor proxy charging a round trip per statement"""
+
+    def __init__(self, cursor):
+        self._cursor = cursor
+
+    def execute(self, *args):
+        _Counter.trip()
+        return self._cursor.execute(*args)
+
+    def __getattr__(self, name):
+        return getattr(self._cursor, name)
+
+class _Connection:
+    """Connection proxy charging a round trip per statement and per commit"""
+
+    def __init__(self, conn):
+        self._conn = conn
+
+    def cursor(self):
+        return _Cursor(self._conn.cursor())
+
+    def commit(self):
+        _Counter.trip()
+        return self._conn.commit()
+
+    def __getattr__(self, name):
+        return getattr(self._conn, name)
+
+def legacy_login(username, password):
+    from database.queries import authenticate_user, get_active_session, start_session
+    from utils.mac_address import get_mac_address
+
+    get_mac_address.__wrapped__()   # uncached, as every call used to be
+    account_id, role = authenticate_user(username, password)
+    session_id, clock_in = get_active_session(account_id)
+    if session_id is None:
+        start_session(account_id, datetime.now())
+
+def fast_login(username, password):
+    from database.queries import login_session
+    login_session(username, password)
+
+def close_open_sessions():
+    with db_connection.pooled_connection() as conn:
+        conn.cursor().execute("UPDATE sessions SET clock_out = clock_in WHERE clock_out IS NULL")
+
+def measure(label, login, usernames, fresh):
+    timings = []
+    trips = []
+    for username in usernames:
+        if fresh:
+            close_open_sessions()
+        _Counter.round_trips = 0
+        started = time.perf_counter()
+        login(username, "bench")
+        timings.append((time.perf_counter() - started) * 1000)
+        trips.append(_Counter.round_trips)
+    timings.sort()
+    p50 = statistics.median(timings)
+    p95 = timings[int(len(timings) * 0.95)]
+    print(f"{label:<34} p50 {p50:>7.2f} ms   p95 {p95:>7.2f} ms   round trips {statistics.median(trips):>4.0f}")
+    return p95
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--logins", type=int, default=200)
+    parser.add_argument("--accounts", type=int, default=200)
+    parser.add_argument("--rtt-ms", type=float, default=2.0, help="simulated round trip per statement/commit")
+    parser.add_argument("--budget-ms", type=float, default=50.0, help="p95 budget for login_session")
+    parser.add_argument("--use-config", action="store_true", help="use config/db_config.json instead of SQLite")
+    args = parser.parse_args()
+
+    if not args.use_config:
+        use_sqlite()
+    account_ids = seed(accounts=args.accounts, sessions=args.accounts * 20, events_per_session=10)
+    with db_connection.pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT username FROM accounts WHERE id IN ({})".format(
+            ", ".join("?" for _ in account_ids)), account_ids)
+        usernames = [row[0] for row in cursor.fetchall()]
+    usernames = [usernames[index % len(usernames)] for index in range(args.logins)]
+
+    backend = db_connection.get_backend()
+    connect = backend.connect
+    backend.connect = lambda: _Connection(connect())
+    db_connection.close_pool()
+    _Counter.rtt = args.rtt_ms / 1000
+
+    print(f"{args.logins} logins, {args.rtt_ms} ms simulated round trip")
+    measure("old sequence (new session)", legacy_login, usernames, fresh=True)
+    measure("old sequence (resume)", legacy_login, usernames, fresh=False)
+    measure("login_session (new session)", fast_login, usernames, fresh=True)
+    p95 = measure("login_session (resume)", fast_login, usernames, fresh=False)
+
+    verdict = "within" if p95 <= args.budget_ms else "OVER"
+    print(f"login_session p95 {p95:.2f} ms is {verdict} the {args.budget_ms:.0f} ms budget")
+    raise SystemExit(0 if p95 <= args.budget_ms else 1)
+
+if __name__ == "__main__":
+    main()
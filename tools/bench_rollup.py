@@ -0,0 +1,46 @@
+# tools/bench_rollup.py
+"""Time the daily rollup refresh and a full-year summary read.
+
+Run from the project root:
+    python -m tools.bench_rollup --employees 2000 --days 250
+"""
+import argparse
+import time
+from datetime import date, datetime
+
+from tools.seed_data import seed, use_sqlite
+
+def timed(label, func, *args, **kwargs):
+    started = time.perf_counter()
+    result = func(*args, **kwargs)
+    print(f"{label:<28} {(time.perf_counter() - started) * 1000:>9.1f} ms")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=2000)
+    parser.add_argument("--days", type=int, default=250, help="sessions per employee over the year")
+    parser.add_argument("--events", type=int, default=4, help="events per session")
+    parser.add_argument("--year", type=int, default=2025)
+    args = parser.parse_args()
+
+    use_sqlite()
+    print(f"seeding {args.employees * args.days} sessions...")
+    seed(accounts=args.employees, sessions=args.employees * args.days, events_per_session=args.events,
+         open_sessions=args.employees // 10, start=datetime(args.year, 1, 1, 8, 0), days=365)
+
+    from database.queries import fetch_sessions_with_idle
+    from database.rollup import fetch_rollup_summary, refresh_daily_rollup
+
+    first, last = date(args.year, 1, 1), date(args.year, 12, 31)
+    days = timed("full refresh", refresh_daily_rollup)
+    print(f"{'':<28} {days:>9} days")
+    days = timed("incremental refresh", refresh_daily_rollup)
+    print(f"{'':<28} {days:>9} days")
+    rows = timed("year summary (rollup)", fetch_rollup_summary, first, last)
+    print(f"{'':<28} {len(rows):>9} employees")
+    timed("month summary (rollup)", fetch_rollup_summary, date(args.year, 6, 1), date(args.year, 6, 30))
+    timed("year listing (sessions)", fetch_sessions_with_idle, first, last)
+
+if __name__ == "__main__":
+    main()
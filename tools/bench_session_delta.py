@@ -0,0 +1,54 @@
+# tools/bench_session_delta.py
+"""Time the admin dashboard's periodic sessions refresh, full reload vs rows changed since the watermark.
+
+The full path is what every 10-second refresh did before: fetch_sessions_page
+for all rows already loaded. The delta path is fetch_session_changes
+after a handful of events. Run from the project root:
+    python -m tools.bench_session_delta --sessions 100000 --loaded 2000 --changes 50
+"""
+import argparse
+import random
+import time
+from datetime import datetime, timedelta
+
+from database.db_connection import pooled_connection
+from tools.seed_data import seed, use_sqlite
+
+def timed(label, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<32} {(time.perf_counter() - started) * 1000:>9.1f} ms")
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=100000)
+    parser.add_argument("--loaded", type=int, default=2000, help="rows the table has loaded")
+    parser.add_argument("--changes", type=int, default=50, help="events logged between refreshes")
+    args = parser.parse_args()
+
+    use_sqlite()
+    print(f"seeding {args.sessions} sessions...")
+    seed(accounts=500, sessions=args.sessions, events_per_session=10, open_sessions=300,
+         start=datetime.now() - timedelta(days=365), days=365)
+
+    from database.event_writer import flush_events
+    from database.queries import fetch_session_changes, fetch_sessions_page, log_idle_event
+
+    _, watermark = fetch_session_changes(None)
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id, account_id FROM sessions WHERE clock_out IS NULL")
+        open_sessions = cursor.fetchall()
+    rng = random.Random(7)
+    for _ in range(args.changes):
+        session_id, account_id = rng.choice(open_sessions)
+        log_idle_event(account_id, session_id, rng.choice(('idle_start', 'idle_end')))
+    flush_events()
+
+    full, _ = timed(f"full reload: {args.loaded} rows", fetch_sessions_page, None, args.loaded)
+    changed, _ = timed("delta since watermark", fetch_session_changes, watermark)
+    print(f"rows sent: {len(full)} full, {len(changed)} delta")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+# tools/bench_session_stats.py
+"""Time one stats refresh of every employee dashboard, database read vs in-memory totals.
+
+The database path is what each dashboard did every 10 seconds before:
+get_session_minutes for its session. The in-memory path reads the
+SessionStats seeded from the same rows, which refreshing never sends to
+the database. Both are compared minute for minute. Run from the project
+root:
+    python -m tools.bench_session_stats --employees 3000 --events 40
+"""
+import argparse
+import time
+from datetime import datetime
+
+from database.db_connection import pooled_connection
+from tools.seed_data import seed, use_sqlite
+
+def timed(label, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<32} {(time.perf_counter() - started) * 1000:>9.1f} ms")
+    return result
+
+def database_tick(session_ids, now):
+    from database.queries import get_session_minutes
+    return [get_session_minutes(session_id, now) for session_id in session_ids]
+
+def memory_tick(trackers, now):
+    return [stats.minutes(now) for stats in trackers]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--employees", type=int, default=3000)
+    parser.add_argument("--events", type=int, default=40, help="events per session")
+    args = parser.parse_args()
+
+    use_sqlite()
+    print(f"seeding {args.employees} open sessions of {args.events} events...")
+    seed(accounts=args.employees, sessions=args.employees, events_per_session=args.events,
+         open_sessions=args.employees)
+
+    from database.queries import get_session_aggregates
+    from utils.session_stats import SessionStats
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM sessions WHERE clock_out IS NULL ORDER BY id")
+        session_ids = [row[0] for row in cursor.fetchall()]
+    trackers = [SessionStats(session_id, get_session_aggregates(session_id), reconcile_seconds=0)
+                for session_id in session_ids]
+
+    now = datetime.now()
+    expected = timed("database: one tick", database_tick, session_ids, now)
+    actual = timed("in memory: one tick", memory_tick, trackers, now)
+    print(f"queries per tick: {len(session_ids)} before, 0 after "
+          f"({len(session_ids) / 10:.0f}/s at one tick per 10 s)")
+    print(f"mismatches: {sum(left != right for left, right in zip(expected, actual))}")
+
+if __name__ == "__main__":
+    main()
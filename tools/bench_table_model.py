@@ -0,0 +1,141 @@
+# tools/bench_table_model.py
+"""Time filling and sorting the sessions table, QTableWidget items vs ColumnTableModel.
+
+The widget path is what populate_sessions_table did before: setRowCount
+and a QTableWidgetItem per cell. The model path stores the same rows in
+a ColumnTableModel, which formats only the cells a view draws. A live
+status refresh is timed the same two ways: rebuilding every row, or
+merging the snapshot by session id so only changed cells are announced.
+Rows are synthetic, so no database is needed. Run from the project root
+(QT_QPA_PLATFORM=offscreen works without a display):
+    python -m tools.bench_table_model --rows 100000 --live 500
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+from PyQt5.QtCore import Qt
+from PyQt5.QtGui import QColor
+from PyQt5.QtWidgets import QApplication, QTableView, QTableWidget, QTableWidgetItem
+
+from gui.table_models import Column, ColumnTableModel
+
+RED = QColor(255, 200, 200)
+
+HEADERS = ["MAC Address", "Employee Name", "Clock In", "Clock Out", "Date",
+           "Work Time (min)", "Sleep Time (min)", "Idle Time (min)"]
+
+def timed(label, func, *args):
+    started = time.perf_counter()
+    result = func(*args)
+    print(f"{label:<32} {(time.perf_counter() - started) * 1000:>9.1f} ms")
+    return result
+
+def rss_mb():
+    """Resident memory of this process, where /proc is available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * 4096 / 2**20
+    except OSError:
+        return 0.0
+
+def sessions(count):
+    rng = random.Random(7)
+    start = datetime.now() - timedelta(days=365)
+    rows = []
+    for session_id in range(count, 0, -1):
+        clock_in = start + timedelta(minutes=session_id * 5)
+        rows.append((f"00:1A:2B:{session_id % 256:02X}:00:01", f"user{session_id % 500}", clock_in,
+                     clock_in + timedelta(hours=8), clock_in.date(), rng.randint(0, 480),
+                     rng.randint(0, 90), rng.randint(0, 90), session_id, session_id % 500 + 1))
+    return rows
+
+def fill_widget(table, rows):
+    table.setRowCount(len(rows))
+    for row_idx, row in enumerate(rows):
+        for column, value in enumerate(row[:8]):
+            item = QTableWidgetItem(str(value))
+            if column == 7 and value > 60:
+                item.setBackground(QColor(255, 200, 200))
+            table.setItem(row_idx, column, item)
+
+def live_ticks(count, ticks):
+    """Successive live status snapshots of count sessions, a few values moving each tick"""
+    rng = random.Random(11)
+    rows = [[session_id, f"user{session_id}", rng.randint(0, 480), rng.randint(0, 90), False]
+            for session_id in range(count)]
+    snapshots = []
+    for _ in range(ticks):
+        for row in rng.sample(rows, max(1, count // 20)):
+            row[3] += 1
+            row[4] = not row[4]
+        snapshots.append([tuple(row) for row in rows])
+    return snapshots
+
+def rebuild_live_widget(table, snapshots):
+    for snapshot in snapshots:
+        table.setRowCount(len(snapshot))
+        for row_idx, row in enumerate(snapshot):
+            for column, value in enumerate(row):
+                item = QTableWidgetItem(str(value))
+                if row[4]:
+                    item.setBackground(QColor(255, 200, 200))
+                table.setItem(row_idx, column, item)
+
+def merge_live_model(model, snapshots):
+    for snapshot in snapshots:
+        model.set_rows(snapshot, key_field=0)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000)
+    parser.add_argument("--live", type=int, default=500, help="sessions in the live status table")
+    parser.add_argument("--ticks", type=int, default=20, help="live status refreshes")
+    args = parser.parse_args()
+
+    app = QApplication(sys.argv)
+    rows = sessions(args.rows)
+
+    before = rss_mb()
+    widget = QTableWidget(0, len(HEADERS))
+    widget.setHorizontalHeaderLabels(HEADERS)
+    timed(f"widget: fill {args.rows} rows", fill_widget, widget, rows)
+    timed("widget: sort by idle", widget.sortItems, 7, Qt.DescendingOrder)
+    widget_mb = rss_mb() - before
+
+    before = rss_mb()
+    columns = [Column(header, field) for field, header in enumerate(HEADERS)]
+    columns[7].background = lambda model, row: QColor(255, 200, 200) if model.value(row, 7) > 60 else None
+    model = ColumnTableModel(columns, len(rows[0]))
+    view = QTableView()
+    view.setModel(model)
+    timed(f"model: fill {args.rows} rows", model.set_rows, rows)
+    timed("model: sort by idle", model.sort, 7, Qt.DescendingOrder)
+    timed("model: sort by idle again", model.sort, 7, Qt.AscendingOrder)
+    changed = list(rows[0])
+    changed[6] += 1
+    timed("model: update one row", model.update_row, 0, changed)
+    model_mb = rss_mb() - before
+
+    print(f"memory: {widget_mb:.0f} MB widget, {model_mb:.0f} MB model")
+
+    snapshots = live_ticks(args.live, args.ticks)
+    widget = QTableWidget(0, len(snapshots[0][0]))
+    timed(f"widget: {args.ticks} live refreshes", rebuild_live_widget, widget, snapshots)
+    highlight = lambda model, row: RED if model.value(row, 4) else None
+    model = ColumnTableModel([Column(str(field), field, background=highlight, fields=(field, 4))
+                              for field in range(len(snapshots[0][0]))], len(snapshots[0][0]))
+    view = QTableView()
+    view.setModel(model)
+    model.set_rows(snapshots[0], key_field=0)
+    announced = []
+    model.dataChanged.connect(lambda first, last: announced.append(last.column() - first.column() + 1))
+    timed(f"model: {args.ticks} live refreshes", merge_live_model, model, snapshots)
+    print(f"cells announced per refresh: {sum(announced) / args.ticks:.0f} of "
+          f"{args.live * len(snapshots[0][0])}")
+    app.quit()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,117 @@
+# tools/check_closed_session_events.py
+"""Check that sleep and idle events reaching a clocked-out session are ignored.
+
+Sessions are swept closed after five hours, then sent an idle_start and a
+sleep through every write path: the batched event writer, the collector's
+apply_writes, the offline journal's replay and a rebuild of the
+aggregates from sleep_events, plus the in-memory SessionStats. The
+session's minutes must not change. Uses a temporary SQLite database;
+exits non-zero on a failure. Run from the project root:
+    python -m tools.check_closed_session_events
+"""
+import argparse
+import os
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from database.db_connection import pooled_connection
+from tools.seed_data import use_sqlite
+
+def closed_session(account_id, now):
+    """A session opened five hours ago with a finished idle period, closed by the sweeper"""
+    from database.event_writer import flush_events
+    from database.queries import log_idle_event, start_session, sweep_stale_sessions
+
+    session_id = start_session(account_id, now - timedelta(hours=5), "00:00:00:00:00:01")
+    log_idle_event(account_id, session_id, 'idle_start')
+    log_idle_event(account_id, session_id, 'idle_end')
+    flush_events()
+    sweep_stale_sessions(timeout_minutes=240, now=now)
+    return session_id
+
+def session_state(session_id, now):
+    """What the listings and the dashboard read for a session"""
+    from database.queries import fetch_sessions_with_idle, get_session_minutes
+    listed = next(row for row in fetch_sessions_with_idle() if row[8] == session_id)
+    return get_session_minutes(session_id, now), listed[5:8]
+
+def late_events(account_id, session_id, now):
+    """An idle_start and a sleep ten minutes after the clock-out"""
+    late = now + timedelta(minutes=10)
+    return [(account_id, session_id, 'idle_start', late, 'idle'),
+            (account_id, session_id, 'sleep', late, 'system')]
+
+def via_event_writer(account_id, session_id, now):
+    from database.event_writer import flush_events
+    from database.queries import log_idle_event, log_sleep_event
+    log_idle_event(account_id, session_id, 'idle_start')
+    log_sleep_event(account_id, session_id, 'sleep')
+    flush_events()
+
+def via_collector(account_id, session_id, now):
+    from collector.server import apply_writes
+    apply_writes([('events', late_events(account_id, session_id, now))])
+
+def via_journal(account_id, session_id, now):
+    from database.offline_journal import JournalSyncWriter
+    directory = tempfile.mkdtemp(prefix="sleep_tracker_journal_")
+    writer = JournalSyncWriter(os.path.join(directory, "journal.db"))
+    for event in late_events(account_id, session_id, now):
+        writer.submit(*event)
+    writer.close()
+
+def via_rebuild(account_id, session_id, now):
+    from database.queries import rebuild_session_aggregates
+    with pooled_connection() as conn:
+        conn.cursor().executemany("""
+            INSERT INTO sleep_events (account_id, session_id, event_type, event_time, source)
+            VALUES (?, ?, ?, ?, ?)
+        """, late_events(account_id, session_id, now))
+    rebuild_session_aggregates([session_id])
+
+def via_session_stats(account_id, session_id, now):
+    from utils.session_stats import record_event, start_tracking, stop_tracking
+    stats = start_tracking(session_id, aggregates=(0, 0, None, None, 0, 0, 0), reconcile_seconds=0)
+    stop_tracking(session_id)
+    for _, _, event_type, _, _ in late_events(account_id, session_id, now):
+        record_event(session_id, event_type)
+        stats.event_logged(event_type)
+    if stats.reconcile_due():
+        raise AssertionError("SessionStats went stale on events after clock-out")
+
+PATHS = [via_event_writer, via_collector, via_journal, via_rebuild]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.parse_args()
+
+    use_sqlite()
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.execute("SELECT id FROM accounts WHERE username = 'emp1'")
+        account_id = cursor.fetchone()[0]
+
+    failures = 0
+    for path in PATHS:
+        now = datetime.now()
+        session_id = closed_session(account_id, now)
+        before = session_state(session_id, now)
+        path(account_id, session_id, now)
+        # Three hours on, an interval wrongly reopened would show
+        after = session_state(session_id, now + timedelta(hours=3))
+        ok = after == before
+        failures += not ok
+        print(f"{path.__name__:<20} {'ok' if ok else f'FAILED: {before} -> {after}'}")
+
+    try:
+        via_session_stats(account_id, -1, datetime.now())
+        print(f"{'via_session_stats':<20} ok")
+    except AssertionError as e:
+        failures += 1
+        print(f"{'via_session_stats':<20} FAILED: {e}")
+
+    sys.exit(1 if failures else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+# tools/seed_data.py
+"""Synthetic accounts, sessions and sleep/idle events for benchmarks.
+
+Run from the project root, e.g.:
+    python -m tools.seed_data --path seeded.db --accounts 200 --sessions 20000
+"""
+import argparse
+import json
+import os
+import random
+import tempfile
+from datetime import datetime, timedelta
+
+import database.db_connection as db_connection
+from database.db_connection import pooled_connection
+from database.queries import rebuild_session_aggregates
+
+EVENT_PAIRS = (('sleep', 'resume'), ('idle_start', 'idle_end'))
+
+def use_sqlite(path=None):
+    """Point the app at a SQLite database (a fresh temporary one by default)"""
+    directory = tempfile.mkdtemp(prefix="sleep_tracker_")
+    config_path = os.path.join(directory, "db_config.json")
+    with open(config_path, "w") as file:
+        json.dump({"backend": "sqlite", "path": path or os.path.join(directory, "bench.db")}, file)
+    db_connection.CONFIG_PATH = config_path
+    db_connection.reload_db_config()
+    return config_path
+
+def seed(accounts=100, sessions=1000, events_per_session=20, open_sessions=0,
+         start=datetime(2025, 1, 1, 8, 0), days=90, seed=42):
+    """Insert generated data; the last open_sessions sessions are left open"""
+    rng = random.Random(seed)
+    now = datetime.now()
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        cursor.executemany(
+            "INSERT INTO accounts (username, password, role, is_active) VALUES (?, ?, 'employee', 1)",
+            [(f"bench_{seed}_{i:05d}", "bench") for i in range(accounts)]
+        )
+        cursor.execute("SELECT id FROM accounts WHERE username LIKE ?", (f"bench_{seed}_%",))
+        account_ids = [row[0] for row in cursor.fetchall()]
+
+    session_ids = []
+    for index in range(sessions):
+        account_id = account_ids[index % len(account_ids)]
+        is_open = index >= sessions - open_sessions
+        if is_open:
+            clock_in = now - timedelta(minutes=rng.randint(30, 480), seconds=rng.randint(0, 59))
+            clock_out = None
+        else:
+            clock_in = start + timedelta(days=rng.randrange(days), minutes=rng.randint(0, 240),
+                                         seconds=rng.randint(0, 59))
+            clock_out = clock_in + timedelta(minutes=rng.randint(60, 600))
+
+        end = clock_out or now
+        events = _generate_events(rng, clock_in, end, events_per_session)
+        sleep_minutes = _closed_minutes(events, 'sleep', 'resume')
+
+        with pooled_connection() as conn:
+            cursor = conn.cursor()
+            cursor.execute("""
+                INSERT INTO sessions (account_id, clock_in, clock_out, session_date,
+                                      total_work_minutes, sleep_minutes, device_mac_address)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            """, (account_id, clock_in, clock_out, clock_in.date(),
+                  int((end - clock_in).total_seconds() / 60) - sleep_minutes if clock_out else None,
+                  sleep_minutes, f"02:00:00:00:{account_id // 256 % 256:02X}:{account_id % 256:02X}"))
+            cursor.execute("SELECT MAX(id) FROM sessions")
+            session_id = cursor.fetchone()[0]
+            session_ids.append(session_id)
+            cursor.executemany("""
+                INSERT INTO sleep_events (account_id, session_id, event_type, event_time, source)
+                VALUES (?, ?, ?, ?, ?)
+            """, [(account_id, session_id, event_type, event_time, 'bench')
+                  for event_type, event_time in events])
+
+    rebuild_session_aggregates(session_ids)
+    return account_ids
+
+def _generate_events(rng, clock_in, end, count):
+    """Mostly well-formed start/end pairs, with the occasional stray event"""
+    events = []
+    span = (end - clock_in).total_seconds()
+    if count <= 0 or span <= 0:
+        return events
+
+    times = sorted(clock_in + timedelta(seconds=rng.uniform(0, span)) for _ in range(count))
+    pending = None
+    for event_time in times:
+        if pending is None:
+            start_type, end_type = rng.choice(EVENT_PAIRS)
+            events.append((start_type, event_time))
+            pending = end_type
+        elif rng.random() < 0.1:
+            events.append((rng.choice(('sleep', 'idle_start', 'resume', 'idle_end')), event_time))
+        else:
+            events.append((pending, event_time))
+            pending = None
+    return events
+
+def _closed_minutes(events, start_type, end_type):
+    minutes = 0
+    start = None
+    for event_type, event_time in events:
+        if event_type == start_type:
+            start = event_time
+        elif event_type == end_type and start:
+            minutes += (event_time - start).total_seconds() / 60
+            start = None
+    return int(minutes)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--path", required=True, help="SQLite database file to create or extend")
+    parser.add_argument("--accounts", type=int, default=100)
+    parser.add_argument("--sessions", type=int, default=1000)
+    parser.add_argument("--events", type=int, default=20, help="events per session")
+    parser.add_argument("--open", type=int, default=0, help="sessions left open")
+    args = parser.parse_args()
+
+    use_sqlite(os.path.abspath(args.path))
+    seed(args.accounts, args.sessions, args.events, args.open)
+    print(f"Seeded {args.sessions} sessions for {args.accounts} accounts into {args.path}")
+
+if __name__ == "__main__":
+    main()
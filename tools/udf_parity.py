@@ -0,0 +1,93 @@
+# tools/udf_parity.py
+"""Compare the SQL Server session functions in SQL.txt with the interval engine.
+
+The functions read the running aggregates kept on sessions; the reference
+recomputes every session from its sleep_events with utils.intervals, as
+rebuild_session_aggregates does, and reports any row where the two
+disagree. Needs the sqlserver backend with SQL.txt applied. Run from the
+project root:
+    python -m tools.udf_parity --seed 2000
+"""
+import argparse
+import time
+from datetime import datetime
+from itertools import groupby
+
+from database.db_connection import get_backend, pooled_connection
+from database.queries import _aggregate_minutes, _session_aggregates
+
+FUNCTION_QUERY = """
+    SELECT s.id, sleep.sleep_minutes, idle.idle_minutes, idle.is_currently_idle
+    FROM sessions s
+    CROSS APPLY dbo.SessionSleepStats(s.id) sleep
+    CROSS APPLY dbo.SessionIdleStats(s.id, s.clock_out) idle
+    ORDER BY s.id
+"""
+
+EVENTS_QUERY = """
+    SELECT s.id, s.clock_out, e.event_type, e.event_time
+    FROM sessions s
+    LEFT JOIN sleep_events e ON e.session_id = s.id
+    ORDER BY s.id, e.event_time, e.id
+"""
+
+def timed_rows(cursor, sql):
+    started = time.perf_counter()
+    cursor.execute(sql)
+    rows = [tuple(row) for row in cursor.fetchall()]
+    return rows, (time.perf_counter() - started) * 1000
+
+def engine_rows(event_rows, now):
+    """(session_id, sleep_minutes, idle_minutes, is_idle) recomputed from the events"""
+    rows = []
+    for session_id, group in groupby(event_rows, key=lambda row: row[0]):
+        group = list(group)
+        clock_out = group[0][1]
+        events = [(row[2], row[3]) for row in group if row[2] is not None]
+        sleep_seconds, idle_seconds, _, idle_open_since = _session_aggregates(events, clock_out)[:4]
+        sleep_minutes, idle_minutes, _ = _aggregate_minutes(sleep_seconds, idle_seconds, idle_open_since, now)
+        rows.append((session_id, sleep_minutes, idle_minutes, idle_open_since is not None))
+    return rows
+
+def compare(expected_rows, function_rows):
+    """Rows (session_id, engine values, function values) where the two disagree"""
+    function_by_id = {row[0]: (row[1], row[2], bool(row[3])) for row in function_rows}
+    return [(row[0], row[1:], function_by_id.get(row[0]))
+            for row in expected_rows if row[1:] != function_by_id.get(row[0])]
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--seed", type=int, default=0, metavar="SESSIONS",
+                        help="insert this many generated sessions first (bench_* accounts)")
+    parser.add_argument("--events", type=int, default=20, help="events per generated session")
+    parser.add_argument("--open", type=int, default=100, help="generated sessions left open")
+    args = parser.parse_args()
+
+    if get_backend().name != "sqlserver":
+        parser.error("the parity check needs the sqlserver backend")
+
+    if args.seed:
+        from tools.seed_data import seed
+        seed(accounts=max(1, args.seed // 20), sessions=args.seed, events_per_session=args.events,
+             open_sessions=min(args.open, args.seed), seed=int(time.time()))
+
+    with pooled_connection() as conn:
+        cursor = conn.cursor()
+        event_rows, events_ms = timed_rows(cursor, EVENTS_QUERY)
+        function_rows, function_ms = timed_rows(cursor, FUNCTION_QUERY)
+    started = time.perf_counter()
+    expected_rows = engine_rows(event_rows, datetime.now())
+    engine_ms = (time.perf_counter() - started) * 1000
+
+    mismatches = compare(expected_rows, function_rows)
+    print(f"sessions: {len(expected_rows)}  functions: {function_ms:.0f} ms  "
+          f"engine: {events_ms + engine_ms:.0f} ms ({engine_ms:.0f} ms in Python)")
+    for session_id, expected, actual in mismatches[:20]:
+        print(f"  session {session_id}: engine {expected} != functions {actual}")
+    # Open idle periods count up to GETDATE() in SQL and datetime.now() here;
+    # a minute boundary between the two can show up as a mismatch
+    print(f"mismatches: {len(mismatches)}")
+    raise SystemExit(1 if mismatches else 0)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+# utils/activity_bitmap.py
+from datetime import datetime, timedelta
+
+import numpy as np
+
+from utils.intervals import clip, pair_intervals
+
+MINUTES_PER_DAY = 1440
+PLANE_BYTES = MINUTES_PER_DAY // 8
+
+# Minute states in order of precedence: where periods overlap the later
+# one wins, so a minute both idle and asleep counts as asleep
+OFF, WORKING, IDLE, ASLEEP = 0, 1, 2, 3
+STATE_NAMES = ('off', 'working', 'idle', 'asleep')
+
+# Each state is stored as two bits, one per plane. The awake plane is set
+# while the machine is up during a session (working or idle), the away plane
+# while the employee is not working (idle or asleep); clocked-in minutes
+# are awake | away.
+_AWAKE = np.array([0, 1, 1, 0], dtype=np.uint8)
+_AWAY = np.array([0, 0, 1, 1], dtype=np.uint8)
+_STATE_OF_BITS = np.array([OFF, WORKING, ASLEEP, IDLE], dtype=np.uint8)   # indexed by awake | away << 1
+
+_MINUTE = timedelta(minutes=1)
+_HALF_MINUTE = timedelta(seconds=30)
+
+def session_periods(clock_in, clock_out, events, now, until=None):
+    """(start, end, state) periods of one session from its (event_type, event_time) events in time order.
+
+    Sleep and idle are paired as in the session totals. An idle period
+    still open runs to the clock-out, or to now, as does a sleep period
+    still open in an open session. Everything is clipped to the session
+    and to until, if given.
+    """
+    end = clock_out or now
+    if until is not None and until < end:
+        end = until
+
+    sleep, sleep_open_since = pair_intervals(events, 'sleep', 'resume')
+    idle, idle_open_since = pair_intervals(events, 'idle_start', 'idle_end')
+    if idle_open_since:
+        idle.append((idle_open_since, clock_out or now))
+    if sleep_open_since and clock_out is None:
+        sleep.append((sleep_open_since, now))
+
+    periods = [(clock_in, end, WORKING)] if clock_in < end else []
+    for intervals, state in ((idle, IDLE), (sleep, ASLEEP)):
+        periods.extend((start, stop, state) for start, stop in clip(intervals, clock_in, end))
+    return periods
+
+def day_states(day, periods, states=None):
+    """Minute states of a day (uint8 array of 1440) from (start, end, state) periods.
+
+    A minute takes the state at its midpoint, hh:mm:30, so a period
+    claims the minutes it covers for at least half of them. Passing
+    states merges the periods into an existing array.
+    """
+    if states is None:
+        states = np.zeros(MINUTES_PER_DAY, dtype=np.uint8)
+    day_start = datetime(day.year, day.month, day.day)
+    for start, end, state in periods:
+        # First and past-the-last minute whose midpoint lies in [start, end)
+        first = max(0, -((day_start + _HALF_MINUTE - start) // _MINUTE))
+        stop = min(MINUTES_PER_DAY, -((day_start + _HALF_MINUTE - end) // _MINUTE))
+        if first < stop:
+            np.maximum(states[first:stop], state, out=states[first:stop])
+    return states
+
+def pack(states):
+    """(awake, away) bit-planes of 180 bytes each for a day of minute states"""
+    return np.packbits(_AWAKE[states]).tobytes(), np.packbits(_AWAY[states]).tobytes()
+
+def unpack(awake, away):
+    """Minute states of a day from its two bit-planes"""
+    awake = np.unpackbits(np.frombuffer(awake, dtype=np.uint8))
+    away = np.unpackbits(np.frombuffer(away, dtype=np.uint8))
+    return _STATE_OF_BITS[awake | away << 1]
+
+def stack(planes):
+    """(awake, away) 2-D arrays, one row of 180 bytes per account, from (awake, away) pairs"""
+    awake = np.frombuffer(b"".join(row[0] for row in planes), dtype=np.uint8).reshape(-1, PLANE_BYTES)
+    away = np.frombuffer(b"".join(row[1] for row in planes), dtype=np.uint8).reshape(-1, PLANE_BYTES)
+    return awake, away
+
+def state_planes(awake, away):
+    """Packed per-state planes for stacked rows: {state: array of the minutes each row spent in it}"""
+    return {OFF: ~(awake | away), WORKING: awake & ~away, IDLE: awake & away, ASLEEP: away & ~awake}
+
+def minute_counts(awake, away):
+    """Accounts in each state for every minute: array of shape (4, 1440) indexed by state"""
+    counts = np.zeros((4, MINUTES_PER_DAY), dtype=np.int64)
+    for state, plane in state_planes(awake, away).items():
+        counts[state] = np.unpackbits(plane, axis=1).sum(axis=0, dtype=np.int64)
+    return counts
+
+def states_at(awake, away, minute):
+    """Each stacked row's state at one minute of the day"""
+    byte, shift = divmod(minute, 8)
+    awake_bit = (awake[:, byte] >> (7 - shift)) & 1
+    away_bit = (away[:, byte] >> (7 - shift)) & 1
+    return _STATE_OF_BITS[awake_bit | away_bit << 1]
+
+def minute_mask(first, stop):
+    """Packed plane with the minutes [first, stop) set, for testing windows with &"""
+    bits = np.zeros(MINUTES_PER_DAY, dtype=np.uint8)
+    bits[first:stop] = 1
+    return np.packbits(bits)
+
+def rows_in_state(awake, away, state, first, stop=None):
+    """Boolean per stacked row: spent any minute of [first, stop) in state (stop defaults to first + 1)"""
+    mask = minute_mask(first, first + 1 if stop is None else stop)
+    return (state_planes(awake, away)[state] & mask).any(axis=1)
@@ -5,6 +5,7 @@ from datetime import datetime, timedelta
 import win32gui
 import win32con
 from ctypes import Structure, windll, c_uint, sizeof, byref
+from utils.intervals import total_seconds
 
 class POINT(Structure):
     _fields_ = [("x", c_uint), ("y", c_uint)]
@@ -40,7 +41,7 @@ class IdleMonitor:
         self.idle_threshold = idle_threshold_seconds
         self.is_idle = False
         self.idle_start_time = None
-        self.total_idle_time = 0
+        self.idle_periods = []
         self.monitoring = False
         self.monitor_thread = None
         
@@ -56,8 +57,7 @@ class IdleMonitor:
         self.monitoring = False
         
         if self.is_idle and self.idle_start_time:
-            final_idle_time = (datetime.now() - self.idle_start_time).total_seconds()
-            self.total_idle_time += final_idle_time
+            self.idle_periods.append((self.idle_start_time, datetime.now()))
             self._log_idle_event('idle_end')
         
     def _monitor_loop(self):
@@ -74,8 +74,7 @@ class IdleMonitor:
                 elif idle_duration < self.idle_threshold and self.is_idle:
                     self.is_idle = False
                     if self.idle_start_time:
-                        idle_period = (datetime.now() - self.idle_start_time).total_seconds()
-                        self.total_idle_time += idle_period
+                        self.idle_periods.append((self.idle_start_time, datetime.now()))
                         self._log_idle_event('idle_end')
                     self.idle_start_time = None
                     
@@ -94,17 +93,16 @@ class IdleMonitor:
     
     def get_current_status(self):
         """Get current idle status and total idle time"""
-        current_idle_time = self.total_idle_time
+        periods = list(self.idle_periods)
         current_idle_duration = 0
         
         if self.is_idle and self.idle_start_time:
-            current_session_idle = (datetime.now() - self.idle_start_time).total_seconds()
-            current_idle_time += current_session_idle
+            periods.append((self.idle_start_time, datetime.now()))
             current_idle_duration = int(get_idle_duration())
         
         status = {
             'is_idle': self.is_idle,
-            'total_idle_minutes': int(current_idle_time / 60),
+            'total_idle_minutes': int(total_seconds(periods) / 60),
             'current_idle_duration': current_idle_duration
         }
         
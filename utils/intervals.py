@@ -0,0 +1,80 @@
+# utils/intervals.py
+from heapq import merge as _merge_sorted
+from operator import itemgetter
+
+# Intervals are half-open (start, end) pairs of datetimes (or any ordered,
+# subtractable values). Functions taking several intervals accept them in
+# any order and return merged lists: sorted, non-overlapping and with
+# touching intervals joined. Everything is O(n log n) for the sort and
+# linear afterwards, or linear outright for input that is already merged.
+
+def pair_intervals(events, start_type, end_type):
+    """Closed intervals and the open start from (event_type, event_time) events in time order.
+
+    A later start replaces an unmatched earlier one and an end without a
+    start is ignored. Returns ([(start, end), ...], open_start or None).
+    """
+    intervals = []
+    start = None
+    for event_type, event_time in events:
+        if event_type == start_type:
+            start = event_time
+        elif event_type == end_type and start is not None:
+            intervals.append((start, event_time))
+            start = None
+    return intervals, start
+
+def _coalesce(intervals):
+    """Join overlapping and touching intervals of a start-sorted sequence"""
+    merged = []
+    for start, end in intervals:
+        if end <= start:
+            continue
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+def merge(intervals):
+    """Sorted, coalesced copy of intervals; empty and inverted ones are dropped"""
+    return _coalesce(sorted(intervals, key=itemgetter(0)))
+
+def union(*interval_lists):
+    """Time covered by any of the interval lists"""
+    # Each list is merged on its own, then the sorted lists are merged lazily
+    return _coalesce(_merge_sorted(*(merge(intervals) for intervals in interval_lists), key=itemgetter(0)))
+
+def intersection(a, b):
+    """Time covered by both interval lists"""
+    a, b = merge(a), merge(b)
+    result = []
+    i = j = 0
+    while i < len(a) and j < len(b):
+        start = max(a[i][0], b[j][0])
+        end = min(a[i][1], b[j][1])
+        if start < end:
+            result.append((start, end))
+        # Advance whichever interval finishes first
+        if a[i][1] < b[j][1]:
+            i += 1
+        else:
+            j += 1
+    return result
+
+def clip(intervals, start=None, end=None):
+    """Intervals cut to the window [start, end); either bound may be None for unbounded"""
+    clipped = []
+    for interval_start, interval_end in merge(intervals):
+        if start is not None and interval_start < start:
+            interval_start = start
+        if end is not None and interval_end > end:
+            interval_end = end
+        if interval_start < interval_end:
+            clipped.append((interval_start, interval_end))
+    return clipped
+
+def total_seconds(intervals):
+    """Seconds covered by intervals, overlaps counted once"""
+    return sum((end - start).total_seconds() for start, end in merge(intervals))
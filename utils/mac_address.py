@@ -3,7 +3,11 @@ import uuid
 import subprocess
 import platform
 import re
+from functools import lru_cache
 
+# The lookup can shell out to getmac/ifconfig; the answer does not change
+# while the app runs, so it is worked out once per process
+@lru_cache(maxsize=None)
 def get_mac_address():
     try:
         mac_int = uuid.getnode()
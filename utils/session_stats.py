@@ -0,0 +1,135 @@
+# utils/session_stats.py
+import threading
+import time
+from datetime import datetime
+
+from database.db_connection import load_db_config
+from database.queries import _AGGREGATE_COLUMNS, _EVENT_AGGREGATES, _aggregate_minutes, get_session_aggregates
+
+DEFAULT_STATS_RECONCILE_SECONDS = 900   # seconds between checks of the stored totals against the database
+
+# Seconds reconcile waits for this process's queued events to be written
+RECONCILE_FLUSH_TIMEOUT = 5
+
+_EMPTY_AGGREGATES = (0, 0, None, None, 0, 0, 0)
+
+class SessionStats:
+    """A session's sleep/idle totals, read back from the database only when they change.
+
+    Holds a copy of the session's aggregate columns and works the minutes
+    out from them the way get_session_minutes does, so a refresh costs no
+    database round trip. The columns themselves are only ever written by
+    _aggregate_update: an event logged by this process just marks the copy
+    stale, and the owner should then call reconcile, off the GUI thread, to
+    read them back once the event is written. reconcile is also due every
+    reconcile_seconds, to pick up anything logged elsewhere; 0 or None turns
+    that off.
+    """
+
+    def __init__(self, session_id, aggregates=None, reconcile_seconds=DEFAULT_STATS_RECONCILE_SECONDS):
+        self.session_id = session_id
+        self.reconcile_seconds = reconcile_seconds
+        self._lock = threading.Lock()
+        self._columns = dict(zip(_AGGREGATE_COLUMNS, aggregates or _EMPTY_AGGREGATES))
+        self._stale = False
+        self._last_event = float('-inf')
+        self._reconciled = time.monotonic()
+        self._closed = False
+
+    def event_logged(self, event_type):
+        """Note a sleep or idle event, so the totals are read back once it is written"""
+        if event_type not in _EVENT_AGGREGATES:
+            return
+        with self._lock:
+            # Like the database, a clocked-out session takes no more events
+            if self._closed:
+                return
+            self._stale = True
+            self._last_event = time.monotonic()
+
+    def minutes(self, now=None):
+        """(sleep, idle, away) minutes so far, as get_session_minutes returns them"""
+        if now is None:
+            now = datetime.now()
+        with self._lock:
+            columns = dict(self._columns)
+        overlap = columns['overlap_seconds']
+        if columns['sleep_open_since'] is not None:
+            overlap -= columns['sleep_overlap_pending']
+        return _aggregate_minutes(columns['sleep_seconds'], columns['idle_seconds'],
+                                  columns['idle_open_since'], now, overlap)
+
+    def reconcile(self):
+        """Replace the totals with the database's; False if skipped or failed.
+
+        Waits up to RECONCILE_FLUSH_TIMEOUT for this process's queued events
+        to be written first. If they are not, or an event is logged while the
+        row is read, the totals stay stale and the next call tries again. A
+        failed read keeps the current totals until the next interval.
+        """
+        from database.event_writer import flush_events
+
+        started = time.monotonic()
+        if not flush_events(RECONCILE_FLUSH_TIMEOUT):
+            return False
+        try:
+            aggregates = get_session_aggregates(self.session_id)
+        except Exception:
+            self._reconciled = time.monotonic()
+            return False
+        with self._lock:
+            self._reconciled = time.monotonic()
+            # An event logged while the row was being read may be missing from it
+            if self._last_event >= started:
+                return False
+            self._stale = False
+            if aggregates is None:
+                return False
+            self._columns = dict(zip(_AGGREGATE_COLUMNS, aggregates))
+        return True
+
+    def close(self):
+        """Stop counting events, once the session is clocked out"""
+        with self._lock:
+            self._closed = True
+            self._stale = False
+
+    def reconcile_due(self):
+        """True once an event was logged, or reconcile_seconds have passed since the last reconcile"""
+        if self._stale:
+            return True
+        return bool(self.reconcile_seconds) and time.monotonic() - self._reconciled >= self.reconcile_seconds
+
+_trackers = {}   # session_id -> SessionStats
+_trackers_lock = threading.Lock()
+
+def start_tracking(session_id, aggregates=None, reconcile_seconds=None):
+    """Keep the session's totals in memory from now on and return its SessionStats.
+
+    aggregates are the session's running aggregate columns, as in
+    login_session's result; when None they are read from the database once.
+    """
+    if aggregates is None:
+        aggregates = get_session_aggregates(session_id)
+    if reconcile_seconds is None:
+        reconcile_seconds = load_db_config().get("stats_reconcile_seconds", DEFAULT_STATS_RECONCILE_SECONDS)
+    stats = SessionStats(session_id, aggregates, reconcile_seconds)
+    with _trackers_lock:
+        _trackers[session_id] = stats
+    return stats
+
+def stop_tracking(session_id):
+    with _trackers_lock:
+        stats = _trackers.pop(session_id, None)
+    if stats is not None:
+        stats.close()
+
+def get_session_stats(session_id):
+    """The session's SessionStats, or None if it is not tracked"""
+    return _trackers.get(session_id)
+
+def record_event(session_id, event_type):
+    """Note an event logged by this process against its session's totals, if tracked"""
+    stats = _trackers.get(session_id)
+    if stats is not None:
+        stats.event_logged(event_type)
@@ -1,18 +1,78 @@
 #utils/session_timeout.py
 import threading
-import time
-from datetime import datetime
-from database.queries import end_session
+from datetime import datetime, timedelta
 
-def start_timeout_monitor(account_id, session_id, clock_in_time, timeout_minutes=240):
-    def monitor():
+from database.db_connection import load_db_config
+from database.event_writer import journal_enabled
+from database.queries import DEFAULT_SESSION_TIMEOUT_MINUTES, close_sessions
+
+RETRY_INTERVAL = 60   # seconds before retrying a timeout clock-out that failed or was deferred
+
+class _TimeoutMonitor:
+    """One thread that clocks out every watched session reaching its deadline.
+
+    The thread sleeps until the earliest deadline, then closes all sessions
+    that are due in a single statement. Sessions already clocked out by
+    then are left alone. A session that could not be clocked out yet is
+    retried RETRY_INTERVAL seconds later.
+    """
+
+    def __init__(self):
+        self._deadlines = {}          # session_id -> clock-out deadline
+        self._lock = threading.Lock()
+        self._changed = threading.Event()
+        self._thread = None
+
+    def watch(self, session_id, deadline):
+        with self._lock:
+            self._deadlines[session_id] = deadline
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="session-timeout", daemon=True)
+                self._thread.start()
+        self._changed.set()
+
+    def _run(self):
         while True:
+            with self._lock:
+                earliest = min(self._deadlines.values(), default=None)
+            wait = None if earliest is None else max(0, (earliest - datetime.now()).total_seconds())
+            if self._changed.wait(wait):
+                self._changed.clear()
+                continue
+
             now = datetime.now()
-            duration = (now - clock_in_time).total_seconds() / 60
-            if duration > timeout_minutes:
-                print(f"Auto-ending session {session_id} due to timeout.")
-                end_session(session_id, now)
-                break
-            time.sleep(60)
-    thread = threading.Thread(target=monitor, daemon=True)
-    thread.start()
+            with self._lock:
+                due = [session_id for session_id, deadline in self._deadlines.items() if deadline <= now]
+            try:
+                closed = close_sessions(now, session_ids=due)
+            except Exception as e:
+                print(f"Error auto-ending timed out sessions: {e}")
+                self._changed.wait(RETRY_INTERVAL)
+                continue
+            # (id, None) is a session left open, unless its clock-out was journaled
+            journaled = journal_enabled()
+            retry = {session_id for session_id, work_minutes in closed if work_minutes is None and not journaled}
+            with self._lock:
+                for session_id in due:
+                    if session_id in retry:
+                        self._deadlines[session_id] = now + timedelta(seconds=RETRY_INTERVAL)
+                    else:
+                        self._deadlines.pop(session_id, None)
+            for session_id, _ in closed:
+                if session_id not in retry:
+                    print(f"Auto-ending session {session_id} due to timeout.")
+
+_monitor = _TimeoutMonitor()
+
+def start_timeout_monitor(account_id, session_id, clock_in_time, timeout_minutes=None):
+    """Clock the session out once it has been open for timeout_minutes.
+
+    Does nothing when "server_session_sweeper" is set in db_config.json,
+    since the server then times out every client's sessions itself.
+    """
+    config = load_db_config()
+    if config.get("server_session_sweeper"):
+        return
+    if timeout_minutes is None:
+        timeout_minutes = config.get("session_timeout_minutes", DEFAULT_SESSION_TIMEOUT_MINUTES)
+    _monitor.watch(session_id, clock_in_time + timedelta(minutes=timeout_minutes))